@@ -1,22 +1,61 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from flask_sqlalchemy.session import Session
 from flask_cors import CORS
+from .config import Config, apply_sqlite_pragmas, use_explicit_begin
 
-db = SQLAlchemy()
-migrate = Migrate()
 
-def create_app():
+class _Session(Session):
+    """Sesión de Flask-SQLAlchemy que respeta un bind explícito (app.testing la ata a una conexión con transacción abierta)."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.bind is not None:
+            bind = self.bind
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': _Session})
+
+def create_app(config=None):
+    """config: Config (default: todo desde el entorno); Config.in_memory() para tests y scripts."""
+    config = config or Config()
     app = Flask(__name__)
-    CORS(app)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///stock.db'
+    app.testing = config.testing
+    from .services.serializers import FastJSONProvider
+    app.json = FastJSONProvider(app)
+    CORS(app, expose_headers=['X-Next-Cursor'])
+    app.config['SQLALCHEMY_DATABASE_URI'] = config.database_uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = config.engine_options
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
     db.init_app(app)
-    migrate.init_app(app, db)
+    if config.migrations:
+        # alembic solo hace falta para `flask db`: se importa acá y no al importar el paquete
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, config.sqlite_pragmas)
+        if config.explicit_begin:
+            use_explicit_begin(db.engine)
+        # motor sin soporte: error de configuración al arrancar, no un 500 en cada venta
+        from .services.rollup import check_dialect
+        check_dialect(db.engine.dialect.name)
+
+    from .services.product_cache import product_cache
+    product_cache.configure(**config.product_cache)
+
+    from .services.metrics import request_metrics
+    with app.app_context():
+        request_metrics.init_app(app, db.engine, slow_ms=config.slow_request_ms)
 
     # Importar modelos
-    from .models import product, batch, purchase, sale
+    from .models import product, batch, purchase, sale, daily_sales, stock_movement
+
+    # Escrituras diferidas (opcional): PriceHistory fuera de la transacción de la request
+    if config.async_writes:
+        from .services.write_queue import write_queue
+        write_queue.start(app, **config.async_writes)
 
     # Registrar rutas
     from .routes.product_routes import product_bp
@@ -24,6 +63,9 @@ def create_app():
     from .routes.purchase_routes import purchase_bp
     from .routes.price_history_routes import price_history_bp
     from .routes.profit_routes import profits_bp
+    from .routes.export_routes import export_bp
+    from .routes.inventory_routes import inventory_bp
+    from .routes.analytics_routes import analytics_bp
 
 
     app.register_blueprint(product_bp)
@@ -31,5 +73,11 @@ def create_app():
     app.register_blueprint(purchase_bp)
     app.register_blueprint(price_history_bp)
     app.register_blueprint(profits_bp)
+    app.register_blueprint(export_bp)
+    app.register_blueprint(inventory_bp)
+    app.register_blueprint(analytics_bp)
+
+    from .commands import register_commands
+    register_commands(app)
 
     return app
\ No newline at end of file
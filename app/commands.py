@@ -0,0 +1,83 @@
+import json
+import click
+from flask import Flask
+
+
+def register_commands(app: Flask):
+
+    @app.cli.command('rebuild-rollup')
+    def rebuild_rollup():
+        """Recalcula la tabla daily_sales desde las ventas."""
+        from app.services import rollup
+        rows = rollup.rebuild()
+        click.echo(f'daily_sales reconstruida: {rows} filas')
+
+    @app.cli.command('import-purchases')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    def import_purchases_command(path):
+        """Importa compras desde un CSV (product_id,unit_cost,quantity) o un JSON (lista de líneas)."""
+        from app.services.purchases import import_purchases, parse_csv
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        lines = json.loads(text) if path.endswith('.json') else parse_csv(text)
+
+        report = import_purchases(lines)
+        for outcome in report['results']:
+            if not outcome['ok']:
+                click.echo(f"línea {outcome['line']}: {outcome['error']}", err=True)
+        click.echo(
+            f"{report['imported']} compras importadas, {report['failed']} con error "
+            f"en {report['elapsed_ms']} ms ({report['lines_per_second']} líneas/s)"
+        )
+
+    @app.cli.command('check-stock')
+    @click.option('--fix', is_flag=True, help='Corrige los productos con diferencias.')
+    def check_stock(fix):
+        """Compara product.stock_qty/max_cost con sus lotes, y cada lote con el libro de movimientos."""
+        from app import db
+        from app.models.product import Product
+        from app.models.batch import Batch
+
+        actual = dict(
+            (pid, (stock, max_cost)) for pid, stock, max_cost in
+            db.session.query(Batch.product_id, db.func.sum(Batch.quantity), db.func.max(Batch.cost))
+            .group_by(Batch.product_id)
+        )
+        drift = 0
+        for product in Product.query.order_by(Product.id):
+            stock, max_cost = actual.get(product.id, (0.0, None))
+            if abs((product.stock_qty or 0.0) - stock) > 1e-6 or product.max_cost != max_cost:
+                drift += 1
+                click.echo(
+                    f"producto {product.id} ({product.name}): stock_qty={product.stock_qty} real={stock}, "
+                    f"max_cost={product.max_cost} real={max_cost}"
+                )
+                if fix:
+                    product.stock_qty = stock
+                    product.max_cost = max_cost
+        if fix:
+            db.session.commit()
+        click.echo(f"{drift} productos con diferencias" + (" (corregidos)" if fix and drift else ""))
+
+        # lotes contra el libro de movimientos (solo informe: el libro no se corrige a mano)
+        from app.services.ledger import batch_drift
+        batches = batch_drift()
+        for batch_id, product_id, quantity, ledger_qty in batches:
+            click.echo(f"lote {batch_id} (producto {product_id}): quantity={quantity} libro={ledger_qty}")
+        click.echo(f"{len(batches)} lotes con diferencias contra el libro")
+
+    @app.cli.command('check-query-plans')
+    @click.option('--verbose', '-v', is_flag=True, help='Muestra el plan completo de cada consulta.')
+    def check_query_plans(verbose):
+        """EXPLAIN QUERY PLAN de las consultas calientes; falla si alguna recorre una tabla completa."""
+        from app.services.query_plans import check_plans
+        failed = 0
+        for name, (plan, scans) in check_plans().items():
+            status = 'FULL SCAN' if scans else 'ok'
+            click.echo(f"{name:32} {status}")
+            if verbose or scans:
+                for step in plan:
+                    click.echo(f"    {step}")
+            failed += bool(scans)
+        if failed:
+            raise click.ClickException(f'{failed} consultas sin índice')
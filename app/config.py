@@ -0,0 +1,138 @@
+import os
+from sqlalchemy import event
+
+# Perfil de SQLite para producción (se puede desactivar con SQLITE_TUNING=0)
+SQLITE_DEFAULTS = {
+    'journal_mode': 'WAL',          # lectores no se bloquean detrás de un escritor
+    'synchronous': 'NORMAL',        # seguro con WAL, evita un fsync por commit
+    'busy_timeout': 5000,           # ms esperando el lock antes de "database is locked"
+    'mmap_size': 268435456,         # 256 MB
+    'cache_size': -65536,           # negativo = KiB -> 64 MB
+}
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() not in ('0', 'false', 'no', 'off')
+
+
+def database_uri() -> str:
+    return os.environ.get('DATABASE_URL', 'sqlite:///stock.db')
+
+
+def engine_options() -> dict:
+    """Opciones del pool desde el entorno (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE)."""
+    options = {}
+    for env, key in (('DB_POOL_SIZE', 'pool_size'), ('DB_MAX_OVERFLOW', 'max_overflow'),
+                     ('DB_POOL_TIMEOUT', 'pool_timeout'), ('DB_POOL_RECYCLE', 'pool_recycle')):
+        if os.environ.get(env):
+            options[key] = int(os.environ[env])
+    return options
+
+
+def sqlite_pragmas() -> dict:
+    """PRAGMAs a aplicar en cada conexión; vacío si SQLITE_TUNING=0. Cada valor se puede pisar con SQLITE_<PRAGMA>."""
+    if not _env_flag('SQLITE_TUNING', True):
+        return {}
+    return {
+        name: os.environ.get(f'SQLITE_{name.upper()}', default)
+        for name, default in SQLITE_DEFAULTS.items()
+    }
+
+
+def apply_sqlite_pragmas(engine, pragmas: dict):
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def use_explicit_begin(engine):
+    """
+    pysqlite abre las transacciones por su cuenta (recién antes del primer INSERT/UPDATE) y eso rompe
+    los SAVEPOINT anidados: se desactiva y SQLAlchemy emite el BEGIN (receta de la documentación de SQLAlchemy).
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _driver_autocommit(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def _begin(conn):
+        conn.exec_driver_sql('BEGIN')
+
+
+def product_cache_settings() -> dict:
+    """Tamaño máximo (PRODUCT_CACHE_SIZE) y TTL en segundos (PRODUCT_CACHE_TTL) del cache de productos."""
+    return {
+        'max_size': int(os.environ.get('PRODUCT_CACHE_SIZE', 1024)),
+        'ttl': float(os.environ.get('PRODUCT_CACHE_TTL', 30)),
+    }
+
+
+def slow_request_ms() -> float:
+    """Umbral (SLOW_REQUEST_MS) a partir del cual una request se loguea como lenta."""
+    return float(os.environ.get('SLOW_REQUEST_MS', 500))
+
+
+def async_writes_settings() -> dict | None:
+    """
+    Cola de escrituras diferidas (PriceHistory): None si ASYNC_WRITES no está activado.
+    ASYNC_WRITES_INTERVAL (s), ASYNC_WRITES_BATCH (filas) y ASYNC_WRITES_SPOOL (directorio del spool).
+    """
+    if not _env_flag('ASYNC_WRITES', False):
+        return None
+    return {
+        'interval': float(os.environ.get('ASYNC_WRITES_INTERVAL', 0.5)),
+        'batch_size': int(os.environ.get('ASYNC_WRITES_BATCH', 500)),
+        'spool_dir': os.environ.get('ASYNC_WRITES_SPOOL'),
+    }
+
+
+class Config:
+    """
+    Configuración que recibe create_app(config). Por defecto todo sale del entorno (funciones de arriba);
+    los atributos se pueden pisar antes de crear la app.
+    - migrations: registra Flask-Migrate (comando `flask db`); importar alembic cuesta ~0.2 s de arranque.
+    - explicit_begin: BEGIN explícito en SQLite (ver use_explicit_begin); lo necesitan los SAVEPOINT de app.testing.
+    - testing: app de tests/scripts.
+    """
+
+    def __init__(self):
+        self.database_uri = database_uri()
+        self.engine_options = engine_options()
+        self.sqlite_pragmas = sqlite_pragmas()
+        self.product_cache = product_cache_settings()
+        self.slow_request_ms = slow_request_ms()
+        self.async_writes = async_writes_settings()
+        self.migrations = True
+        self.explicit_begin = False
+        self.testing = False
+
+    @classmethod
+    def in_memory(cls):
+        """
+        SQLite en memoria (`sqlite://`) con StaticPool: una sola conexión compartida, así el esquema
+        y los datos se ven desde todas las sesiones. Sin PRAGMAs de producción (WAL/mmap no aplican),
+        sin Flask-Migrate y sin escrituras diferidas; BEGIN explícito para que los SAVEPOINT funcionen.
+        Para tests y scripts (ver app.testing).
+        """
+        from sqlalchemy.pool import StaticPool
+        config = cls()
+        config.database_uri = 'sqlite://'
+        config.engine_options = {'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}}
+        config.sqlite_pragmas = {}
+        config.async_writes = None
+        config.migrations = False
+        config.explicit_begin = True
+        config.testing = True
+        return config
@@ -6,4 +6,11 @@ class Batch(db.Model):
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     cost = db.Column(db.Float, nullable=False)        # costo por kg en este lote
     quantity = db.Column(db.Float, nullable=False)    # stock en kg
-    date_added = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    date_added = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # orden de venta (más caro primero): las ventas leen solo los lotes que consumen, con LIMIT
+        db.Index('ix_batch_product_id_cost_date', product_id, cost.desc(), date_added),
+        # ids sin reutilizar: ventas y libro siguen apuntando a lotes podados (ver stock.prune_empty)
+        {'sqlite_autoincrement': True},
+    )
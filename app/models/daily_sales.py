@@ -0,0 +1,9 @@
+from app import db
+
+class DailySales(db.Model):
+    """Acumulado diario de ventas por producto (se mantiene al crear/anular ventas)."""
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    quantity = db.Column(db.Float, nullable=False, default=0.0)   # kg vendidos
+    revenue = db.Column(db.Float, nullable=False, default=0.0)    # suma de precio*cantidad
+    cost = db.Column(db.Float, nullable=False, default=0.0)       # suma de costo*cantidad
@@ -2,6 +2,10 @@ from datetime import datetime
 from app import db
 
 class PriceHistory(db.Model):
+    __table_args__ = (
+        db.Index('ix_price_history_product_id_date', 'product_id', 'date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     cost = db.Column(db.Float, nullable=False)
@@ -5,7 +5,25 @@ class Product(db.Model):
     name = db.Column(db.String(120), nullable=False, unique=True)
     markup = db.Column(db.Float, default=0.0)  # porcentaje de ganancia vigente
 
-    batches = db.relationship('Batch', backref='product', cascade="all, delete-orphan")
+    # Desnormalizados: se mantienen en cada venta/compra/anulación (ver `flask check-stock`)
+    stock_qty = db.Column(db.Float, nullable=False, default=0.0, server_default='0')  # suma de batch.quantity
+    max_cost = db.Column(db.Float, nullable=True)  # costo del lote más caro (None si no hay lotes)
+
+    # en orden de venta: más caro primero, a igual costo el más viejo
+    batches = db.relationship(
+        'Batch', backref='product', cascade="all, delete-orphan",
+        order_by='(Batch.cost.desc(), Batch.date_added, Batch.id)'
+    )
 
     def total_stock(self):
-        return sum(b.quantity for b in self.batches)
\ No newline at end of file
+        return self.stock_qty
+
+    def refresh_stock(self):
+        """Recalcula stock_qty y max_cost desde la tabla batch con un agregado (sin cargar los lotes)."""
+        from app.models.batch import Batch
+        stock, max_cost = db.session.query(
+            db.func.coalesce(db.func.sum(Batch.quantity), 0.0),
+            db.func.max(Batch.cost)
+        ).filter(Batch.product_id == self.id).one()
+        self.stock_qty = stock
+        self.max_cost = max_cost
@@ -2,6 +2,13 @@ from datetime import datetime
 from app import db
 
 class Purchase(db.Model):
+    __table_args__ = (
+        db.Index('ix_purchase_product_id_date', 'product_id', 'date'),
+        db.Index('ix_purchase_date_id', 'date', 'id'),
+        # ids sin reutilizar: el libro de movimientos identifica compras anuladas por purchase_id
+        {'sqlite_autoincrement': True},
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -13,8 +20,8 @@ class Purchase(db.Model):
     # - Si action == "add_batch": guardamos el batch_id creado.
     created_batch_id = db.Column(db.Integer, db.ForeignKey('batch.id'), nullable=True)
 
-    # - Si action == "consolidate": guardamos un snapshot JSON (como TEXT) de los lotes previos
-    #   para poder restaurarlos si no hubo operaciones posteriores.
+    # - Si action == "consolidate": snapshot JSON (como TEXT) de los lotes previos.
+    #   Solo compras anteriores al libro de movimientos (stock_movement); hoy la anulación usa el libro.
     prev_batches_snapshot = db.Column(db.Text, nullable=True)
 
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
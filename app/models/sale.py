@@ -2,6 +2,12 @@ from datetime import datetime
 from app import db
 
 class Sale(db.Model):
+    __table_args__ = (
+        db.Index('ix_sale_date_id', 'date', 'id'),
+        # ids sin reutilizar: el libro de movimientos identifica ventas anuladas por sale_id
+        {'sqlite_autoincrement': True},
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.DateTime, default=datetime.utcnow)
     total = db.Column(db.Float, nullable=False)
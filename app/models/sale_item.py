@@ -2,8 +2,9 @@ from app import db
 
 class SaleItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    sale_id = db.Column(db.Integer, db.ForeignKey('sale.id'), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
-    batch_id = db.Column(db.Integer, db.ForeignKey('batch.id'), nullable=False)
+    sale_id = db.Column(db.Integer, db.ForeignKey('sale.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False, index=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey('batch.id'), nullable=False, index=True)
     quantity = db.Column(db.Float, nullable=False)
-    price_at_sale = db.Column(db.Float, nullable=False)  # precio de venta unitario (costo*markup)
\ No newline at end of file
+    price_at_sale = db.Column(db.Float, nullable=False)  # precio de venta unitario (costo*markup)
+    unit_cost = db.Column(db.Float, nullable=True)       # costo del lote al momento de la venta (sobrevive a consolidaciones)
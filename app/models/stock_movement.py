@@ -0,0 +1,27 @@
+from datetime import datetime
+from app import db
+
+class StockMovement(db.Model):
+    """
+    Libro de movimientos de stock, solo se agregan filas (nunca se editan ni borran).
+    La cantidad de cada lote es la suma de sus movimientos; batch.quantity es esa proyección materializada.
+    """
+    __table_args__ = (
+        db.Index('ix_stock_movement_product_id_date', 'product_id', 'date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+
+    # Sin FK: el libro conserva la referencia aunque el lote se borre
+    batch_id = db.Column(db.Integer, nullable=False, index=True)
+
+    # "purchase_in" | "sale_out" | "consolidation_out" | "consolidation_in" | "reversal" | "adjustment"
+    kind = db.Column(db.String(20), nullable=False)
+    quantity = db.Column(db.Float, nullable=False)   # kg con signo (+ entra, - sale)
+    cost = db.Column(db.Float, nullable=True)        # costo por kg del lote
+    date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # origen del movimiento (sin FK: la compra/venta puede anularse y borrarse)
+    purchase_id = db.Column(db.Integer, nullable=True, index=True)
+    sale_id = db.Column(db.Integer, nullable=True)
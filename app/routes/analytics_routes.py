@@ -0,0 +1,38 @@
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+
+analytics_bp = Blueprint('analytics', __name__)
+
+
+def _range_args():
+    start = request.args.get('start_date')
+    end = request.args.get('end_date')
+    return (
+        datetime.fromisoformat(start) if start else None,
+        datetime.fromisoformat(end) if end else None
+    )
+
+
+@analytics_bp.route('/analytics/products', methods=['GET'])
+def get_product_analytics():
+    """
+    Margen, rotación, días de inventario, sell-through y clase ABC por producto.
+    Query params (opcionales): start_date, end_date (ISO) para las ventas y compras consideradas.
+    """
+    try:
+        start, end = _range_args()
+    except ValueError:
+        return jsonify({'error': 'Formato de fecha inválido'}), 400
+    from app.services.analytics import product_metrics   # NumPy se importa en la primera consulta, no al arrancar
+    return jsonify(product_metrics(start, end))
+
+
+@analytics_bp.route('/analytics/abc', methods=['GET'])
+def get_abc_analytics():
+    """Resumen de la clasificación ABC (por facturación). Mismos query params que /analytics/products."""
+    try:
+        start, end = _range_args()
+    except ValueError:
+        return jsonify({'error': 'Formato de fecha inválido'}), 400
+    from app.services.analytics import product_metrics, abc_summary
+    return jsonify(abc_summary(product_metrics(start, end)))
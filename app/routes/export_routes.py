@@ -0,0 +1,146 @@
+import csv
+import io
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from app import db
+from app.models.sale import Sale
+from app.models.sale_item import SaleItem
+from app.models.purchase import Purchase
+from app.models.price_history import PriceHistory
+from app.services.serializers import dumps
+
+export_bp = Blueprint('export', __name__)
+
+YIELD_PER = 1000
+
+_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def _stream(select, columns, fmt):
+    """
+    Genera el cuerpo de la respuesta leyendo la consulta de a YIELD_PER filas,
+    sin armar la lista completa en memoria.
+    """
+    result = db.session.execute(select.execution_options(yield_per=YIELD_PER))
+
+    if fmt == 'csv':
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(columns)
+        yield buf.getvalue()
+        for partition in result.partitions():
+            buf.seek(0)
+            buf.truncate()
+            writer.writerows(
+                [v.isoformat() if isinstance(v, datetime) else v for v in row] for row in partition
+            )
+            yield buf.getvalue()
+        return
+
+    for partition in result.partitions():
+        yield b''.join(dumps(dict(zip(columns, row)), sort_keys=False) + b'\n' for row in partition)
+
+
+def _export(select, columns, filename):
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in _FORMATS:
+        return jsonify({'error': 'format debe ser ndjson o csv'}), 400
+
+    return Response(
+        stream_with_context(_stream(select, columns, fmt)),
+        mimetype=_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={filename}.{fmt}'}
+    )
+
+
+def _date_range():
+    start = request.args.get('start_date')
+    end = request.args.get('end_date')
+    return (
+        datetime.fromisoformat(start) if start else None,
+        datetime.fromisoformat(end) if end else None
+    )
+
+
+@export_bp.route('/export/sales', methods=['GET'])
+def export_sales():
+    """Una línea por item vendido. Query params: format=ndjson|csv, start_date, end_date."""
+    try:
+        start, end = _date_range()
+    except ValueError:
+        return jsonify({'error': 'Formato de fecha inválido'}), 400
+
+    columns = ['sale_id', 'date', 'product_id', 'batch_id', 'quantity', 'price_at_sale', 'unit_cost']
+    return _export(_sales_export(start, end), columns, 'sales')
+
+
+def _sales_export(start, end):
+    select = (
+        db.select(
+            Sale.id, Sale.date, SaleItem.product_id, SaleItem.batch_id,
+            SaleItem.quantity, SaleItem.price_at_sale, SaleItem.unit_cost
+        )
+        .join(SaleItem, SaleItem.sale_id == Sale.id)
+        .order_by(Sale.date, Sale.id, SaleItem.id)
+    )
+    if start:
+        select = select.where(Sale.date >= start)
+    if end:
+        select = select.where(Sale.date <= end)
+    return select
+
+
+@export_bp.route('/export/purchases', methods=['GET'])
+def export_purchases():
+    """Query params: format=ndjson|csv, start_date, end_date."""
+    try:
+        start, end = _date_range()
+    except ValueError:
+        return jsonify({'error': 'Formato de fecha inválido'}), 400
+
+    columns = ['id', 'date', 'product_id', 'action', 'unit_cost', 'quantity', 'created_batch_id']
+    return _export(_purchases_export(start, end), columns, 'purchases')
+
+
+def _purchases_export(start, end):
+    select = (
+        db.select(
+            Purchase.id, Purchase.date, Purchase.product_id, Purchase.action,
+            Purchase.unit_cost, Purchase.quantity, Purchase.created_batch_id
+        )
+        .order_by(Purchase.date, Purchase.id)
+    )
+    if start:
+        select = select.where(Purchase.date >= start)
+    if end:
+        select = select.where(Purchase.date <= end)
+    return select
+
+
+@export_bp.route('/export/price-history', methods=['GET'])
+def export_price_history():
+    """Query params: format=ndjson|csv, start_date, end_date, product_id (opcional)."""
+    try:
+        start, end = _date_range()
+    except ValueError:
+        return jsonify({'error': 'Formato de fecha inválido'}), 400
+
+    columns = ['id', 'product_id', 'cost', 'price', 'date']
+    return _export(_price_history_export(start, end, request.args.get('product_id', type=int)), columns, 'price_history')
+
+
+def _price_history_export(start, end, product_id):
+    select = (
+        db.select(PriceHistory.id, PriceHistory.product_id, PriceHistory.cost, PriceHistory.price, PriceHistory.date)
+        .order_by(PriceHistory.date, PriceHistory.id)
+    )
+    if product_id is not None:
+        select = select.where(PriceHistory.product_id == product_id)
+    if start:
+        select = select.where(PriceHistory.date >= start)
+    if end:
+        select = select.where(PriceHistory.date <= end)
+    return select
@@ -0,0 +1,54 @@
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from app.services.valuation import valuation_cache
+
+inventory_bp = Blueprint('inventory', __name__)
+
+@inventory_bp.route('/inventory/valuation', methods=['GET'])
+def get_inventory_valuation():
+    """
+    Valorización del inventario (kg × costo de cada lote) a una fecha, ej. cierre de mes.
+    Query params: at (ISO, opcional; default ahora). Con zona horaria se convierte a UTC.
+    Las fechas pasadas se cachean hasta que aparezca un movimiento con fecha anterior.
+    """
+    at = request.args.get('at')
+    try:
+        at = datetime.fromisoformat(at) if at else None
+    except ValueError:
+        return jsonify({'error': 'Formato de fecha inválido'}), 400
+
+    return jsonify(valuation_cache.get(at))
+
+
+@inventory_bp.route('/inventory/valuation/cache-stats', methods=['GET'])
+def get_valuation_cache_stats():
+    return jsonify(valuation_cache.stats())
+
+
+@inventory_bp.route('/replenishment', methods=['GET'])
+def get_replenishment():
+    """
+    Demanda diaria estimada (suavizado exponencial sobre daily_sales), días hasta quedarse sin stock
+    y cantidad sugerida a reponer, para todo el catálogo.
+    Query params (opcionales):
+    - lead_time_days: días que tarda en llegar una compra (default 7)
+    - review_days: cada cuántos días se revisa/pide (default 7)
+    - reorder=1: solo los productos que hay que reponer
+    """
+    lead_time_days = request.args.get('lead_time_days', 7.0, type=float)
+    review_days = request.args.get('review_days', 7.0, type=float)
+    if lead_time_days < 0 or review_days < 0:
+        return jsonify({'error': 'lead_time_days y review_days deben ser >= 0'}), 400
+    only_reorder = request.args.get('reorder') in ('1', 'true')
+
+    from app.services.replenishment import replenishment_cache, suggestion   # NumPy recién en la primera consulta
+    result = [suggestion(s, lead_time_days, review_days) for s in replenishment_cache.get()]
+    if only_reorder:
+        result = [r for r in result if r['reorder']]
+    return jsonify(result)
+
+
+@inventory_bp.route('/replenishment/cache-stats', methods=['GET'])
+def get_replenishment_cache_stats():
+    from app.services.replenishment import replenishment_cache
+    return jsonify(replenishment_cache.stats())
@@ -1,18 +1,119 @@
-from flask import Blueprint, jsonify
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from app import db
 from app.models.price_history import PriceHistory
+from app.models.product import Product
+from app.services.serializers import PRICE_HISTORY
 
 price_history_bp = Blueprint('price_history', __name__)
 
+
 @price_history_bp.route('/price-history/<int:product_id>', methods=['GET'])
 def get_price_history(product_id):
-    history = PriceHistory.query.filter_by(product_id=product_id).order_by(PriceHistory.date.asc()).all()
-    result = []
-    for h in history:
-        result.append({
-            'id': h.id,
-            'product_id': h.product_id,
-            'cost': h.cost,
-            'price': h.price,
-            'date': h.date.isoformat()
-        })
-    return jsonify(result)
\ No newline at end of file
+    """
+    Query params (todos opcionales):
+    - start_date, end_date: rango de fechas
+    - max_points: como máximo N puntos; se divide el rango en N intervalos y se toma
+      el último registro de cada uno
+    """
+    try:
+        start = datetime.fromisoformat(request.args['start_date']) if request.args.get('start_date') else None
+        end = datetime.fromisoformat(request.args['end_date']) if request.args.get('end_date') else None
+    except ValueError:
+        return jsonify({'error': 'Formato de fecha inválido'}), 400
+    max_points = request.args.get('max_points', type=int)
+    if max_points is not None and max_points <= 0:
+        return jsonify({'error': 'max_points debe ser > 0'}), 400
+
+    conditions = _conditions(product_id, start, end)
+    if max_points is not None:
+        count, lo, hi = db.session.execute(_span(conditions)).one()
+        if count > max_points and hi > lo:
+            return jsonify(PRICE_HISTORY.fetch(_downsample(conditions, lo, hi, max_points)))
+
+    return jsonify(PRICE_HISTORY.fetch(_history(conditions)))
+
+
+def _conditions(product_id, start, end) -> list:
+    conditions = [PriceHistory.product_id == product_id]
+    if start:
+        conditions.append(PriceHistory.date >= start)
+    if end:
+        conditions.append(PriceHistory.date <= end)
+    return conditions
+
+
+def _history(conditions):
+    return PRICE_HISTORY.select().where(*conditions).order_by(PriceHistory.date.asc())
+
+
+def _span(conditions):
+    """Cantidad de registros y primera/última fecha (para decidir si hace falta muestrear)."""
+    return db.select(
+        db.func.count(PriceHistory.id), db.func.min(PriceHistory.date), db.func.max(PriceHistory.date)
+    ).where(*conditions)
+
+
+def _downsample(conditions, lo, hi, max_points):
+    """Consulta del último registro de cada uno de los max_points intervalos iguales entre lo y hi."""
+    width = (hi - lo).total_seconds() / 86400.0 / max_points   # en días, como julianday
+    bucket = db.func.min(
+        db.cast((db.func.julianday(PriceHistory.date) - db.func.julianday(lo)) / width, db.Integer),
+        max_points - 1
+    )
+    ranked = (
+        db.select(
+            PriceHistory.id,
+            db.func.row_number().over(
+                partition_by=bucket,
+                order_by=(PriceHistory.date.desc(), PriceHistory.id.desc())
+            ).label('rn')
+        )
+        .where(*conditions)
+        .subquery()
+    )
+    return (
+        PRICE_HISTORY.select()
+        .join(ranked, ranked.c.id == PriceHistory.id)
+        .where(ranked.c.rn == 1)
+        .order_by(PriceHistory.date.asc())
+    )
+
+
+@price_history_bp.route('/price-history/latest', methods=['GET'])
+def get_latest_prices():
+    """
+    Costo/precio vigente de muchos productos en una consulta agrupada.
+    Query params: product_ids=1,2,3 (opcional; sin él, todo el catálogo)
+    """
+    ids = None
+    if request.args.get('product_ids'):
+        try:
+            ids = [int(x) for x in request.args['product_ids'].split(',') if x.strip()]
+        except ValueError:
+            return jsonify({'error': 'product_ids inválido'}), 400
+    return jsonify(PRICE_HISTORY.fetch(_latest(ids)))
+
+
+def _latest(product_ids):
+    """
+    Último registro de cada producto (de `product_ids`, o de todos si es None): por producto, el id
+    del último registro sale del índice (product_id, date), sin recorrer el historial completo.
+    """
+    last_id = (
+        db.select(PriceHistory.id)
+        .where(PriceHistory.product_id == Product.id)
+        .order_by(PriceHistory.date.desc(), PriceHistory.id.desc())
+        .limit(1)
+        .correlate(Product)
+        .scalar_subquery()
+    )
+    latest = (
+        PRICE_HISTORY.select()
+        .select_from(Product)
+        .join(PriceHistory, PriceHistory.id == last_id)
+        .order_by(Product.id)
+    )
+    if product_ids is not None:
+        latest = latest.where(Product.id.in_(product_ids))
+    return latest
@@ -1,26 +1,99 @@
+from datetime import datetime
 from flask import Blueprint, request, jsonify
+from sqlalchemy.orm import selectinload
 from app import db
 from app.models.product import Product
-from app.models.batch import Batch
 from app.models.price_history import PriceHistory
+from app.services.pagination import (
+    PaginationError, page_args, decode_cursor, fields_arg, project, encode_cursor, paginated_response
+)
+from app.services import ledger
+from app.services.product_cache import product_cache, product_entry
+from app.services.write_queue import write_queue
 
 product_bp = Blueprint('product', __name__)
 
 @product_bp.route('/products', methods=['GET'])
 def get_products():
-    products = Product.query.all()
-    result = []
-    for p in products:
-        batches = [{'id': b.id, 'cost': b.cost, 'quantity': b.quantity, 'date_added': b.date_added.isoformat()}
-                   for b in sorted(p.batches, key=lambda x: (-x.cost, x.date_added))]
-        result.append({
-            'id': p.id,
-            'name': p.name,
-            'markup': p.markup,
-            'total_stock': p.total_stock(),
-            'batches': batches
-        })
-    return jsonify(result)
+    """
+    Query params (todos opcionales):
+    - limit, cursor: paginación por id; el siguiente cursor viene en X-Next-Cursor
+    - fields: proyección, ej. fields=id,name,total_stock (sin 'batches' no se leen los lotes)
+    - max_stock: solo productos con stock <= max_stock (stock bajo)
+    El listado completo se sirve desde el cache de precios; con max_stock o sin 'batches' en fields,
+    una consulta paginada que filtra por stock_qty en SQL.
+    Responde con ETag; si coincide con If-None-Match devuelve 304 sin cuerpo.
+    """
+    try:
+        limit, cursor = page_args(request.args)
+        after_id = int(decode_cursor(cursor)[0]) if cursor else None
+    except (PaginationError, TypeError, ValueError, IndexError):
+        return jsonify({'error': 'cursor o limit inválido'}), 400
+
+    fields = fields_arg(request.args)
+    with_batches = fields is None or 'batches' in fields
+    max_stock = request.args.get('max_stock', type=float)
+
+    if max_stock is None and with_batches:
+        entries = _cached_page(after_id, limit)
+    else:
+        query = _products_query(with_batches, max_stock, after_id, limit)
+        entries = [product_entry(p, with_batches) for p in db.session.scalars(query)]
+
+    next_cursor = None
+    if limit and len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_cursor(entries[-1]['id'])
+
+    response = paginated_response([project(e, fields) for e in entries], next_cursor)
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def _products_query(with_batches, max_stock, after_id, limit):
+    """Página de GET /products leída en SQL (stock bajo o sin lotes), por id desde el cursor."""
+    query = db.select(Product).order_by(Product.id)
+    if with_batches:
+        query = query.options(selectinload(Product.batches))
+    if max_stock is not None:
+        query = query.where(Product.stock_qty <= max_stock)
+    if after_id is not None:
+        query = query.where(Product.id > after_id)
+    if limit:
+        query = query.limit(limit + 1)
+    return query
+
+
+def _cached_page(after_id, limit) -> list[dict]:
+    """Página del catálogo desde el cache de precios; los faltantes se cargan en bloque."""
+    ids = product_cache.catalog_ids()
+    if after_id is not None:
+        ids = [pid for pid in ids if pid > after_id]
+    if limit:
+        ids = ids[:limit + 1]
+    return product_cache.get_many(ids)
+
+
+@product_bp.route('/products/cache-stats', methods=['GET'])
+def get_product_cache_stats():
+    return jsonify(product_cache.stats())
+
+@product_bp.route('/products/stock-at', methods=['GET'])
+def get_stock_at():
+    """
+    Stock en kg que había a una fecha, sumando el libro de movimientos.
+    Query params: at (ISO, requerido), product_id (opcional).
+    """
+    try:
+        at = datetime.fromisoformat(request.args['at'])
+    except (KeyError, ValueError):
+        return jsonify({'error': 'at es requerido (fecha ISO)'}), 400
+    product_id = request.args.get('product_id', type=int)
+
+    stock = ledger.stock_at(at, product_id)
+    return jsonify([
+        {'product_id': pid, 'stock': qty} for pid, qty in sorted(stock.items())
+    ])
 
 @product_bp.route('/products', methods=['POST'])
 def add_product():
@@ -34,6 +107,7 @@ def add_product():
     p = Product(name=name, markup=markup)
     db.session.add(p)
     db.session.commit()
+    product_cache.invalidate_catalog()
     return jsonify({'message': 'Producto creado', 'id': p.id}), 201
 
 @product_bp.route('/products/<int:product_id>', methods=['PUT'])
@@ -48,14 +122,15 @@ def update_product(product_id):
         product.markup = float(data['markup'])
 
         # 👇 Registrar en PriceHistory si hay lotes
-        if product.batches:
-            highest_cost = max(b.cost for b in product.batches)
-            ph = PriceHistory(
-                product_id=product.id,
-                cost=highest_cost,
-                price=highest_cost * (1 + product.markup / 100.0)
-            )
-            db.session.add(ph)
+        if product.max_cost is not None:
+            highest_cost = product.max_cost
+            write_queue.add(PriceHistory, {
+                'product_id': product.id,
+                'cost': highest_cost,
+                'price': highest_cost * (1 + product.markup / 100.0),
+                'date': datetime.now()
+            })
 
     db.session.commit()
+    product_cache.invalidate([product.id])
     return jsonify({'message': 'Producto actualizado'})
\ No newline at end of file
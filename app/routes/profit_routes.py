@@ -1,14 +1,17 @@
 from flask import Blueprint, request, jsonify
-from app.models.sale import Sale
-from app.models.sale_item import SaleItem
-from app.models.batch import Batch
-from app.models.product import Product
+from app.services.profit_report import profit_report, profit_summary
+from app.services import rollup
 from datetime import datetime
 
 profits_bp = Blueprint("profits", __name__)
 
 @profits_bp.route("/profits", methods=["GET"])
 def get_profits():
+    """
+    Query params:
+    - start_date, end_date: rango (ISO)
+    - summary=1: devuelve solo los totales, sin el detalle por venta/ítem
+    """
     start_date = request.args.get("start_date")
     end_date = request.args.get("end_date")
 
@@ -18,46 +21,30 @@ def get_profits():
     except Exception:
         return jsonify({"error": "Formato de fecha inválido"}), 400
 
-    sales = Sale.query.filter(Sale.date >= start, Sale.date <= end).all()
-
-    result = []
-    total_profit = 0.0
-
-    for s in sales:
-        items = []
-        sale_total = 0.0
-        sale_profit = 0.0
-
-        for item in s.items:
-            product = Product.query.get(item.product_id)
-            batch = Batch.query.get(item.batch_id)
-            cost = batch.cost if batch else 0.0
-            profit = (item.price_at_sale - cost) * item.quantity
-
-            subtotal = item.price_at_sale * item.quantity
-
-            items.append({
-                "product_id": item.product_id,
-                "product_name": product.name if product else f"#{item.product_id}",
-                "quantity": round(item.quantity, 2),
-                "unit_price": round(item.price_at_sale, 2),
-                "subtotal": round(subtotal, 2),
-                "cost": round(cost, 2)
-            })
-
-            sale_total += subtotal
-            sale_profit += profit
-
-        total_profit += sale_profit
-        result.append({
-            "sale_id": s.id,
-            "date": s.date.isoformat(),
-            "items": items,
-            "total": round(sale_total, 2),
-            "profit": round(sale_profit, 2)
-        })
-
-    return jsonify({
-        "sales": result,
-        "total_profit": round(total_profit, 2)
-    })
\ No newline at end of file
+    if request.args.get("summary") in ("1", "true"):
+        return jsonify(profit_summary(start, end))
+
+    return jsonify(profit_report(start, end))
+
+
+@profits_bp.route("/profits/summary", methods=["GET"])
+def get_profits_summary():
+    """
+    Totales por período leídos del acumulado diario (daily_sales).
+    Query params:
+    - start_date, end_date: días YYYY-MM-DD (inclusive)
+    - granularity: day | week | month (default day)
+    - product_id: opcional
+    """
+    try:
+        start = datetime.fromisoformat(request.args.get("start_date")).date()
+        end = datetime.fromisoformat(request.args.get("end_date")).date()
+    except Exception:
+        return jsonify({"error": "Formato de fecha inválido"}), 400
+
+    granularity = request.args.get("granularity", "day")
+    if granularity not in ("day", "week", "month"):
+        return jsonify({"error": "granularity debe ser day, week o month"}), 400
+
+    product_id = request.args.get("product_id", type=int)
+    return jsonify(rollup.summary(start, end, granularity, product_id))
@@ -1,18 +1,23 @@
-import json
+from datetime import datetime
 from flask import Blueprint, request, jsonify
 from app import db
 from app.models.product import Product
 from app.models.batch import Batch
 from app.models.purchase import Purchase
 from app.models.price_history import PriceHistory
+from app.services.pagination import (
+    PaginationError, page_args, date_range_args, keyset_desc, fields_arg, project,
+    encode_cursor, paginated_response
+)
+from app.services import ledger
+from app.services.purchases import apply_purchase_rules, import_purchases, ledger_rows, parse_csv
+from app.services.stock import lock_products, prune_empty
+from app.services.product_cache import product_cache
+from app.services.write_queue import write_queue
+from app.services.serializers import PURCHASE
 
 purchase_bp = Blueprint('purchase', __name__)
 
-def _current_highest_cost(product: Product) -> float | None:
-    if not product.batches:
-        return None
-    return max(b.cost for b in product.batches)
-
 @purchase_bp.route('/purchases', methods=['POST'])
 def create_purchase():
     """
@@ -34,132 +39,129 @@ def create_purchase():
     if not all([product_id, unit_cost is not None, quantity is not None]):
         return jsonify({'error': 'product_id, unit_cost y quantity son requeridos'}), 400
 
+    # los lotes se leen y reescriben: bloquear el producto antes de leerlos
+    lock_products([product_id])
     product = Product.query.get_or_404(product_id)
     unit_cost = float(unit_cost)
     quantity = float(quantity)
     if quantity <= 0 or unit_cost <= 0:
         return jsonify({'error': 'quantity y unit_cost deben ser > 0'}), 400
 
-    highest = _current_highest_cost(product)
-
-    if highest is None:
-        # primer lote
-        new_batch = Batch(product_id=product.id, cost=unit_cost, quantity=quantity)
-        db.session.add(new_batch)
-        db.session.flush()  # obtener id
-        purchase = Purchase(
-            action='add_batch',
-            created_batch_id=new_batch.id,
-            product_id=product.id,
-            unit_cost=unit_cost,
-            quantity=quantity
-        )
-        db.session.add(purchase)
-
-        # registrar en PriceHistory
-        ph = PriceHistory(
-            product_id=product.id,
-            cost=unit_cost,
-            price=unit_cost * (1 + product.markup / 100.0)
-        )
-        db.session.add(ph)
-
-        db.session.commit()
-        return jsonify({'message': 'Compra registrada (primer lote)', 'purchase_id': purchase.id}), 201
-
-    if unit_cost > highest:
-        # CONSOLIDAR: mover todo a un solo lote con el nuevo costo, sumando la nueva cantidad.
-        prev = [{'batch_id': b.id, 'cost': b.cost, 'quantity': b.quantity} for b in product.batches]
-        total_qty = sum(b['quantity'] for b in prev) + quantity
-
-        # eliminar lotes previos
-        for b in list(product.batches):
-            db.session.delete(b)
-        db.session.flush()
-
-        # crear lote único consolidado
-        consolidated = Batch(product_id=product.id, cost=unit_cost, quantity=total_qty)
-        db.session.add(consolidated)
-        db.session.flush()
-
-        purchase = Purchase(
-            action='consolidate',
-            created_batch_id=consolidated.id,
-            prev_batches_snapshot=json.dumps(prev),
-            product_id=product.id,
-            unit_cost=unit_cost,
-            quantity=quantity
-        )
-        db.session.add(purchase)
+    kind, batch, _, moves = apply_purchase_rules(product, list(product.batches), unit_cost, quantity)
+    db.session.flush()  # obtener id
 
-        # registrar en PriceHistory
-        ph = PriceHistory(
-            product_id=product.id,
-            cost=unit_cost,
-            price=unit_cost * (1 + product.markup / 100.0)
-        )
-        db.session.add(ph)
-
-        db.session.commit()
-        return jsonify({'message': 'Compra registrada (consolidación a costo más alto)', 'purchase_id': purchase.id}), 201
-
-    # unit_cost <= highest  -> lote nuevo más barato
-    new_batch = Batch(product_id=product.id, cost=unit_cost, quantity=quantity)
-    db.session.add(new_batch)
-    db.session.flush()
     purchase = Purchase(
-        action='add_batch',
-        created_batch_id=new_batch.id,
+        action='consolidate' if kind == 'consolidate' else 'add_batch',
+        created_batch_id=batch.id,
         product_id=product.id,
         unit_cost=unit_cost,
         quantity=quantity
     )
     db.session.add(purchase)
-
-    # registrar en PriceHistory
-    ph = PriceHistory(
-        product_id=product.id,
-        cost=unit_cost,
-        price=unit_cost * (1 + product.markup / 100.0)
-    )
-    db.session.add(ph)
+    db.session.flush()  # id y fecha de la compra para el libro
+    ledger.record(ledger_rows(moves, product.id, purchase.id, purchase.date))
+    if kind == 'consolidate':
+        prune_empty([product.id])   # los lotes previos quedaron en 0
+
+    # registrar en PriceHistory (con ASYNC_WRITES se inserta después del commit, fuera de la transacción)
+    write_queue.add(PriceHistory, {
+        'product_id': product.id,
+        'cost': unit_cost,
+        'price': unit_cost * (1 + product.markup / 100.0),
+        'date': datetime.now()
+    })
 
     db.session.commit()
-    return jsonify({'message': 'Compra registrada (nuevo lote más barato)', 'purchase_id': purchase.id}), 201
+    product_cache.invalidate([product.id])
+    return jsonify({'message': _PURCHASE_MESSAGES[kind], 'purchase_id': purchase.id}), 201
+
+
+_PURCHASE_MESSAGES = {
+    'first': 'Compra registrada (primer lote)',
+    'consolidate': 'Compra registrada (consolidación a costo más alto)',
+    'add_batch': 'Compra registrada (nuevo lote más barato)',
+}
+
+
+@purchase_bp.route('/purchases/bulk', methods=['POST'])
+def create_purchases_bulk():
+    """
+    Importación masiva (ej. planilla del proveedor), aplicando las reglas de POST /purchases en orden.
+    Acepta JSON {"lines": [{"product_id": 1, "unit_cost": 1200.0, "quantity": 10.5}, ...]}
+    o un CSV (Content-Type: text/csv) con encabezado product_id,unit_cost,quantity.
+    """
+    if request.mimetype == 'text/csv':
+        lines = parse_csv(request.get_data(as_text=True))
+    else:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'El cuerpo debe ser un objeto JSON con "lines"'}), 400
+        lines = data.get('lines', [])
+        if not isinstance(lines, list):
+            return jsonify({'error': 'lines debe ser una lista'}), 400
+    if not lines:
+        return jsonify({'error': 'Debe incluir líneas de compra'}), 400
+
+    return jsonify(import_purchases(lines))
 
 
 @purchase_bp.route('/purchases', methods=['GET'])
 def list_purchases():
-    purchases = Purchase.query.order_by(Purchase.date.desc()).all()
-    result = []
-    for p in purchases:
-        result.append({
-            'id': p.id,
-            'date': p.date.isoformat(),
-            'product_id': p.product_id,
-            'action': p.action,
-            'unit_cost': p.unit_cost,
-            'quantity': p.quantity,
-            'created_batch_id': p.created_batch_id
-        })
-    return jsonify(result)
+    """
+    Query params (todos opcionales):
+    - limit, cursor: paginación por (date, id) descendente; el siguiente cursor viene en X-Next-Cursor
+    - start_date, end_date: rango de fechas
+    - product_id: filtrar por producto
+    - fields: proyección, ej. fields=id,date,unit_cost
+    """
+    try:
+        limit, cursor = page_args(request.args)
+        start, end = date_range_args(request.args)
+        query = _purchases_query(limit, cursor, start, end, request.args.get('product_id', type=int))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    fields = fields_arg(request.args)
+    purchases = PURCHASE.fetch(query)
+    next_cursor = None
+    if limit and len(purchases) > limit:
+        purchases = purchases[:limit]
+        next_cursor = encode_cursor(purchases[-1]['date'], purchases[-1]['id'])
+
+    if fields is not None:
+        purchases = [project(row, fields) for row in purchases]
+    return paginated_response(purchases, next_cursor)
+
+
+def _purchases_query(limit, cursor, start, end, product_id):
+    """Página de GET /purchases: (date, id) descendente desde el cursor, con limit + 1 para saber si hay otra."""
+    query = keyset_desc(PURCHASE.select(), Purchase.date, Purchase.id, cursor)
+    if start:
+        query = query.where(Purchase.date >= start)
+    if end:
+        query = query.where(Purchase.date <= end)
+    if product_id is not None:
+        query = query.where(Purchase.product_id == product_id)
+    if limit:
+        query = query.limit(limit + 1)
+    return query
 
 
 @purchase_bp.route('/purchases/<int:purchase_id>', methods=['DELETE'])
 def delete_purchase(purchase_id):
     """
-    Anulación con verificación de stock:
+    Anulación con verificación de stock (los controles salen del libro de movimientos):
     - Si fue "add_batch": solo se puede borrar si el lote creado conserva al menos la cantidad comprada (no fue consumido).
       Se descuenta esa cantidad del lote; si queda en 0, se elimina el lote.
-    - Si fue "consolidate": por simplicidad y para no romper trazabilidad,
-      solo permitimos borrar si NO hubo ventas ni compras posteriores del mismo producto desde esa fecha,
+    - Si fue "consolidate": solo permitimos borrar si NO hubo compras posteriores vigentes del mismo producto
       y si el lote consolidado conserva el total de stock (nadie vendió).
-      En ese caso, restauramos los lotes previos desde el snapshot.
+      En ese caso, los lotes previos recuperan su cantidad con el mismo id (las ventas viejas siguen apuntando a ellos),
+      incluido lo que ventas anuladas repusieron en el consolidado. Si el consolidado tiene más stock del que
+      explica el libro, también se rechaza (no se sabe a qué lote devolverlo).
+    Cada reversión queda registrada en el libro como movimiento "reversal".
     """
-    import datetime
-    data_now = datetime.datetime.utcnow()
-
     p = Purchase.query.get_or_404(purchase_id)
+    lock_products([p.product_id])
     product = Product.query.get_or_404(p.product_id)
 
     if p.action == 'add_batch':
@@ -171,10 +173,13 @@ def delete_purchase(purchase_id):
 
         # revertir
         batch.quantity -= p.quantity
+        ledger.record([ledger.movement('reversal', product.id, batch.id, -p.quantity, batch.cost, purchase_id=p.id)])
         if batch.quantity == 0:
             db.session.delete(batch)
         db.session.delete(p)
+        product.refresh_stock()
         db.session.commit()
+        product_cache.invalidate([product.id])
         return jsonify({'message': 'Compra anulada y stock revertido (lote más barato)'}), 200
 
     if p.action == 'consolidate':
@@ -182,30 +187,52 @@ def delete_purchase(purchase_id):
         if not consolidated:
             return jsonify({'error': 'Lote consolidado inexistente; no se puede anular de forma segura'}), 409
 
-        try:
-            prev = json.loads(p.prev_batches_snapshot or '[]')
-        except Exception:
-            prev = []
-
-        expected_total = sum(x['quantity'] for x in prev) + p.quantity
-        if consolidated.quantity < expected_total:
+        # incluye lo repuesto por ventas anuladas que se redirigió al consolidado (services.sales)
+        moved_out = ledger.purchase_movements(p.id, 'consolidation_out')
+        expected_total = p.quantity - sum(m.quantity for m in moved_out)
+        if consolidated.quantity < expected_total - 1e-9:
             return jsonify({'error': 'No se puede anular: stock del lote consolidado fue consumido'}), 409
+        if consolidated.quantity > expected_total + 1e-9:
+            # stock que entró al consolidado sin pasar por esta consolidación: no se sabe a qué lote devolverlo
+            return jsonify({'error': 'No se puede anular: el lote consolidado tiene stock que no salió de esta consolidación'}), 409
 
-        latest_purchase_after = Purchase.query.filter(
-            Purchase.product_id == product.id,
-            Purchase.id != p.id,
-            Purchase.date > p.date
-        ).first()
-        if latest_purchase_after:
+        if ledger.has_purchases_after(product.id, p.date, exclude_purchase_id=p.id):
             return jsonify({'error': 'No se puede anular: hay compras posteriores del mismo producto'},), 409
 
-        db.session.delete(consolidated)
-        db.session.flush()
-        for pb in prev:
-            restored = Batch(product_id=product.id, cost=pb['cost'], quantity=pb['quantity'])
-            db.session.add(restored)
+        reversals = [(consolidated, -expected_total, consolidated.cost)]
+        previous = {}
+        for m in moved_out:
+            if m.batch_id not in previous:
+                previous[m.batch_id] = _previous_batch(product, m)
+            reversals.append((previous[m.batch_id], -m.quantity, m.cost))
+        for batch, qty, _ in reversals:
+            batch.quantity += qty
+        db.session.flush()  # ids de lotes recreados (consolidaciones anteriores al libro)
+        ledger.record(
+            ledger.movement('reversal', product.id, batch.id, qty, cost, purchase_id=p.id)
+            for batch, qty, cost in reversals
+        )
+        if consolidated.quantity == 0:
+            db.session.delete(consolidated)
         db.session.delete(p)
+        product.refresh_stock()
         db.session.commit()
+        product_cache.invalidate([product.id])
         return jsonify({'message': 'Compra de consolidación anulada y lotes previos restaurados'}), 200
 
-    return jsonify({'error': 'Acción de compra desconocida'}), 400
\ No newline at end of file
+    return jsonify({'error': 'Acción de compra desconocida'}), 400
+
+
+def _previous_batch(product, moved_out):
+    """
+    Lote al que vuelve el stock de un consolidation_out. Los lotes previos se podan al consolidar
+    (y las consolidaciones anteriores al libro los borraban): si el id ya no existe (o se reutilizó), se recrea el lote.
+    """
+    batch = db.session.get(Batch, moved_out.batch_id)
+    if batch is None:
+        batch = Batch(id=moved_out.batch_id, product_id=product.id, cost=moved_out.cost, quantity=0.0)
+        db.session.add(batch)
+    elif batch.product_id != product.id:
+        batch = Batch(product_id=product.id, cost=moved_out.cost, quantity=0.0)
+        db.session.add(batch)
+    return batch
@@ -1,9 +1,19 @@
+from collections import defaultdict
+from datetime import datetime, timezone
 from flask import Blueprint, request, jsonify
 from app import db
-from app.models.product import Product
-from app.models.batch import Batch
 from app.models.sale import Sale
 from app.models.sale_item import SaleItem
+from app.services import ledger, rollup, stock
+from app.services.product_cache import product_cache
+from app.services.sales import (
+    AllocationError, allocate, annul_sales, basket_snapshot, item_product_id, item_quantity,
+)
+from app.services.serializers import SALE, SALE_ITEM, execute
+from app.services.pagination import (
+    PaginationError, page_args, date_range_args, keyset_desc, fields_arg, project,
+    encode_cursor, paginated_response
+)
 
 sale_bp = Blueprint('sale', __name__)
 
@@ -26,86 +36,273 @@ def create_sale():
     if not items_data:
         return jsonify({'error': 'Debe incluir items'}), 400
 
-    total_sale = 0
-    sale = Sale(total=0)
-    db.session.add(sale)
-
-    for item in items_data:
-        product = Product.query.get(item['product_id'])
-        if not product:
-            return jsonify({'error': f'Producto {item["product_id"]} no encontrado'}), 404
-
-        qty_needed = float(item['quantity'])
-        if qty_needed <= 0:
-            return jsonify({'error': 'La cantidad debe ser > 0'}), 400
-
-        # Lotes ordenados: más caro primero
-        batches = sorted(product.batches, key=lambda b: (-b.cost, b.date_added))
-        qty_to_sell = qty_needed
-        for batch in batches:
-            if qty_to_sell <= 0:
-                break
-            if batch.quantity <= 0:
-                continue
-
-            take_qty = min(batch.quantity, qty_to_sell)
-            sale_price_unit = batch.cost * (1 + product.markup / 100.0)
-
-            sale_item = SaleItem(
-                sale=sale,
-                product_id=product.id,
-                batch_id=batch.id,
-                quantity=take_qty,
-                price_at_sale=sale_price_unit
-            )
-            db.session.add(sale_item)
+    # Si otro worker consumió un lote entre la lectura y el UPDATE condicional, se reintenta
+    for _ in range(stock.MAX_RETRIES):
+        try:
+            return _create_sale(items_data)
+        except stock.StockConflict:
+            db.session.rollback()
+    return jsonify({'error': 'Conflicto de stock concurrente, reintentar'}), 409
 
-            # Descontar stock
-            batch.quantity -= take_qty
-            qty_to_sell -= take_qty
 
-            total_sale += take_qty * sale_price_unit
+def _create_sale(items_data):
+    try:
+        per_item, total_sale = allocate(items_data, basket_snapshot(items_data))
+    except AllocationError as e:
+        return jsonify({'error': str(e)}), e.status
+    takes = [line for lines in per_item for line in lines]
 
-        if qty_to_sell > 0:
-            return jsonify({'error': f'Stock insuficiente para producto {product.id}'}), 409
+    # Descontar stock (UPDATE condicional; StockConflict si otro worker se adelantó)
+    stock.take((pid, bid, qty) for pid, bid, qty, _, _ in takes)
 
-    sale.total = total_sale
+    sale = Sale(total=total_sale)
+    db.session.add(sale)
+    for pid, bid, qty, price, cost in takes:
+        db.session.add(SaleItem(
+            sale=sale,
+            product_id=pid,
+            batch_id=bid,
+            quantity=qty,
+            price_at_sale=price,
+            unit_cost=cost
+        ))
+    db.session.flush()  # asigna sale.id y sale.date
+    ledger.record(
+        ledger.movement('sale_out', pid, bid, -qty, cost, sale.date, sale_id=sale.id)
+        for pid, bid, qty, _, cost in takes
+    )
+    rollup.apply_sale(sale)
     db.session.commit()
+    product_cache.invalidate({pid for pid, _, _, _, _ in takes})
 
     return jsonify({'message': 'Venta registrada', 'sale_id': sale.id, 'total': total_sale}), 201
 
 
+@sale_bp.route('/sales/quote', methods=['POST'])
+def quote_sale():
+    """
+    Cotiza una canasta sin registrar la venta: misma asignación que POST /sales (lote más caro
+    primero) sobre una sola lectura de los productos y lotes, sin escribir ni tomar el lock de escritura.
+    Body esperado: igual que POST /sales.
+    Respuesta:
+    {
+      "total": 1234.5,
+      "lines": [
+        {"product_id": 1, "quantity": 3, "subtotal": 450.0,
+         "batches": [{"batch_id": 7, "quantity": 2, "unit_price": 150.0}, ...]}
+      ]
+    }
+    """
+    data = request.get_json() or {}
+    items_data = data.get('items', [])
+    try:
+        per_item, total = allocate(items_data, basket_snapshot(items_data))
+    except AllocationError as e:
+        return jsonify({'error': str(e)}), e.status
+
+    return jsonify({
+        'total': total,
+        'lines': [{
+            'product_id': item_product_id(item),
+            'quantity': item_quantity(item),
+            'subtotal': sum(qty * price for _, _, qty, price, _ in lines),
+            'batches': [
+                {'batch_id': bid, 'quantity': qty, 'unit_price': price}
+                for _, bid, qty, price, _ in lines
+            ]
+        } for item, lines in zip(items_data, per_item)]
+    })
+
+
+@sale_bp.route('/sales/bulk', methods=['POST'])
+def create_sales_bulk():
+    """
+    Carga masiva de tickets (ej. sincronización de un POS que estuvo offline).
+    Body esperado:
+    {
+      "tickets": [
+        {"date": "2025-09-01T10:15:00", "items": [{"product_id": 1, "quantity": 3}]},
+        {"items": [{"product_id": 2, "quantity": 5}]}
+      ]
+    }
+    - Productos y lotes involucrados se leen juntos, en una sentencia con la primera página de lotes de cada
+      producto (solo los que piden más de lo que cubre esa página siguen leyendo); la asignación se hace en memoria.
+    - Cada ticket se acepta o rechaza por separado; todo lo aceptado se graba en una transacción.
+    - date es opcional (default ahora); con zona horaria se convierte a UTC.
+    """
+    data = request.get_json() or {}
+    tickets = data.get('tickets', [])
+    if not tickets:
+        return jsonify({'error': 'Debe incluir tickets'}), 400
+
+    for _ in range(stock.MAX_RETRIES):
+        try:
+            return _create_sales_bulk(tickets)
+        except stock.StockConflict:
+            db.session.rollback()
+    return jsonify({'error': 'Conflicto de stock concurrente, reintentar'}), 409
+
+
+def _create_sales_bulk(tickets):
+    snapshot = basket_snapshot([i for t in tickets for i in (t.get('items') or [])])
+    available = {bid: qty for _, batches in snapshot.values() for bid, _, qty in batches}
+
+    now = datetime.utcnow()
+    results = []
+    accepted = []   # (índice del ticket, fecha, total, lines)
+    for idx, ticket in enumerate(tickets):
+        try:
+            date = datetime.fromisoformat(ticket['date']) if ticket.get('date') else now
+        except (TypeError, ValueError):
+            results.append({'index': idx, 'ok': False, 'status': 400, 'error': f"Fecha inválida: {ticket['date']!r}"})
+            continue
+        if date.tzinfo is not None:
+            # las fechas se guardan en UTC sin zona: '...-03:00' se pasa a UTC naive (como la valorización)
+            date = date.astimezone(timezone.utc).replace(tzinfo=None)
+        try:
+            per_item, total = allocate(ticket.get('items') or [], snapshot, available)
+        except AllocationError as e:
+            results.append({'index': idx, 'ok': False, 'status': e.status, 'error': str(e)})
+            continue
+        accepted.append((idx, date, total, [line for lines in per_item for line in lines]))
+        results.append(None)
+
+    if accepted:
+        stock.take(
+            (pid, bid, qty) for _, _, _, lines in accepted for pid, bid, qty, _, _ in lines
+        )
+
+        sale_ids = db.session.scalars(
+            db.insert(Sale).returning(Sale.id, sort_by_parameter_order=True),
+            [{'date': date, 'total': total} for _, date, total, _ in accepted]
+        ).all()
+
+        db.session.execute(db.insert(SaleItem), [
+            {'sale_id': sale_id, 'product_id': pid, 'batch_id': bid, 'quantity': qty,
+             'price_at_sale': price, 'unit_cost': cost}
+            for sale_id, (_, _, _, lines) in zip(sale_ids, accepted)
+            for pid, bid, qty, price, cost in lines
+        ])
+        ledger.record(
+            ledger.movement('sale_out', pid, bid, -qty, cost, date, sale_id=sale_id)
+            for sale_id, (_, date, _, lines) in zip(sale_ids, accepted)
+            for pid, bid, qty, _, cost in lines
+        )
+
+        by_day = {}
+        for _, date, _, lines in accepted:
+            by_day.setdefault(date.date(), []).extend(
+                (pid, qty, price, cost) for pid, _, qty, price, cost in lines
+            )
+        for day, day_lines in by_day.items():
+            rollup.apply_lines(day, day_lines)
+
+        db.session.commit()
+        product_cache.invalidate(snapshot.keys())
+
+        for sale_id, (idx, _, total, _) in zip(sale_ids, accepted):
+            results[idx] = {'index': idx, 'ok': True, 'sale_id': sale_id, 'total': total}
+
+    return jsonify({
+        'created': len(accepted),
+        'failed': len(tickets) - len(accepted),
+        'results': results
+    })
+
+
 @sale_bp.route('/sales', methods=['GET'])
 def list_sales():
-    sales = Sale.query.order_by(Sale.date.desc()).all()
-    result = []
-    for s in sales:
-        items = [{
-            'product_id': i.product_id,
-            'batch_id': i.batch_id,
-            'quantity': i.quantity,
-            'price_at_sale': i.price_at_sale
-        } for i in s.items]
-
-        result.append({
-            'id': s.id,
-            'date': s.date.isoformat(),
-            'total': s.total,
-            'items': items
-        })
-    return jsonify(result)
+    """
+    Query params (todos opcionales):
+    - limit, cursor: paginación por (date, id) descendente; el siguiente cursor viene en X-Next-Cursor
+    - start_date, end_date: rango de fechas
+    - product_id: solo ventas que incluyan ese producto
+    - fields: proyección, ej. fields=id,date,total
+    """
+    try:
+        limit, cursor = page_args(request.args)
+        start, end = date_range_args(request.args)
+        query = _sales_query(limit, cursor, start, end, request.args.get('product_id', type=int))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    fields = fields_arg(request.args)
+
+    # filas (Row) directo a dicts, sin objetos del ORM; las fechas las serializa el proveedor JSON
+    sales = SALE.fetch(query)
+    next_cursor = None
+    if limit and len(sales) > limit:
+        sales = sales[:limit]
+        next_cursor = encode_cursor(sales[-1]['date'], sales[-1]['id'])
+
+    if fields is None or 'items' in fields:
+        # items de todas las ventas de la página en una consulta (misma selección como subconsulta)
+        items = defaultdict(list)
+        for row in execute(_page_items_query(query)):
+            items[row[-1]].append(SALE_ITEM.encode_one(row))   # encode_one ignora el sale_id del final
+        for sale in sales:
+            sale['items'] = items.get(sale['id'], [])
+
+    if fields is not None:
+        sales = [project(row, fields) for row in sales]
+    return paginated_response(sales, next_cursor)
+
+
+def _sales_query(limit, cursor, start, end, product_id):
+    """Página de GET /sales: (date, id) descendente desde el cursor, con limit + 1 para saber si hay otra."""
+    query = keyset_desc(SALE.select(), Sale.date, Sale.id, cursor)
+    if start:
+        query = query.where(Sale.date >= start)
+    if end:
+        query = query.where(Sale.date <= end)
+    if product_id is not None:
+        query = query.where(Sale.id.in_(
+            db.select(SaleItem.sale_id).where(SaleItem.product_id == product_id)
+        ))
+    if limit:
+        query = query.limit(limit + 1)
+    return query
+
+
+def _page_items_query(page):
+    """Items de las ventas de una página de _sales_query(), con el sale_id al final de cada fila."""
+    return (
+        SALE_ITEM.select(SaleItem.sale_id)
+        .where(SaleItem.sale_id.in_(page.with_only_columns(Sale.id)))
+        .order_by(SaleItem.id)
+    )
 
 
 @sale_bp.route('/sales/<int:sale_id>', methods=['DELETE'])
 def delete_sale(sale_id):
-    sale = Sale.query.get_or_404(sale_id)
+    # Repone el stock con UPDATE por conjunto; lo de lotes consolidados va al lote consolidado actual
+    result = annul_sales([sale_id])
+    if not result['annulled']:
+        return jsonify({'error': f'Venta {sale_id} no encontrada'}), 404
+    db.session.commit()
+    product_cache.invalidate(result['product_ids'])
+    return jsonify({'message': f'Venta {sale_id} anulada y stock revertido'})
 
-    # Revertir stock en cada lote
-    for item in sale.items:
-        batch = Batch.query.get(item.batch_id)
-        if batch:
-            batch.quantity += item.quantity
 
-    db.session.delete(sale)
+@sale_bp.route('/sales/annul-bulk', methods=['POST'])
+def annul_sales_bulk():
+    """
+    Anulación de muchas ventas en una sola transacción.
+    Body esperado: {"sale_ids": [10, 11, 12]}
+    Los ids inexistentes se informan en not_found; el resto se anula.
+    """
+    data = request.get_json() or {}
+    sale_ids = data.get('sale_ids')
+    if not sale_ids or not isinstance(sale_ids, list):
+        return jsonify({'error': 'Debe incluir sale_ids'}), 400
+    try:
+        result = annul_sales(sale_ids)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'sale_ids debe ser una lista de enteros'}), 400
     db.session.commit()
-    return jsonify({'message': f'Venta {sale_id} anulada y stock revertido'})
\ No newline at end of file
+    product_cache.invalidate(result['product_ids'])
+    return jsonify({
+        'annulled': result['annulled'],
+        'not_found': result['not_found'],
+        'restored': result['restored']
+    })
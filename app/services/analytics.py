@@ -0,0 +1,155 @@
+from datetime import datetime
+import numpy as np
+from app import db
+from app.models.product import Product
+from app.models.batch import Batch
+from app.models.purchase import Purchase
+from app.models.sale import Sale
+from app.models.sale_item import SaleItem
+
+# Cortes de la clasificación ABC sobre la participación acumulada en la facturación
+ABC_CUTS = (0.80, 0.95)
+
+
+def _columns(stmt, n_cols) -> np.ndarray:
+    """
+    Ejecuta la consulta y devuelve las filas como una matriz float (n_filas, n_cols).
+    Se ejecuta en Core (sin la capa de carga del ORM) y se transpone con zip antes de pasar
+    a NumPy: convertir las Row una por una es mucho más lento.
+    """
+    columns = list(zip(*db.session.connection().execute(stmt).all()))
+    if not columns:
+        return np.empty((0, n_cols))
+    return np.column_stack([np.array(col, dtype=np.float64) for col in columns])
+
+
+def _sum_by(index, values, size) -> np.ndarray:
+    return np.bincount(index, weights=values, minlength=size).astype(np.float64)
+
+
+def product_metrics(start: datetime | None = None, end: datetime | None = None) -> dict:
+    """
+    Margen, rotación, días de inventario, sell-through y clase ABC por producto.
+    Cada tabla se lee una sola vez en columnas (ventas y compras del rango, lotes actuales)
+    y los totales por producto salen de np.bincount sobre un índice denso de productos.
+    - margin = revenue - cogs (cogs con el costo del lote al momento de la venta)
+    - turnover = cogs / valor del inventario actual a costo
+    - days_of_inventory = valor del inventario / costo vendido por día del rango
+    - sell_through = kg vendidos / (kg vendidos + kg en stock)
+    """
+    sales = db.select(SaleItem.product_id, SaleItem.quantity, SaleItem.price_at_sale,
+                      db.func.coalesce(SaleItem.unit_cost, 0.0))
+    if start or end:
+        sales = sales.join(Sale, Sale.id == SaleItem.sale_id)
+    purchases = db.select(Purchase.product_id, Purchase.quantity)
+    if start:
+        sales = sales.where(Sale.date >= start)
+        purchases = purchases.where(Purchase.date >= start)
+    if end:
+        sales = sales.where(Sale.date <= end)
+        purchases = purchases.where(Purchase.date <= end)
+
+    lines = _columns(sales, 4)
+    received = _columns(purchases, 2)
+    batches = _columns(db.select(Batch.product_id, Batch.quantity, Batch.cost), 3)
+    names = dict(db.session.execute(db.select(Product.id, Product.name)).all())
+
+    # índice denso: posición de cada product_id en `ids`
+    ids = np.array(sorted(names), dtype=np.int64)
+    size = len(ids)
+    sale_idx = np.searchsorted(ids, lines[:, 0].astype(np.int64))
+    purchase_idx = np.searchsorted(ids, received[:, 0].astype(np.int64))
+    batch_idx = np.searchsorted(ids, batches[:, 0].astype(np.int64))
+
+    qty = lines[:, 1]
+    sold = _sum_by(sale_idx, qty, size)
+    revenue = _sum_by(sale_idx, qty * lines[:, 2], size)
+    cogs = _sum_by(sale_idx, qty * lines[:, 3], size)
+    bought = _sum_by(purchase_idx, received[:, 1], size)
+    on_hand = _sum_by(batch_idx, batches[:, 1], size)
+    stock_value = _sum_by(batch_idx, batches[:, 1] * batches[:, 2], size)
+
+    margin = revenue - cogs
+    days = _period_days(start, end)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin_pct = np.where(revenue > 0, margin / revenue * 100.0, np.nan)
+        turnover = np.where(stock_value > 0, cogs / stock_value, np.nan)
+        days_of_inventory = np.where(cogs > 0, stock_value / (cogs / days), np.nan) if days else np.full(size, np.nan)
+        sell_through = np.where(sold + on_hand > 0, sold / (sold + on_hand) * 100.0, np.nan)
+    abc = abc_classes(revenue)
+
+    products = [{
+        'product_id': ids[i],
+        'name': names[int(ids[i])],
+        'sold': sold[i],
+        'received': bought[i],
+        'on_hand': on_hand[i],
+        'revenue': revenue[i],
+        'cogs': cogs[i],
+        'margin': margin[i],
+        'margin_pct': margin_pct[i],
+        'stock_value': stock_value[i],
+        'turnover': turnover[i],
+        'days_of_inventory': days_of_inventory[i],
+        'sell_through_pct': sell_through[i],
+        'abc': abc[i]
+    } for i in range(size)]
+    return {
+        'start_date': start.isoformat() if start else None,
+        'end_date': end.isoformat() if end else None,
+        'sale_lines': len(lines),
+        'products': [{k: _num(v) for k, v in p.items()} for p in products]
+    }
+
+
+def abc_classes(revenue: np.ndarray) -> list[str]:
+    """
+    A: productos que suman el primer 80% de la facturación, B: hasta el 95%, C: el resto
+    (incluye los que no vendieron). Un producto es A si al entrar el acumulado previo era < 80%.
+    """
+    total = revenue.sum()
+    classes = np.full(len(revenue), 'C', dtype='<U1')
+    if total <= 0:
+        return classes.tolist()
+    order = np.argsort(-revenue, kind='stable')
+    share_before = (np.cumsum(revenue[order]) - revenue[order]) / total
+    ranked = np.where(share_before < ABC_CUTS[0], 'A', np.where(share_before < ABC_CUTS[1], 'B', 'C'))
+    ranked[revenue[order] <= 0] = 'C'
+    classes[order] = ranked
+    return classes.tolist()
+
+
+def abc_summary(metrics: dict) -> dict:
+    """Cantidad de productos, facturación y participación por clase ABC."""
+    total = sum(p['revenue'] for p in metrics['products'])
+    classes = {}
+    for cls in ('A', 'B', 'C'):
+        members = [p for p in metrics['products'] if p['abc'] == cls]
+        revenue = sum(p['revenue'] for p in members)
+        classes[cls] = {
+            'products': len(members),
+            'revenue': revenue,
+            'revenue_share_pct': revenue / total * 100.0 if total else 0.0,
+            'product_ids': [p['product_id'] for p in members]
+        }
+    return {'start_date': metrics['start_date'], 'end_date': metrics['end_date'], 'classes': classes}
+
+
+def _period_days(start, end) -> float | None:
+    if start and end:
+        return max((end - start).total_seconds() / 86400.0, 1.0)
+    # sin rango completo: desde la primera venta (o start) hasta la última (o end)
+    first, last = db.session.execute(db.select(db.func.min(Sale.date), db.func.max(Sale.date))).one()
+    first, last = start or first, end or last
+    if first is None or last is None:
+        return None
+    return max((last - first).total_seconds() / 86400.0, 1.0)
+
+
+def _num(value):
+    """numpy -> tipos JSON; NaN -> None."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
@@ -0,0 +1,87 @@
+from datetime import datetime
+from app import db
+from app.models.batch import Batch
+from app.models.stock_movement import StockMovement
+
+
+def movement(kind, product_id, batch_id, quantity, cost, date=None, purchase_id=None, sale_id=None) -> dict:
+    return {
+        'kind': kind,
+        'product_id': product_id,
+        'batch_id': batch_id,
+        'quantity': quantity,
+        'cost': cost,
+        'date': date or datetime.utcnow(),
+        'purchase_id': purchase_id,
+        'sale_id': sale_id
+    }
+
+
+def record(rows):
+    """Agrega movimientos al libro en un solo INSERT (sin commit)."""
+    rows = list(rows)
+    if rows:
+        db.session.execute(db.insert(StockMovement), rows)
+
+
+def has_purchases_after(product_id, date, exclude_purchase_id=None) -> bool:
+    """
+    ¿Hay compras vigentes (no revertidas) del producto después de `date`?
+    Rango sobre el índice (product_id, date); la anulación se busca por purchase_id.
+    """
+    return db.session.execute(_purchases_after_query(product_id, date, exclude_purchase_id)).first() is not None
+
+
+def _purchases_after_query(product_id, date, exclude_purchase_id):
+    reversal = db.aliased(StockMovement)
+    query = db.select(StockMovement.id).where(
+        StockMovement.product_id == product_id,
+        StockMovement.date > date,
+        StockMovement.kind == 'purchase_in',
+        ~db.exists().where(reversal.purchase_id == StockMovement.purchase_id, reversal.kind == 'reversal')
+    )
+    if exclude_purchase_id is not None:
+        query = query.where(StockMovement.purchase_id != exclude_purchase_id)
+    return query.limit(1)
+
+
+def purchase_movements(purchase_id, kind) -> list:
+    return db.session.scalars(_purchase_movements_query(purchase_id, kind)).all()
+
+
+def _purchase_movements_query(purchase_id, kind):
+    return db.select(StockMovement).where(StockMovement.purchase_id == purchase_id, StockMovement.kind == kind)
+
+
+def stock_at(at, product_id=None) -> dict:
+    """Stock por producto a la fecha `at`: suma de movimientos con date <= at."""
+    return {pid: qty for pid, qty in db.session.execute(_stock_at_query(at, product_id))}
+
+
+def _stock_at_query(at, product_id):
+    query = (
+        db.select(StockMovement.product_id, db.func.sum(StockMovement.quantity))
+        .where(StockMovement.date <= at)
+        .group_by(StockMovement.product_id)
+    )
+    if product_id is not None:
+        query = query.where(StockMovement.product_id == product_id)
+    return query
+
+
+def batch_drift(tolerance=1e-6) -> list:
+    """Lotes cuya cantidad no coincide con la suma de sus movimientos: [(batch_id, product_id, cantidad, libro)]."""
+    projection = dict(
+        db.session.query(StockMovement.batch_id, db.func.sum(StockMovement.quantity))
+        .group_by(StockMovement.batch_id)
+    )
+    drift = []
+    for batch_id, product_id, quantity in db.session.query(Batch.id, Batch.product_id, Batch.quantity):
+        ledger_qty = projection.pop(batch_id, 0.0)
+        if abs(quantity - ledger_qty) > tolerance:
+            drift.append((batch_id, product_id, quantity, ledger_qty))
+    # lotes borrados cuyo saldo en el libro no es cero
+    for batch_id, ledger_qty in projection.items():
+        if abs(ledger_qty) > tolerance:
+            drift.append((batch_id, None, 0.0, ledger_qty))
+    return drift
@@ -0,0 +1,131 @@
+import threading
+import time
+from flask import Flask, Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+# Límites de los histogramas (segundos / cantidad de sentencias)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+
+    def lines(self, name, labels):
+        for upper, n in zip(self.buckets, self.counts):
+            yield f'{name}_bucket{{{labels},le="{upper}"}} {n}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+_FAMILIES = (
+    ('http_request_duration_seconds', 'Tiempo total de la request', DURATION_BUCKETS),
+    ('http_request_sql_queries', 'Sentencias SQL por request', QUERY_BUCKETS),
+    ('http_request_sql_duration_seconds', 'Tiempo en SQL por request', DURATION_BUCKETS),
+)
+
+
+class RequestMetrics:
+    """
+    Por request: endpoint, tiempo total, cantidad de sentencias SQL y tiempo en SQL
+    (eventos del engine). Loguea las requests más lentas que `slow_ms` con sus sentencias
+    más lentas y acumula histogramas por endpoint para GET /metrics.
+    """
+
+    def __init__(self, slow_ms=500.0):
+        self.slow_ms = slow_ms
+        self._histograms = {}   # (familia, endpoint) -> _Histogram
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Flask, engine, slow_ms=None):
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+        app.before_request(self._before_request)
+        # teardown corre también cuando la vista lanzó una excepción (las 500 se cuentan)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.render)
+
+    def _before_request(self):
+        g._metrics = {'started': time.perf_counter(), 'sql_count': 0, 'sql_time': 0.0, 'statements': []}
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and '_metrics' in g:
+            conn.info.setdefault('_metrics_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('_metrics_started')
+        if not started or not has_request_context() or '_metrics' not in g:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        m = g._metrics
+        m['sql_count'] += 1
+        m['sql_time'] += elapsed
+        m['statements'].append((elapsed, statement))
+
+    def _handle_error(self, context):
+        # la sentencia falló: after_cursor_execute no va a correr, se descarta su inicio
+        # (en una conexión las sentencias van de a una: la pila tiene a lo sumo la que falló)
+        if context.connection is None or not has_request_context() or '_metrics' not in g:
+            return
+        started = context.connection.info.get('_metrics_started')
+        if started:
+            started.pop()
+
+    def _teardown_request(self, exc=None):
+        m = g.pop('_metrics', None)
+        if m is None or request.endpoint == 'metrics':
+            return
+        wall = time.perf_counter() - m['started']
+        endpoint = request.endpoint or 'not_found'
+
+        with self._lock:
+            for (name, _, buckets), value in zip(_FAMILIES, (wall, m['sql_count'], m['sql_time'])):
+                key = (name, endpoint)
+                if key not in self._histograms:
+                    self._histograms[key] = _Histogram(buckets)
+                self._histograms[key].observe(value)
+
+        if wall * 1000 >= self.slow_ms:
+            slowest = sorted(m['statements'], key=lambda s: s[0], reverse=True)[:3]
+            current_app.logger.warning(
+                'request lenta %s %s (%s): %.1f ms, %d sentencias SQL en %.1f ms; más lentas: %s',
+                request.method, request.path, endpoint, wall * 1000, m['sql_count'], m['sql_time'] * 1000,
+                ' | '.join(f'{t * 1000:.1f} ms {" ".join(sql.split())[:200]}' for t, sql in slowest)
+            )
+
+    def render(self):
+        """Histogramas por endpoint en formato de texto de Prometheus."""
+        lines = []
+        with self._lock:
+            for name, help_text, _ in _FAMILIES:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (family, endpoint), histogram in sorted(self._histograms.items()):
+                    if family == name:
+                        lines.extend(histogram.lines(name, f'endpoint="{endpoint}"'))
+
+        from app.services.product_cache import product_cache
+        stats = product_cache.stats()
+        for key in ('hits', 'misses', 'evictions'):
+            lines.append(f'# TYPE product_cache_{key}_total counter')
+            lines.append(f'product_cache_{key}_total {stats[key]}')
+
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,88 @@
+import base64
+import json
+from datetime import datetime
+from flask import jsonify
+from app import db
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise PaginationError('cursor inválido')
+
+
+def page_args(args) -> tuple[int | None, str | None]:
+    """
+    Lee limit/cursor del query string. Si no viene ninguno, devuelve (None, None)
+    y el listado se entrega completo como antes.
+    """
+    limit = args.get('limit')
+    cursor = args.get('cursor')
+    if limit is None and cursor is None:
+        return None, None
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_LIMIT
+    except ValueError:
+        raise PaginationError('limit debe ser un entero')
+    if limit <= 0:
+        raise PaginationError('limit debe ser > 0')
+    return min(limit, MAX_LIMIT), cursor
+
+
+def date_range_args(args) -> tuple[datetime | None, datetime | None]:
+    try:
+        start = datetime.fromisoformat(args['start_date']) if args.get('start_date') else None
+        end = datetime.fromisoformat(args['end_date']) if args.get('end_date') else None
+    except ValueError:
+        raise PaginationError('Formato de fecha inválido')
+    return start, end
+
+
+def keyset_desc(query, date_col, id_col, cursor: str | None):
+    """Página ordenada por (fecha, id) descendente, continuando después del cursor."""
+    if cursor:
+        values = decode_cursor(cursor)
+        try:
+            last_date, last_id = datetime.fromisoformat(values[0]), int(values[1])
+        except Exception:
+            raise PaginationError('cursor inválido')
+        query = query.filter(db.or_(
+            date_col < last_date,
+            db.and_(date_col == last_date, id_col < last_id)
+        ))
+    return query.order_by(date_col.desc(), id_col.desc())
+
+
+def fields_arg(args) -> set[str] | None:
+    fields = args.get('fields')
+    if not fields:
+        return None
+    return {f.strip() for f in fields.split(',') if f.strip()}
+
+
+def project(row: dict, fields: set[str] | None) -> dict:
+    if fields is None:
+        return row
+    return {k: v for k, v in row.items() if k in fields}
+
+
+def paginated_response(result: list, next_cursor: str | None):
+    """Mantiene el cuerpo como lista; el cursor siguiente viaja en el header X-Next-Cursor."""
+    response = jsonify(result)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy.orm import selectinload
+from app.models.product import Product
+
+
+def product_entry(product: Product, with_batches: bool = True) -> dict:
+    """
+    Tabla de precios de un producto: lotes (más caro primero), precio efectivo y stock.
+    Sin with_batches no se tocan los lotes (no se cargan).
+    """
+    factor = 1 + (product.markup or 0.0) / 100.0
+    entry = {
+        'id': product.id,
+        'name': product.name,
+        'markup': product.markup,
+        'total_stock': product.total_stock(),
+        'max_cost': product.max_cost,
+        'price': product.max_cost * factor if product.max_cost is not None else None,
+    }
+    if with_batches:
+        entry['batches'] = [
+            {'id': b.id, 'cost': b.cost, 'quantity': b.quantity, 'date_added': b.date_added.isoformat(),
+             'price': b.cost * factor}
+            for b in product.batches
+        ]
+    return entry
+
+
+class ProductCache:
+    """
+    Cache LRU en memoria del proceso, por producto. Las rutas que escriben llaman a
+    invalidate() después del commit; el TTL acota lo que puede quedar viejo cuando
+    otro worker (otro proceso) modificó el producto.
+    Las entradas se cargan fuera del lock: cada invalidate() sube la generación del producto
+    (o la general) y lo cargado no se guarda si cambió mientras se leía, porque la lectura
+    pudo ser anterior al commit que invalidó. Lo mismo para la lista de ids del catálogo.
+    """
+
+    def __init__(self, max_size=1024, ttl=30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()   # product_id -> (expira, entry)
+        self._ids = None                # (expira, [ids]) del catálogo completo
+        self._epoch = 0                 # sube al vaciar todo
+        self._catalog_epoch = 0         # sube al invalidar la lista de ids
+        self._generations = {}          # product_id -> invalidaciones del producto
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, max_size=None, ttl=None):
+        with self._lock:
+            if max_size is not None:
+                self.max_size = max_size
+            if ttl is not None:
+                self.ttl = ttl
+            self._entries.clear()
+            self._ids = None
+            self._epoch += 1
+            self._catalog_epoch += 1
+
+    def get_many(self, product_ids) -> list[dict]:
+        """Entradas en el orden pedido; las que faltan se cargan juntas en una consulta."""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for pid in product_ids:
+                cached = self._entries.get(pid)
+                if cached and cached[0] > now:
+                    self._entries.move_to_end(pid)
+                    found[pid] = cached[1]
+                    self.hits += 1
+            missing = [pid for pid in product_ids if pid not in found]
+            self.misses += len(missing)
+            epoch = self._epoch
+            generations = {pid: self._generations.get(pid, 0) for pid in missing}
+
+        if missing:
+            products = Product.query.options(selectinload(Product.batches)).filter(Product.id.in_(missing)).all()
+            loaded = {p.id: product_entry(p) for p in products}
+            found.update(loaded)
+            with self._lock:
+                for pid, entry in loaded.items():
+                    if self._epoch != epoch or self._generations.get(pid, 0) != generations[pid]:
+                        continue   # se invalidó mientras se leía: se devuelve pero no se guarda
+                    self._entries[pid] = (now + self.ttl, entry)
+                    self._entries.move_to_end(pid)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+        return [found[pid] for pid in product_ids if pid in found]
+
+    def get(self, product_id) -> dict | None:
+        entries = self.get_many([product_id])
+        return entries[0] if entries else None
+
+    def catalog_ids(self) -> list[int]:
+        now = time.monotonic()
+        with self._lock:
+            if self._ids and self._ids[0] > now:
+                return self._ids[1]
+            epoch = self._catalog_epoch
+        ids = [pid for (pid,) in Product.query.with_entities(Product.id).order_by(Product.id)]
+        with self._lock:
+            if self._catalog_epoch == epoch:
+                self._ids = (now + self.ttl, ids)
+        return ids
+
+    def invalidate(self, product_ids=None):
+        """Sin argumentos vacía todo; con ids, solo esos productos."""
+        with self._lock:
+            if product_ids is None:
+                self._entries.clear()
+                self._ids = None
+                self._epoch += 1
+                self._catalog_epoch += 1
+                return
+            for pid in product_ids:
+                self._entries.pop(pid, None)
+                self._generations[pid] = self._generations.get(pid, 0) + 1
+
+    def invalidate_catalog(self):
+        with self._lock:
+            self._ids = None
+            self._catalog_epoch += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+product_cache = ProductCache()
@@ -0,0 +1,106 @@
+from app import db
+from app.models.sale import Sale
+from app.models.sale_item import SaleItem
+from app.models.product import Product
+from app.services.serializers import execute
+
+
+def profit_report(start, end):
+    """
+    Reporte de ganancias por venta en [start, end] con una sola consulta
+    (Sale ⋈ SaleItem ⋈ Product) en lugar de buscar producto y lote por ítem.
+    El costo sale de SaleItem.unit_cost, así que no depende de que el lote siga existiendo.
+    Devuelve la misma estructura que GET /profits.
+    """
+    rows = execute(_report_query(start, end))
+
+    result = []
+    total_profit = 0.0
+    current = None
+
+    for sale_id, date, product_id, product_name, quantity, price, cost in rows:
+        if current is None or current['sale_id'] != sale_id:
+            if current is not None:
+                total_profit += _close_sale(current)
+                result.append(current)
+            current = {'sale_id': sale_id, 'date': date, 'items': [], 'total': 0.0, 'profit': 0.0}
+
+        # venta sin items (outer join)
+        if product_id is None:
+            continue
+
+        cost = cost if cost is not None else 0.0
+        subtotal = price * quantity
+        current['items'].append({
+            'product_id': product_id,
+            'product_name': product_name if product_name is not None else f"#{product_id}",
+            'quantity': round(quantity, 2),
+            'unit_price': round(price, 2),
+            'subtotal': round(subtotal, 2),
+            'cost': round(cost, 2)
+        })
+        current['total'] += subtotal
+        current['profit'] += (price - cost) * quantity
+
+    if current is not None:
+        total_profit += _close_sale(current)
+        result.append(current)
+
+    return {
+        'sales': result,
+        'total_profit': round(total_profit, 2)
+    }
+
+
+def _report_query(start, end):
+    return (
+        db.select(
+            Sale.id,
+            Sale.date,
+            SaleItem.product_id,
+            Product.name,
+            SaleItem.quantity,
+            SaleItem.price_at_sale,
+            SaleItem.unit_cost,
+        )
+        .outerjoin(SaleItem, SaleItem.sale_id == Sale.id)
+        .outerjoin(Product, Product.id == SaleItem.product_id)
+        .where(Sale.date >= start, Sale.date <= end)
+        .order_by(Sale.id, SaleItem.id)
+    )
+
+
+def _close_sale(sale: dict) -> float:
+    profit = sale['profit']
+    sale['total'] = round(sale['total'], 2)
+    sale['profit'] = round(profit, 2)
+    return profit
+
+
+def profit_summary(start, end):
+    """
+    Solo totales del rango (sin detalle por ítem), resueltos con un único agregado en la base.
+    """
+    sales_count, total, total_profit, quantity = db.session.execute(_summary_query(start, end)).one()
+
+    return {
+        'sales_count': sales_count,
+        'quantity': round(quantity or 0.0, 2),
+        'total': round(total or 0.0, 2),
+        'total_profit': round(total_profit or 0.0, 2)
+    }
+
+
+def _summary_query(start, end):
+    cost = db.func.coalesce(SaleItem.unit_cost, 0.0)
+    return (
+        db.select(
+            db.func.count(db.distinct(Sale.id)),
+            db.func.sum(SaleItem.price_at_sale * SaleItem.quantity),
+            db.func.sum((SaleItem.price_at_sale - cost) * SaleItem.quantity),
+            db.func.sum(SaleItem.quantity),
+        )
+        .select_from(Sale)
+        .outerjoin(SaleItem, SaleItem.sale_id == Sale.id)
+        .where(Sale.date >= start, Sale.date <= end)
+    )
@@ -0,0 +1,173 @@
+import csv
+import io
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.orm import selectinload
+from app import db
+from app.models.product import Product
+from app.models.batch import Batch
+from app.models.purchase import Purchase
+from app.models.price_history import PriceHistory
+from app.services import ledger
+from app.services.stock import lock_products, prune_empty
+from app.services.product_cache import product_cache
+from app.services.write_queue import write_queue
+
+
+def apply_purchase_rules(product: Product, batches: list, unit_cost: float, quantity: float, date=None):
+    """
+    Aplica la regla de compra sobre los lotes vigentes del producto (sin commit):
+    - sin lotes -> primer lote ('first')
+    - unit_cost > costo máximo -> consolidar todo en un lote nuevo ('consolidate')
+    - unit_cost <= costo máximo -> lote nuevo independiente ('add_batch')
+    Al consolidar, los lotes previos quedan en 0; el llamador los poda con stock.prune_empty
+    después de grabar el libro (los ids no se reutilizan: las anulaciones los recrean, también el lote
+    en 0 más caro, que tiene su consolidation_out con cantidad 0).
+    Devuelve (kind, lote_creado, lotes_resultantes, movimientos) con
+    movimientos = [(tipo, lote, cantidad, costo)] para el libro de stock (ver ledger_rows).
+    Actualiza también product.stock_qty y product.max_cost.
+    Los ids de lotes nuevos se asignan en el próximo flush.
+    """
+    highest = max((b.cost for b in batches), default=None)
+    extra = {'date_added': date} if date is not None else {}
+
+    if highest is None or unit_cost <= highest:
+        new_batch = Batch(product_id=product.id, cost=unit_cost, quantity=quantity, **extra)
+        db.session.add(new_batch)
+        product.stock_qty = (product.stock_qty or 0.0) + quantity
+        product.max_cost = unit_cost if highest is None else highest
+        moves = [('purchase_in', new_batch, quantity, unit_cost)]
+        return ('first' if highest is None else 'add_batch'), new_batch, batches + [new_batch], moves
+
+    # CONSOLIDAR: todo el stock vigente pasa al lote nuevo
+    with_stock = [b for b in batches if b.quantity != 0]
+    moved = sum(b.quantity for b in with_stock)
+
+    moves = []
+    # el lote en 0 que prune_empty conservó (el más caro) también se registra, con cantidad 0:
+    # al anular la consolidación _previous_batch lo recrea y max_cost vuelve a ser el de antes
+    top = max(batches, key=lambda b: (b.cost, b.id is None, b.id or 0))
+    if top.quantity == 0:
+        moves.append(('consolidation_out', top, 0.0, top.cost))
+    for b in with_stock:
+        moves.append(('consolidation_out', b, -b.quantity, b.cost))
+        b.quantity = 0.0
+
+    consolidated = Batch(product_id=product.id, cost=unit_cost, quantity=moved + quantity, **extra)
+    db.session.add(consolidated)
+    if moved:
+        moves.append(('consolidation_in', consolidated, moved, unit_cost))
+    moves.append(('purchase_in', consolidated, quantity, unit_cost))
+
+    product.stock_qty = moved + quantity
+    product.max_cost = unit_cost
+    return 'consolidate', consolidated, batches + [consolidated], moves
+
+
+def ledger_rows(moves, product_id, purchase_id, date) -> list[dict]:
+    """Filas del libro para los movimientos de una compra (los lotes ya tienen id)."""
+    return [
+        ledger.movement(kind, product_id, batch.id, qty, cost, date, purchase_id=purchase_id)
+        for kind, batch, qty, cost in moves
+    ]
+
+
+def parse_csv(text: str) -> list[dict]:
+    """CSV con encabezado product_id,unit_cost,quantity."""
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def import_purchases(lines: list[dict]) -> dict:
+    """
+    Registra muchas compras en orden y en una sola transacción, con las mismas reglas que POST /purchases.
+    Los lotes de todos los productos se leen una vez; Purchase y PriceHistory se insertan en bloque.
+    Las líneas inválidas (incluidas las que no son objetos) se informan y se saltean sin abortar el resto.
+    """
+    started = time.perf_counter()
+
+    product_ids = set()
+    for line in lines:
+        try:
+            product_ids.add(int(line.get('product_id')))
+        except (AttributeError, TypeError, ValueError):
+            pass
+    lock_products(product_ids)
+    products = {
+        p.id: p for p in
+        Product.query.options(selectinload(Product.batches)).filter(Product.id.in_(product_ids)).all()
+    }
+    live = {pid: list(p.batches) for pid, p in products.items()}
+
+    outcomes = []
+    purchases = []      # (índice, movimientos, Purchase sin created_batch_id, lote creado)
+    price_rows = []
+    last_date = None
+
+    for idx, line in enumerate(lines):
+        if not isinstance(line, dict):
+            outcomes.append({'line': idx, 'ok': False, 'error': f'Línea inválida: {line!r}'})
+            continue
+        try:
+            product_id = int(line.get('product_id'))
+            unit_cost = float(line.get('unit_cost'))
+            quantity = float(line.get('quantity'))
+        except (TypeError, ValueError):
+            outcomes.append({'line': idx, 'ok': False, 'error': 'product_id, unit_cost y quantity son requeridos'})
+            continue
+        product = products.get(product_id)
+        if not product:
+            outcomes.append({'line': idx, 'ok': False, 'error': f'Producto {product_id} no encontrado'})
+            continue
+        if quantity <= 0 or unit_cost <= 0:
+            outcomes.append({'line': idx, 'ok': False, 'error': 'quantity y unit_cost deben ser > 0'})
+            continue
+
+        # fechas estrictamente crecientes: la anulación compara fechas del libro para detectar compras posteriores
+        date = datetime.utcnow()
+        if last_date is not None and date <= last_date:
+            date = last_date + timedelta(microseconds=1)
+        last_date = date
+
+        kind, batch, live[product_id], moves = apply_purchase_rules(
+            product, live[product_id], unit_cost, quantity, date
+        )
+        purchases.append((idx, moves, {
+            'date': date,
+            'action': 'consolidate' if kind == 'consolidate' else 'add_batch',
+            'product_id': product_id,
+            'unit_cost': unit_cost,
+            'quantity': quantity
+        }, batch))
+        price_rows.append({
+            'product_id': product_id,
+            'cost': unit_cost,
+            'price': unit_cost * (1 + product.markup / 100.0),
+            'date': datetime.now()
+        })
+        outcomes.append({'line': idx, 'ok': True, 'action': kind})
+
+    if purchases:
+        db.session.flush()  # ids de los lotes nuevos
+        purchase_ids = db.session.scalars(
+            db.insert(Purchase).returning(Purchase.id, sort_by_parameter_order=True),
+            [dict(row, created_batch_id=batch.id) for _, _, row, batch in purchases]
+        ).all()
+        write_queue.add_many(PriceHistory, price_rows)
+        ledger.record(
+            m for purchase_id, (_, moves, row, _) in zip(purchase_ids, purchases)
+            for m in ledger_rows(moves, row['product_id'], purchase_id, row['date'])
+        )
+        for purchase_id, (idx, _, _, _) in zip(purchase_ids, purchases):
+            outcomes[idx]['purchase_id'] = purchase_id
+        prune_empty({row['product_id'] for _, _, row, _ in purchases if row['action'] == 'consolidate'})
+    db.session.commit()
+    product_cache.invalidate(products.keys())
+
+    elapsed = time.perf_counter() - started
+    return {
+        'imported': len(purchases),
+        'failed': len(lines) - len(purchases),
+        'elapsed_ms': round(elapsed * 1000, 1),
+        'lines_per_second': round(len(lines) / elapsed, 1) if elapsed > 0 else None,
+        'results': outcomes
+    }
@@ -0,0 +1,103 @@
+import re
+from datetime import date, datetime
+from app import db
+from app.models.batch import Batch
+from app.models.product import Product
+from app.services import ledger, profit_report, rollup, sales, valuation
+from app.services.pagination import encode_cursor
+
+# Recorrido de una tabla: "SCAN sale" o "SCAN sale USING INDEX ..." (en orden del índice, pero entera igual)
+_SCAN = re.compile(r'^SCAN (\w+)(?: USING (?:COVERING )?INDEX \w+)?$')
+# "batch AS ranked", "purchase AS purchase_1": alias de tablas en el SQL compilado
+_ALIAS = re.compile(r'\b(\w+) AS (\w+)\b')
+
+# Recorridos de tabla que se aceptan, con el motivo: {consulta: {tabla: motivo}}.
+# Cualquier otro SCAN de una tabla (o de un alias de tabla), con o sin índice, cuenta como recorrido completo.
+ALLOWED_SCANS = {
+    'sales.list_page': {'sale': 'en orden de ix_sale_date_id; el LIMIT de la página corta el recorrido'},
+    'sales.page_items': {'sale': 'la subconsulta es la página (con LIMIT) de sales.list_page'},
+    'purchases.list_page': {'purchase': 'en orden de ix_purchase_date_id; el LIMIT de la página corta el recorrido'},
+    'products.stock_at_all': {'stock_movement': 'suma todo el libro hasta `at`, agrupado en orden del índice'},
+    'valuation.at': {'stock_movement': 'suma todo el libro hasta `at` (los períodos cerrados se cachean)'},
+    'price_history.latest_all': {'product': 'una fila por producto del catálogo; el último registro, del índice'},
+}
+
+
+def hot_queries():
+    """
+    Consultas de los caminos calientes de cada ruta, armadas con las mismas funciones que usan
+    las rutas y servicios (con parámetros de ejemplo).
+    """
+    from app.routes import export_routes, price_history_routes, product_routes, purchase_routes, sale_routes
+    from app.services import replenishment   # NumPy, como la ruta: recién acá
+    start, end = datetime(2025, 1, 1), datetime(2025, 2, 1)
+    cursor = encode_cursor(end, 100)
+    sales_page = sale_routes._sales_query(100, cursor, None, None, None)
+    conditions = price_history_routes._conditions(1, start, end)
+    first_day, today = date(2025, 1, 1), date(2025, 4, 1)
+    return {
+        'profits.report': profit_report._report_query(start, end),
+        'profits.summary': profit_report._summary_query(start, end),
+        'profits.summary_rollup': rollup._summary_query(first_day, today, 'month', None),
+        'profits.summary_rollup_product': rollup._summary_query(first_day, today, 'week', 1),
+        'sales.list_page': sales_page,
+        'sales.list_by_product': sale_routes._sales_query(None, None, start, end, 1),
+        'sales.page_items': sale_routes._page_items_query(sales_page),
+        'sales.basket_first_pages': sales.FIRST_PAGES.params(product_ids=[1, 2], page=sales.SNAPSHOT_PAGE),
+        'sales.batch_page': sales.BATCH_PAGE.params(product_id=1, cost=10.0, date_added=start, batch_id=8, page=16),
+        'sales.annul_pruned': sales._pruned_query([1, 2, 3]),
+        'sales.annul_restored': sales._restored_query(sales._restore_lines([1, 2, 3])),
+        'products.batches': db.select(Batch)
+            .where(db.with_parent(Product(id=1), Product.batches)).order_by(*Product.batches.property.order_by),
+        'products.low_stock_page': product_routes._products_query(False, 5.0, 10, 100),
+        'products.stock_at': ledger._stock_at_query(end, 1),
+        'products.stock_at_all': ledger._stock_at_query(end, None),
+        'purchases.list_page': purchase_routes._purchases_query(100, encode_cursor(end, 100), None, None, None),
+        'purchases.by_product': purchase_routes._purchases_query(None, None, None, None, 1),
+        'ledger.later_purchases': ledger._purchases_after_query(1, start, 5),
+        'ledger.purchase_movements': ledger._purchase_movements_query(5, 'consolidation_out'),
+        'valuation.at': valuation._valuation_query(end),
+        'valuation.cache_check': valuation._newer_movements_query(100, end),
+        'replenishment.changed_products': replenishment._changed_products_query(100),
+        'replenishment.daily_series': replenishment._demand_queries(first_day, today, [1, 2])[1],
+        'price_history.by_product': price_history_routes._history(conditions),
+        'price_history.span': price_history_routes._span(conditions),
+        'price_history.max_points': price_history_routes._downsample(conditions, start, end, 50),
+        'price_history.latest': price_history_routes._latest([1, 2]),
+        'price_history.latest_all': price_history_routes._latest(None),
+        'export.sales_range': export_routes._sales_export(start, end),
+        'export.purchases_range': export_routes._purchases_export(start, end),
+        'export.price_history_product': export_routes._price_history_export(start, end, 1),
+    }
+
+
+def explain(stmt) -> tuple[list[str], dict[str, str]]:
+    """(pasos del plan, {nombre en el plan: tabla}) con los alias de tablas que usa la consulta."""
+    compiled = stmt.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    params = tuple(
+        v.isoformat(' ') if isinstance(v, datetime) else v.isoformat() if isinstance(v, date) else v
+        for v in (compiled.params[name] for name in compiled.positiontup)
+    )
+    rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + compiled.string, params)
+    tables = {name: name for name in db.metadata.tables}
+    tables.update((alias, table) for table, alias in _ALIAS.findall(compiled.string) if table in db.metadata.tables)
+    return [row[-1] for row in rows], tables
+
+
+def full_scans(plan: list[str], tables: dict[str, str], allowed=()) -> list[str]:
+    """Pasos que recorren una tabla entera (las subconsultas materializadas no son tablas), salvo las de `allowed`."""
+    scans = []
+    for step in plan:
+        match = _SCAN.match(step)
+        if match and match.group(1) in tables and tables[match.group(1)] not in allowed:
+            scans.append(step)
+    return scans
+
+
+def check_plans() -> dict[str, tuple[list[str], list[str]]]:
+    """Devuelve {nombre: (plan, pasos con full scan)} para cada consulta de hot_queries()."""
+    report = {}
+    for name, stmt in hot_queries().items():
+        plan, tables = explain(stmt)
+        report[name] = (plan, full_scans(plan, tables, ALLOWED_SCANS.get(name, {})))
+    return report
@@ -0,0 +1,156 @@
+import math
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+from app import db
+from app.models.product import Product
+from app.models.daily_sales import DailySales
+from app.models.stock_movement import StockMovement
+
+# Días completos de historia (desde daily_sales) y suavizado de la demanda diaria
+WINDOW_DAYS = 90
+MOVING_AVERAGE_DAYS = 28
+ALPHA = 0.3
+# z del nivel de servicio para el stock de seguridad (~95%)
+SERVICE_Z = 1.65
+
+
+def demand_stats(product_ids=None, today=None) -> dict:
+    """
+    Demanda diaria por producto a partir del acumulado diario, para todo el catálogo (o `product_ids`)
+    en una sola pasada: una consulta arma la matriz productos × días (los días sin ventas quedan en 0)
+    y el suavizado exponencial se aplica por columnas, vectorizado sobre todos los productos.
+    Devuelve {product_id: {...}} con stock actual, demanda suavizada (rate), media móvil y desvío.
+    """
+    today = today or datetime.utcnow().date()
+    first_day = today - timedelta(days=WINDOW_DAYS)
+
+    products, sales = _demand_queries(first_day, today, product_ids)
+    catalog = db.session.execute(products).all()
+    if not catalog:
+        return {}
+
+    ids = np.array([pid for pid, _, _ in catalog], dtype=np.int64)
+    demand = np.zeros((len(ids), WINDOW_DAYS))
+    rows = db.session.execute(sales).all()
+    if rows:
+        pids, days, qtys = zip(*rows)
+        row = np.searchsorted(ids, np.array(pids, dtype=np.int64))
+        col = np.array([(day - first_day).days for day in days], dtype=np.int64)
+        np.add.at(demand, (row, col), np.array(qtys, dtype=np.float64))
+
+    # suavizado exponencial, arrancando desde la media de la ventana para no sesgar hacia 0
+    smoothed = demand.mean(axis=1)
+    for day in range(WINDOW_DAYS):
+        smoothed = ALPHA * demand[:, day] + (1 - ALPHA) * smoothed
+    moving_average = demand[:, -MOVING_AVERAGE_DAYS:].mean(axis=1)
+    sigma = demand.std(axis=1)
+
+    return {
+        pid: {
+            'product_id': pid,
+            'name': name,
+            'stock': stock or 0.0,
+            'rate': float(smoothed[i]),
+            'moving_average': float(moving_average[i]),
+            'sigma': float(sigma[i])
+        }
+        for i, (pid, name, stock) in enumerate(catalog)
+    }
+
+
+def _demand_queries(first_day, today, product_ids):
+    """(productos, ventas diarias de [first_day, today)) del catálogo o de `product_ids`."""
+    products = db.select(Product.id, Product.name, Product.stock_qty).order_by(Product.id)
+    sales = db.select(DailySales.product_id, DailySales.day, DailySales.quantity).where(
+        DailySales.day >= first_day, DailySales.day < today
+    )
+    if product_ids is not None:
+        products = products.where(Product.id.in_(product_ids))
+        sales = sales.where(DailySales.product_id.in_(product_ids))
+    return products, sales
+
+
+def _changed_products_query(last_id):
+    # sin DISTINCT: con él SQLite recorre todo el índice (product_id, date) en vez del rango de ids nuevos
+    return db.select(StockMovement.product_id).where(StockMovement.id > last_id)
+
+
+def suggestion(stats: dict, lead_time_days: float, review_days: float) -> dict:
+    """
+    Punto de pedido = demanda durante la reposición + stock de seguridad (z·σ·√plazo).
+    Si el stock está en o por debajo del punto de pedido, sugiere reponer hasta cubrir
+    plazo + período de revisión.
+    """
+    rate = stats['rate']
+    safety = SERVICE_Z * stats['sigma'] * math.sqrt(lead_time_days)
+    reorder_point = rate * lead_time_days + safety
+    target = rate * (lead_time_days + review_days) + safety
+    stock = stats['stock']
+    return dict(
+        stats,
+        days_until_stockout=stock / rate if rate > 0 else None,
+        reorder_point=reorder_point,
+        safety_stock=safety,
+        reorder=rate > 0 and stock <= reorder_point,
+        suggested_quantity=max(target - stock, 0.0) if rate > 0 and stock <= reorder_point else 0.0
+    )
+
+
+class ReplenishmentCache:
+    """
+    Estadísticas de demanda en memoria, recalculadas solo para los productos que tuvieron
+    una venta o compra desde el último cálculo. Toda venta, compra o anulación deja filas
+    en el libro (stock_movement): se guarda el último id visto y las filas nuevas dicen
+    qué productos recalcular (un rango sobre la clave primaria, ve también a otros workers).
+    Un día nuevo o un producto nuevo recalculan todo.
+    """
+
+    def __init__(self):
+        self._stats = {}
+        self._mark = None   # (día, último id del libro, último id de producto)
+        self._lock = threading.Lock()
+        self.full_refreshes = 0
+        self.partial_refreshes = 0
+        self.hits = 0
+
+    def get(self) -> list[dict]:
+        today = datetime.utcnow().date()
+        last_movement, last_product = db.session.execute(db.select(
+            db.select(db.func.max(StockMovement.id)).scalar_subquery(),
+            db.select(db.func.max(Product.id)).scalar_subquery()
+        )).one()
+
+        with self._lock:
+            mark, stats = self._mark, self._stats
+        if mark is None or mark[0] != today or mark[2] != last_product:
+            stats = demand_stats(today=today)
+            self.full_refreshes += 1
+        elif mark[1] != last_movement:
+            changed = sorted(set(db.session.scalars(_changed_products_query(mark[1] or 0))))
+            stats = dict(stats)
+            stats.update(demand_stats(changed, today=today))
+            self.partial_refreshes += 1
+        else:
+            self.hits += 1
+
+        with self._lock:
+            self._mark = (today, last_movement, last_product)
+            self._stats = stats
+        return [stats[pid] for pid in sorted(stats)]
+
+    def clear(self):
+        with self._lock:
+            self._mark = None
+            self._stats = {}
+
+    def stats(self) -> dict:
+        return {
+            'products': len(self._stats),
+            'hits': self.hits,
+            'partial_refreshes': self.partial_refreshes,
+            'full_refreshes': self.full_refreshes
+        }
+
+
+replenishment_cache = ReplenishmentCache()
@@ -0,0 +1,196 @@
+from collections import defaultdict
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from app import db
+from app.models.sale import Sale
+from app.models.sale_item import SaleItem
+from app.models.daily_sales import DailySales
+
+
+def apply_sale(sale: Sale, sign: int = 1):
+    """
+    Suma (sign=1) o resta (sign=-1) los items de una venta en el acumulado diario.
+    No hace commit: corre dentro de la misma transacción que la venta.
+    """
+    apply_lines(
+        sale.date.date(),
+        ((i.product_id, i.quantity, i.price_at_sale, i.unit_cost) for i in sale.items),
+        sign
+    )
+
+
+def apply_lines(day, lines, sign: int = 1):
+    """lines: iterable de (product_id, quantity, price_at_sale, unit_cost) vendidos en `day`."""
+    totals = defaultdict(lambda: [0.0, 0.0, 0.0])
+    for product_id, quantity, price, unit_cost in lines:
+        t = totals[product_id]
+        t[0] += quantity
+        t[1] += quantity * price
+        t[2] += quantity * (unit_cost or 0.0)
+
+    # UPSERT con incremento relativo: dos workers que venden el mismo día no pisan sus totales
+    upsert = _upsert()
+    for product_id, (quantity, revenue, cost) in totals.items():
+        db.session.execute(upsert(
+            day=day, product_id=product_id,
+            quantity=sign * quantity, revenue=sign * revenue, cost=sign * cost
+        ))
+
+
+def check_dialect(name: str):
+    """create_app la llama al arrancar: sin UPSERT ni períodos para el motor, cada venta fallaría."""
+    if name not in _PERIODS:
+        raise RuntimeError(
+            f'Base de datos {name} no soportada: el acumulado diario (daily_sales) requiere {", ".join(_PERIODS)}'
+        )
+
+
+def _dialect() -> str:
+    name = db.session.get_bind().dialect.name
+    check_dialect(name)
+    return name
+
+
+def _upsert():
+    """INSERT ... ON CONFLICT / ON DUPLICATE KEY que suma sobre la fila (day, product_id) existente."""
+    dialect = _dialect()
+    if dialect == 'mysql':
+        def build(**values):
+            stmt = mysql.insert(DailySales).values(**values)
+            return stmt.on_duplicate_key_update(
+                quantity=DailySales.quantity + stmt.inserted.quantity,
+                revenue=DailySales.revenue + stmt.inserted.revenue,
+                cost=DailySales.cost + stmt.inserted.cost,
+            )
+        return build
+
+    insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+
+    def build(**values):
+        stmt = insert(DailySales).values(**values)
+        return stmt.on_conflict_do_update(
+            index_elements=['day', 'product_id'],
+            set_={
+                'quantity': DailySales.quantity + stmt.excluded.quantity,
+                'revenue': DailySales.revenue + stmt.excluded.revenue,
+                'cost': DailySales.cost + stmt.excluded.cost,
+            }
+        )
+    return build
+
+
+def remove_sales(sale_ids):
+    """
+    Resta del acumulado diario los items de varias ventas con un solo UPDATE ... FROM
+    (agregado por día y producto). Las filas existen: se crearon al registrar cada venta.
+    """
+    day = db.func.date(Sale.date).label('day')
+    totals = (
+        db.select(
+            day,
+            SaleItem.product_id,
+            db.func.sum(SaleItem.quantity).label('quantity'),
+            db.func.sum(SaleItem.quantity * SaleItem.price_at_sale).label('revenue'),
+            db.func.sum(SaleItem.quantity * db.func.coalesce(SaleItem.unit_cost, 0.0)).label('cost'),
+        )
+        .join(SaleItem, SaleItem.sale_id == Sale.id)
+        .where(Sale.id.in_(sale_ids))
+        .group_by(day, SaleItem.product_id)
+        .subquery()
+    )
+    db.session.execute(
+        db.update(DailySales)
+        .where(DailySales.day == totals.c.day, DailySales.product_id == totals.c.product_id)
+        .values(
+            quantity=DailySales.quantity - totals.c.quantity,
+            revenue=DailySales.revenue - totals.c.revenue,
+            cost=DailySales.cost - totals.c.cost
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def rebuild():
+    """Recalcula todo el acumulado desde Sale/SaleItem. Devuelve la cantidad de filas generadas."""
+    day = db.func.date(Sale.date)
+    select = (
+        db.select(
+            day,
+            SaleItem.product_id,
+            db.func.sum(SaleItem.quantity),
+            db.func.sum(SaleItem.quantity * SaleItem.price_at_sale),
+            db.func.sum(SaleItem.quantity * db.func.coalesce(SaleItem.unit_cost, 0.0)),
+        )
+        .join(SaleItem, SaleItem.sale_id == Sale.id)
+        .group_by(day, SaleItem.product_id)
+    )
+
+    db.session.execute(db.delete(DailySales))
+    db.session.execute(
+        db.insert(DailySales).from_select(
+            ['day', 'product_id', 'quantity', 'revenue', 'cost'], select
+        )
+    )
+    db.session.commit()
+    return db.session.query(DailySales).count()
+
+
+# Etiqueta de cada período como texto ('2025-01-06', '2025-01'); la semana es la del lunes
+_PERIODS = {
+    'sqlite': {
+        'day': lambda col: db.func.date(col),
+        'week': lambda col: db.func.date(col, 'weekday 0', '-6 days'),
+        'month': lambda col: db.func.strftime('%Y-%m', col),
+    },
+    'postgresql': {
+        'day': lambda col: db.func.to_char(col, 'YYYY-MM-DD'),
+        'week': lambda col: db.func.to_char(db.func.date_trunc('week', col), 'YYYY-MM-DD'),
+        'month': lambda col: db.func.to_char(col, 'YYYY-MM'),
+    },
+    'mysql': {
+        'day': lambda col: db.func.date_format(col, '%Y-%m-%d'),
+        'week': lambda col: db.func.date_format(db.func.subdate(col, db.func.weekday(col)), '%Y-%m-%d'),
+        'month': lambda col: db.func.date_format(col, '%Y-%m'),
+    },
+}
+
+
+def summary(start, end, granularity='day', product_id=None):
+    """Totales por período entre los días start y end (inclusive), leyendo solo el acumulado."""
+    periods = []
+    total = 0.0
+    total_profit = 0.0
+    for p, quantity, revenue, cost in db.session.execute(_summary_query(start, end, granularity, product_id)):
+        periods.append({
+            'period': p,
+            'quantity': round(quantity, 2),
+            'total': round(revenue, 2),
+            'cost': round(cost, 2),
+            'profit': round(revenue - cost, 2)
+        })
+        total += revenue
+        total_profit += revenue - cost
+
+    return {
+        'granularity': granularity,
+        'periods': periods,
+        'total': round(total, 2),
+        'total_profit': round(total_profit, 2)
+    }
+
+
+def _summary_query(start, end, granularity, product_id):
+    period = _PERIODS[_dialect()][granularity](DailySales.day).label('period')
+    query = (
+        db.select(
+            period,
+            db.func.sum(DailySales.quantity),
+            db.func.sum(DailySales.revenue),
+            db.func.sum(DailySales.cost),
+        )
+        .where(DailySales.day >= start, DailySales.day <= end)
+        .group_by(period)
+        .order_by(period)
+    )
+    if product_id is not None:
+        query = query.where(DailySales.product_id == product_id)
+    return query
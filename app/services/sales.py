@@ -0,0 +1,459 @@
+import math
+from collections import defaultdict
+from app import db
+from app.models.product import Product
+from app.models.batch import Batch
+from app.models.purchase import Purchase
+from app.models.sale import Sale
+from app.models.sale_item import SaleItem
+from app.models.stock_movement import StockMovement
+from app.services import ledger, rollup
+from app.services.stock import lock_products
+
+# Lotes por producto de la primera página de basket_snapshot (las siguientes duplican)
+SNAPSHOT_PAGE = 8
+
+
+class AllocationError(Exception):
+    """Un item de la canasta no se puede asignar (producto inexistente, cantidad inválida o sin stock)."""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+def item_product_id(item) -> int:
+    """product_id de un item como entero (acepta "1", como la búsqueda por clave primaria); 400 si no es un id."""
+    if not isinstance(item, dict):
+        raise AllocationError(f'Item inválido: {item!r}', 400)
+    value = item.get('product_id')
+    try:
+        product_id = int(value)
+        if isinstance(value, bool) or (isinstance(value, float) and value != product_id):
+            raise ValueError
+    except (TypeError, ValueError):
+        raise AllocationError(f'product_id inválido: {value!r}', 400) from None
+    return product_id
+
+
+def item_quantity(item) -> float:
+    """quantity de un item como float (acepta "1.5"); 400 si falta, no es un número o no es > 0."""
+    value = item.get('quantity')
+    try:
+        quantity = float(value)
+        if isinstance(value, bool) or not math.isfinite(quantity):
+            raise ValueError
+    except (TypeError, ValueError):
+        raise AllocationError(f'quantity inválida: {value!r}', 400) from None
+    if quantity <= 0:
+        raise AllocationError('La cantidad debe ser > 0', 400)
+    return quantity
+
+
+def basket_snapshot(items) -> dict:
+    """
+    Lectura de los productos de la canasta con sus lotes con stock, ya en orden de venta
+    (más caro primero, a igual costo el más viejo): {product_id: (markup, [(batch_id, cost, quantity)])}.
+    Una sola consulta trae los productos con la primera página de lotes de cada uno (FIRST_PAGES);
+    solo los productos cuya página no cubre lo pedido siguen leyendo, por clave (cost, date_added, id)
+    sobre el índice (product_id, cost DESC, date_added), páginas del doble de la anterior.
+    Los productos sin lotes con stock quedan con lista vacía (así se distingue de "no encontrado").
+    """
+    needed = defaultdict(float)
+    for item in items:
+        try:
+            product_id = item_product_id(item)
+        except AllocationError:
+            continue   # allocate() informa el error
+        try:
+            needed[product_id] += item_quantity(item)
+        except AllocationError:
+            needed[product_id] += 0.0
+
+    snapshot, last = {}, {}
+    for product_id, markup, batch_id, cost, quantity, date_added in db.session.execute(
+        FIRST_PAGES, {'product_ids': list(needed), 'page': SNAPSHOT_PAGE}
+    ):
+        _, batches = snapshot.setdefault(product_id, (markup, []))
+        if batch_id is not None:
+            batches.append((batch_id, cost, quantity))
+            last[product_id] = (cost, date_added, batch_id)
+    for product_id, (_, batches) in snapshot.items():
+        if len(batches) == SNAPSHOT_PAGE:
+            _more_batches(product_id, batches, needed[product_id], last[product_id])
+    return snapshot
+
+
+def _more_batches(product_id, batches, quantity, after):
+    covered = sum(qty for _, _, qty in batches)
+    page = SNAPSHOT_PAGE * 2
+    while covered < quantity:
+        cost, date_added, batch_id = after
+        rows = db.session.execute(BATCH_PAGE, {
+            'product_id': product_id, 'cost': cost, 'date_added': date_added, 'batch_id': batch_id, 'page': page
+        }).all()
+        batches.extend((batch_id, cost, qty) for batch_id, cost, qty, _ in rows)
+        covered += sum(qty for _, _, qty, _ in rows)
+        if len(rows) < page:
+            return
+        batch_id, cost, _, date_added = rows[-1]
+        after = (cost, date_added, batch_id)
+        page *= 2
+
+
+def _first_pages():
+    # LIMIT correlacionado sobre el índice: con ROW_NUMBER() OVER (PARTITION BY product_id) SQLite
+    # numera todos los lotes del producto antes de filtrar (tanto como leerlos todos)
+    ranked = db.aliased(Batch, name='ranked')
+    first = (
+        db.select(ranked.id)
+        .where(ranked.product_id == Product.id, ranked.quantity > 0)
+        .order_by(ranked.cost.desc(), ranked.date_added, ranked.id)
+        .limit(db.bindparam('page', type_=db.Integer))
+        .correlate(Product)
+    )
+    return (
+        db.select(Product.id, Product.markup, Batch.id, Batch.cost, Batch.quantity, Batch.date_added)
+        .outerjoin(Batch, Batch.id.in_(first))
+        .where(Product.id.in_(db.bindparam('product_ids', expanding=True)))
+        .order_by(Product.id, Batch.cost.desc(), Batch.date_added, Batch.id)
+    )
+
+
+def _batch_page():
+    # por clave: sigue el índice desde el último lote leído, sin volver a recorrer lo anterior (OFFSET sí)
+    cost = db.bindparam('cost', type_=db.Float)
+    date_added = db.bindparam('date_added', type_=db.DateTime)
+    return (
+        db.select(Batch.id, Batch.cost, Batch.quantity, Batch.date_added)
+        .where(
+            Batch.product_id == db.bindparam('product_id', type_=db.Integer), Batch.quantity > 0,
+            Batch.cost <= cost,
+            db.or_(
+                Batch.cost < cost,
+                Batch.date_added > date_added,
+                db.and_(Batch.date_added == date_added, Batch.id > db.bindparam('batch_id', type_=db.Integer))
+            )
+        )
+        .order_by(Batch.cost.desc(), Batch.date_added, Batch.id)
+        .limit(db.bindparam('page', type_=db.Integer))
+    )
+
+
+# Consultas de basket_snapshot, armadas una vez (armarlas cuesta más que ejecutarlas):
+# FIRST_PAGES(product_ids, page): productos con sus primeros `page` lotes con stock en orden de venta
+#   (product_id, markup, batch_id, cost, quantity, date_added), lote en None si no tiene stock;
+# BATCH_PAGE(product_id, cost, date_added, batch_id, page): los `page` lotes siguientes a esa clave.
+FIRST_PAGES = _first_pages()
+BATCH_PAGE = _batch_page()
+
+
+def allocate(items, snapshot, available=None):
+    """
+    Asigna una canasta sobre un snapshot de lotes (función pura, sin base de datos).
+    Regla de venta: lote más caro primero; precio unitario = costo del lote * (1 + markup/100).
+    items: [{'product_id': 1, 'quantity': 3}] (product_id también como texto, "1"); snapshot: ver basket_snapshot().
+    available: batch_id -> kg disponibles, compartido entre varias canastas (carga masiva); si se pasa,
+    solo se descuenta si la canasta completa se puede asignar. Sin `available` se usa el snapshot.
+    Devuelve (per_item, total): per_item[i] son las líneas del item i, [(product_id, batch_id, qty, precio, costo)]
+    una por lote tocado. Lanza AllocationError si algún item no se puede asignar.
+    """
+    if not items:
+        raise AllocationError('Debe incluir items', 400)
+
+    taken = {}
+    per_item = []
+    total = 0.0
+    for item in items:
+        product_id = item_product_id(item)
+        entry = snapshot.get(product_id)
+        if entry is None:
+            raise AllocationError(f'Producto {product_id} no encontrado', 404)
+        markup, batches = entry
+
+        qty_to_sell = item_quantity(item)
+
+        lines = []
+        for batch_id, cost, quantity in batches:
+            if qty_to_sell <= 0:
+                break
+            stock = available[batch_id] if available is not None else quantity
+            remaining = stock - taken.get(batch_id, 0.0)
+            if remaining <= 0:
+                continue
+
+            take_qty = min(remaining, qty_to_sell)
+            sale_price_unit = cost * (1 + markup / 100.0)
+            lines.append((product_id, batch_id, take_qty, sale_price_unit, cost))
+            taken[batch_id] = taken.get(batch_id, 0.0) + take_qty
+            qty_to_sell -= take_qty
+            total += take_qty * sale_price_unit
+
+        if qty_to_sell > 0:
+            raise AllocationError(f'Stock insuficiente para producto {product_id}', 409)
+        per_item.append(lines)
+
+    if available is not None:
+        for batch_id, qty in taken.items():
+            available[batch_id] -= qty
+    return per_item, total
+
+
+def _restore_lines(sale_ids):
+    """
+    Subconsulta con una fila por item de las ventas:
+    (sale_id, product_id, target_id, quantity, unit_cost, source_id, redirect_id).
+    target_id es el lote al que vuelve el stock:
+    - el lote original, si existe y no lo reemplazó una consolidación vigente;
+    - si no, el lote actual del producto que se vendería primero (el más caro: el consolidado).
+    Si ese consolidado es el de la primera consolidación posterior al lote original (sin contar la que
+    lo creó, si es un consolidado), redirect_id es esa compra y source_id el lote original: lo repuesto
+    se registra como movido por la consolidación, así anularla lo devuelve al lote original.
+    No depende de las cantidades, así que da lo mismo antes o después del UPDATE.
+    """
+    original = db.aliased(Batch)
+    current = db.aliased(Batch)
+    # una consolidación vigente (las anuladas se borran) posterior al lote lo dejó sin uso,
+    # aunque ya estuviera en 0 y no haya tenido consolidation_out
+    consolidated_away = db.exists().where(
+        Purchase.product_id == original.product_id,
+        Purchase.action == 'consolidate',
+        Purchase.date >= original.date_added,
+        Purchase.created_batch_id.is_distinct_from(original.id)
+    )
+    kept = (
+        db.select(original.id)
+        .where(original.id == SaleItem.batch_id, original.product_id == SaleItem.product_id, ~consolidated_away)
+        .scalar_subquery()
+    )
+    fallback = (
+        db.select(current.id)
+        .where(current.product_id == SaleItem.product_id)
+        .order_by(current.cost.desc(), current.date_added)
+        .limit(1)
+        .scalar_subquery()
+    )
+    # alta del lote original: su fecha, o la de su primer movimiento si ya no existe (podado)
+    created = db.func.coalesce(
+        db.select(original.date_added).where(original.id == SaleItem.batch_id).scalar_subquery(),
+        db.select(db.func.min(StockMovement.date)).where(StockMovement.batch_id == SaleItem.batch_id).scalar_subquery()
+    )
+    items = (
+        db.select(
+            SaleItem.sale_id,
+            SaleItem.product_id,
+            SaleItem.batch_id,
+            SaleItem.quantity,
+            SaleItem.unit_cost,
+            kept.label('kept_id'),
+            fallback.label('fallback_id'),
+            created.label('created')
+        )
+        .where(SaleItem.sale_id.in_(sale_ids))
+        .subquery('items')
+    )
+    first = db.aliased(Purchase)
+    first_consolidation = (
+        db.select(first.id)
+        .where(
+            first.product_id == items.c.product_id,
+            first.action == 'consolidate',
+            first.date >= items.c.created,
+            first.created_batch_id.is_distinct_from(items.c.batch_id)   # no la que creó el lote
+        )
+        .order_by(first.date, first.id)
+        .limit(1)
+        .correlate(items)
+        .scalar_subquery()
+    )
+    redirect = (
+        db.select(Purchase.id)
+        .where(Purchase.id == first_consolidation, Purchase.created_batch_id == items.c.fallback_id)
+        .correlate(items)
+        .scalar_subquery()
+    )
+    lines = (
+        db.select(items, db.case((items.c.kept_id.is_(None), redirect)).label('redirect_id'))
+        .subquery('lines')
+    )
+    return (
+        db.select(
+            lines.c.sale_id,
+            lines.c.product_id,
+            db.func.coalesce(lines.c.kept_id, lines.c.fallback_id).label('target_id'),
+            lines.c.quantity,
+            lines.c.unit_cost,
+            db.case((lines.c.redirect_id.is_not(None), lines.c.batch_id)).label('source_id'),
+            lines.c.redirect_id
+        )
+        .subquery('restore')
+    )
+
+
+def _recreate_pruned(sale_ids):
+    """
+    Lotes vendidos que stock.prune_empty borró al quedar en 0: se recrean vacíos con el mismo id,
+    costo y fecha (la de su primer movimiento en el libro), para que lo anulado vuelva a su lote.
+    No se recrean los que una consolidación vigente posterior reemplazó (ese stock va al consolidado).
+    Un solo INSERT ... SELECT, sin importar cuántos lotes sean.
+    """
+    db.session.execute(
+        db.insert(Batch).from_select(['id', 'product_id', 'cost', 'quantity', 'date_added'], _pruned_query(sale_ids))
+    )
+
+
+def _pruned_query(sale_ids):
+    """(id, product_id, cost, 0, date_added) de los lotes a recrear para _recreate_pruned."""
+    created = db.func.coalesce(
+        db.select(db.func.min(StockMovement.date))
+        .where(StockMovement.batch_id == SaleItem.batch_id)
+        .scalar_subquery(),
+        db.func.min(Sale.date)
+    )
+    pruned = (
+        db.select(
+            SaleItem.batch_id.label('id'),
+            db.func.min(SaleItem.product_id).label('product_id'),
+            db.func.max(SaleItem.unit_cost).label('cost'),
+            created.label('created')
+        )
+        .join(Sale, Sale.id == SaleItem.sale_id)
+        .where(
+            SaleItem.sale_id.in_(sale_ids),
+            SaleItem.unit_cost.is_not(None),
+            ~db.exists().where(Batch.id == SaleItem.batch_id)
+        )
+        .group_by(SaleItem.batch_id)
+        .subquery('pruned')
+    )
+    consolidated_away = db.exists().where(
+        Purchase.product_id == pruned.c.product_id,
+        Purchase.action == 'consolidate',
+        Purchase.date >= pruned.c.created,
+        Purchase.created_batch_id.is_distinct_from(pruned.c.id)   # no la que creó el lote (como _restore_lines)
+    )
+    return (
+        db.select(pruned.c.id, pruned.c.product_id, pruned.c.cost, db.literal(0.0), pruned.c.created)
+        .where(~consolidated_away)
+    )
+
+
+def _ensure_batches(sale_ids):
+    """Productos sin ningún lote (caso raro: todo se anuló/borró): se crea uno vacío al último costo vendido."""
+    orphans = db.session.execute(
+        db.select(SaleItem.product_id, db.func.max(SaleItem.unit_cost), db.func.max(SaleItem.price_at_sale))
+        .where(
+            SaleItem.sale_id.in_(sale_ids),
+            ~db.exists().where(Batch.product_id == SaleItem.product_id)
+        )
+        .group_by(SaleItem.product_id)
+    ).all()
+    for product_id, unit_cost, price in orphans:
+        db.session.add(Batch(product_id=product_id, cost=unit_cost or price, quantity=0.0))
+    if orphans:
+        db.session.flush()
+        db.session.execute(
+            db.update(Product)
+            .where(Product.id.in_([pid for pid, _, _ in orphans]), Product.max_cost.is_(None))
+            .values(max_cost=db.select(db.func.max(Batch.cost)).where(Batch.product_id == Product.id).scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+
+
+def annul_sales(sale_ids) -> dict:
+    """
+    Anula varias ventas en la transacción actual (sin commit), con sentencias por conjunto
+    (la cantidad de sentencias no depende de cuántas ventas ni items haya):
+    - los lotes podados en 0 (stock.prune_empty) se recrean con su id, salvo los consolidados;
+    - un UPDATE batch ... FROM (SELECT lote, SUM(cantidad) ... GROUP BY lote) repone el stock;
+      lo vendido de lotes que ya no existen o que se consolidaron va al lote consolidado actual;
+    - un UPDATE product ... FROM (...) ajusta stock_qty;
+    - movimientos en el libro (ver _restore_movements), el acumulado diario y el borrado de ventas e items.
+    Devuelve {'annulled': [ids], 'not_found': [ids], 'restored': [...], 'product_ids': {...}}.
+    """
+    requested = list(dict.fromkeys(int(sid) for sid in sale_ids))
+    lock_products(db.select(SaleItem.product_id).where(SaleItem.sale_id.in_(requested)).distinct())
+    dates = dict(db.session.execute(db.select(Sale.id, Sale.date).where(Sale.id.in_(requested))).all())
+    found = [sid for sid in requested if sid in dates]
+    if not found:
+        return {'annulled': [], 'not_found': requested, 'restored': [], 'product_ids': set()}
+
+    _recreate_pruned(found)
+    _ensure_batches(found)
+    lines = _restore_lines(found)
+    restored = db.session.execute(_restored_query(lines)).all()
+
+    per_batch = (
+        db.select(lines.c.target_id, db.func.sum(lines.c.quantity).label('quantity'))
+        .group_by(lines.c.target_id)
+        .subquery()
+    )
+    db.session.execute(
+        db.update(Batch)
+        .where(Batch.id == per_batch.c.target_id)
+        .values(quantity=Batch.quantity + per_batch.c.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    per_product = (
+        db.select(SaleItem.product_id, db.func.sum(SaleItem.quantity).label('quantity'))
+        .where(SaleItem.sale_id.in_(found))
+        .group_by(SaleItem.product_id)
+        .subquery()
+    )
+    db.session.execute(
+        db.update(Product)
+        .where(Product.id == per_product.c.product_id)
+        .values(stock_qty=Product.stock_qty + per_product.c.quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+    ledger.record(_restore_movements(restored))
+    rollup.remove_sales(found)
+    db.session.execute(db.delete(SaleItem).where(SaleItem.sale_id.in_(found)))
+    db.session.execute(db.delete(Sale).where(Sale.id.in_(found)))
+
+    return {
+        'annulled': found,
+        'not_found': [sid for sid in requested if sid not in dates],
+        'restored': [
+            {'sale_id': sid, 'product_id': pid, 'batch_id': bid, 'quantity': qty}
+            for (sid, pid, bid), qty in _per_target(restored).items()
+        ],
+        'product_ids': {row[1] for row in restored}
+    }
+
+
+def _restored_query(lines):
+    """Lo repuesto por (venta, producto, lote destino, lote origen, consolidación), con el costo del destino."""
+    return (
+        db.select(
+            lines.c.sale_id, lines.c.product_id, lines.c.target_id, Batch.cost,
+            db.func.sum(lines.c.quantity), lines.c.source_id, lines.c.redirect_id,
+            db.func.coalesce(db.func.max(lines.c.unit_cost), Batch.cost)
+        )
+        .join(Batch, Batch.id == lines.c.target_id)
+        .group_by(lines.c.sale_id, lines.c.product_id, lines.c.target_id, lines.c.source_id, lines.c.redirect_id)
+        .order_by(lines.c.sale_id, lines.c.target_id, lines.c.source_id)
+    )
+
+
+def _per_target(restored) -> dict:
+    totals = {}
+    for sid, pid, bid, _, qty, _, _, _ in restored:
+        totals[(sid, pid, bid)] = totals.get((sid, pid, bid), 0.0) + qty
+    return totals
+
+
+def _restore_movements(restored):
+    """
+    Movimientos del libro por lo repuesto. Lo que vuelve al lote original es un "reversal";
+    lo redirigido al consolidado entra al lote original y la consolidación lo mueve
+    (consolidation_out / consolidation_in con su purchase_id, como el resto de lo que movió).
+    """
+    for sid, pid, bid, cost, qty, source_id, redirect_id, source_cost in restored:
+        if redirect_id is None:
+            yield ledger.movement('reversal', pid, bid, qty, cost, sale_id=sid)
+            continue
+        yield ledger.movement('reversal', pid, source_id, qty, source_cost, sale_id=sid)
+        yield ledger.movement('consolidation_out', pid, source_id, -qty, source_cost, purchase_id=redirect_id)
+        yield ledger.movement('consolidation_in', pid, bid, qty, cost, purchase_id=redirect_id)
@@ -0,0 +1,95 @@
+import json
+from datetime import date, datetime
+from flask.json.provider import DefaultJSONProvider
+from app import db
+from app.models.sale import Sale
+from app.models.sale_item import SaleItem
+from app.models.purchase import Purchase
+from app.models.price_history import PriceHistory
+
+try:
+    import orjson   # opcional: si está instalado, se usa para todo el JSON de las respuestas
+except ImportError:
+    orjson = None
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+def _default(value):
+    """Tipos que json no conoce: fechas en ISO (igual que el .isoformat() que hacían las rutas)."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} no es serializable a JSON')
+
+
+def dumps(obj, sort_keys=True) -> bytes:
+    """JSON compacto en bytes; claves ordenadas como el jsonify de Flask salvo sort_keys=False."""
+    if orjson is not None:
+        option = _ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _ORJSON_OPTIONS
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(obj, default=_default, sort_keys=sort_keys, separators=(',', ':')).encode()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON de la app (jsonify): orjson si está instalado, si no el json de la stdlib.
+    Las fechas salen en ISO, así las rutas pueden devolver datetime sin convertirlos a mano.
+    """
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return dumps(obj).decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+def execute(stmt):
+    """Ejecuta en la conexión de la sesión (misma transacción) sin pasar por el ORM: filas Row livianas."""
+    return db.session.connection().execute(stmt)
+
+
+class RowSchema:
+    """
+    Encoder por modelo que trabaja sobre tuplas `Row` (sin instanciar objetos del ORM):
+    select() arma la consulta con las columnas del esquema y encode() convierte cada fila en dict.
+    `columns`: pares (nombre en la respuesta, columna).
+    """
+
+    def __init__(self, *columns):
+        self.names = tuple(name for name, _ in columns)
+        self.columns = tuple(column for _, column in columns)
+
+    def select(self, *extra):
+        return db.select(*self.columns, *extra)
+
+    def fetch(self, stmt) -> list[dict]:
+        """Ejecuta `stmt` en Core (sin la capa de carga del ORM) y codifica las filas."""
+        return self.encode(execute(stmt))
+
+    def encode(self, rows) -> list[dict]:
+        names = self.names
+        return [dict(zip(names, row)) for row in rows]
+
+    def encode_one(self, row) -> dict:
+        return dict(zip(self.names, row))
+
+
+# Esquemas de los listados (mismas claves que devolvían las rutas)
+SALE = RowSchema(('id', Sale.id), ('date', Sale.date), ('total', Sale.total))
+SALE_ITEM = RowSchema(
+    ('product_id', SaleItem.product_id), ('batch_id', SaleItem.batch_id),
+    ('quantity', SaleItem.quantity), ('price_at_sale', SaleItem.price_at_sale)
+)
+PURCHASE = RowSchema(
+    ('id', Purchase.id), ('date', Purchase.date), ('product_id', Purchase.product_id),
+    ('action', Purchase.action), ('unit_cost', Purchase.unit_cost), ('quantity', Purchase.quantity),
+    ('created_batch_id', Purchase.created_batch_id)
+)
+PRICE_HISTORY = RowSchema(
+    ('id', PriceHistory.id), ('product_id', PriceHistory.product_id), ('cost', PriceHistory.cost),
+    ('price', PriceHistory.price), ('date', PriceHistory.date)
+)
@@ -0,0 +1,99 @@
+from collections import defaultdict
+from sqlalchemy import Select
+from app import db
+from app.models.product import Product
+from app.models.batch import Batch
+
+# Reintentos de una venta cuando otro worker consumió el mismo lote entre la lectura y el UPDATE
+MAX_RETRIES = 5
+
+# Tolerancia de las cantidades (kg): las tomas de un lote se suman en Python y pueden pasarse por 1 ulp
+EPSILON = 1e-9
+
+
+class StockConflict(Exception):
+    """Un lote ya no tiene la cantidad leída: hay que releer y reasignar."""
+
+
+def lock_products(product_ids):
+    """
+    Serializa escrituras sobre estos productos hasta el commit: UPDATE no-op sobre sus filas
+    (lock de fila en motores con MVCC; en SQLite toma el lock de escritura de la base).
+    Llamar antes de leer lotes que luego se van a reescribir (compras, anulaciones).
+    product_ids: ids, o un SELECT de ids (se resuelve dentro de la misma sentencia).
+    """
+    ids = product_ids if isinstance(product_ids, Select) else list(product_ids)
+    if isinstance(ids, Select) or ids:
+        db.session.execute(
+            db.update(Product).where(Product.id.in_(ids)).values(id=Product.id)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def take(takes):
+    """
+    Descuenta stock con UPDATE condicional: `quantity = quantity - :qty WHERE quantity >= :qty`,
+    con tolerancia EPSILON (lo que queda por debajo de EPSILON pasa a 0).
+    takes: iterable de (product_id, batch_id, qty). Si algún lote no alcanza, lanza StockConflict
+    (el llamador hace rollback y reintenta con datos frescos). Los lotes que quedan en 0 se podan.
+    """
+    per_batch = _group(takes)
+    per_product = defaultdict(float)
+    for (product_id, batch_id), qty in per_batch.items():
+        left = Batch.quantity - qty
+        result = db.session.execute(
+            db.update(Batch)
+            .where(Batch.id == batch_id, Batch.quantity >= qty - EPSILON)
+            .values(quantity=db.case((left > EPSILON, left), else_=0.0))
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            raise StockConflict()
+        per_product[product_id] -= qty
+    _add_to_products(per_product)
+    prune_empty(per_product.keys(), [batch_id for _, batch_id in per_batch])
+
+
+def prune_empty(product_ids, batch_ids=None):
+    """
+    Borra los lotes en 0 de estos productos, salvo el más caro de cada uno (sostiene max_cost y la
+    regla de consolidación). Así la lectura en orden de venta no recorre lotes agotados.
+    batch_ids: solo mirar estos lotes (una venta solo vacía los que tocó).
+    Ventas y libro conservan el batch_id (los ids no se reutilizan): al anular una venta el lote
+    se recrea o el stock va al consolidado (services.sales); al anular una consolidación,
+    _previous_batch lo recrea.
+    """
+    ids = list(product_ids)
+    if not ids:
+        return
+    higher = db.aliased(Batch)
+    scope = Batch.id.in_(list(batch_ids)) if batch_ids is not None else Batch.product_id.in_(ids)
+    db.session.execute(
+        db.delete(Batch)
+        .where(
+            scope,
+            Batch.quantity <= EPSILON,
+            db.exists().where(
+                higher.product_id == Batch.product_id,
+                db.or_(higher.cost > Batch.cost, db.and_(higher.cost == Batch.cost, higher.id > Batch.id))
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _group(moves):
+    grouped = defaultdict(float)
+    for product_id, batch_id, qty in moves:
+        grouped[(product_id, batch_id)] += qty
+    return grouped
+
+
+def _add_to_products(deltas: dict):
+    for product_id, delta in deltas.items():
+        db.session.execute(
+            db.update(Product)
+            .where(Product.id == product_id)
+            .values(stock_qty=Product.stock_qty + delta)
+            .execution_options(synchronize_session=False)
+        )
@@ -0,0 +1,122 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from app import db
+from app.models.product import Product
+from app.models.stock_movement import StockMovement
+
+
+def valuation_at(at: datetime) -> dict:
+    """
+    Valorización del inventario a la fecha `at` (cantidad × costo de cada lote), reconstruida
+    desde el libro de movimientos con una sola consulta agregada: saldo por lote, luego por producto.
+    """
+    rows = db.session.execute(_valuation_query(at)).all()
+
+    products = [{
+        'product_id': product_id,
+        'name': name,
+        'stock': stock,
+        'value': value,
+        'avg_cost': value / stock,
+        'batches': batches
+    } for product_id, name, stock, value, batches in rows]
+    return {
+        'at': at.isoformat(),
+        'total_stock': sum(p['stock'] for p in products),
+        'total_value': sum(p['value'] for p in products),
+        'products': products
+    }
+
+
+def _valuation_query(at):
+    per_batch = (
+        db.select(
+            StockMovement.product_id,
+            db.func.sum(StockMovement.quantity).label('quantity'),
+            db.func.max(StockMovement.cost).label('cost')
+        )
+        .where(StockMovement.date <= at)
+        .group_by(StockMovement.product_id, StockMovement.batch_id)
+        .subquery()
+    )
+    in_stock = per_batch.c.quantity > 1e-9
+    return (
+        db.select(
+            per_batch.c.product_id,
+            Product.name,
+            db.func.sum(per_batch.c.quantity),
+            db.func.sum(per_batch.c.quantity * db.func.coalesce(per_batch.c.cost, 0.0)),
+            db.func.count()
+        )
+        .join(Product, Product.id == per_batch.c.product_id)
+        .where(in_stock)
+        .group_by(per_batch.c.product_id, Product.name)
+        .order_by(per_batch.c.product_id)
+    )
+
+
+def _newer_movements_query(last_id, at):
+    """Último id del libro después de last_id y si alguno de esos movimientos tiene fecha <= at."""
+    return db.select(
+        db.func.max(StockMovement.id),
+        db.func.max(db.case((StockMovement.date <= at, 1)))
+    ).where(StockMovement.id > last_id)
+
+
+class ValuationCache:
+    """
+    Cache en memoria de valorizaciones de períodos cerrados (at < ahora).
+    Un resultado sigue vigente mientras no aparezcan movimientos con fecha <= at
+    (ej. tickets con fecha pasada en /sales/bulk). Para saberlo se guarda el último id
+    del libro ya revisado y solo se miran las filas nuevas: un rango sobre la clave primaria,
+    que también ve lo que escribieron otros workers.
+    """
+
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self._entries = OrderedDict()   # at -> (último id revisado, resultado)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, at: datetime | None = None) -> dict:
+        now = datetime.utcnow()
+        if at is not None and at.tzinfo is not None:
+            # el libro guarda UTC sin zona: '...-03:00' se pasa a UTC naive (y es la misma clave de cache)
+            at = at.astimezone(timezone.utc).replace(tzinfo=None)
+        if at is None or at >= now:
+            return valuation_at(at or now)   # período abierto: no se cachea
+
+        with self._lock:
+            cached = self._entries.get(at)
+        if cached:
+            last_id, result = cached
+            newest, backdated = db.session.execute(_newer_movements_query(last_id, at)).one()
+            if not backdated:
+                with self._lock:
+                    self.hits += 1
+                    self._entries[at] = (newest or last_id, result)
+                    self._entries.move_to_end(at)
+                return result
+
+        last_id = db.session.scalar(db.select(db.func.coalesce(db.func.max(StockMovement.id), 0)))
+        result = valuation_at(at)
+        with self._lock:
+            self.misses += 1
+            self._entries[at] = (last_id, result)
+            self._entries.move_to_end(at)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'size': len(self._entries), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses}
+
+
+valuation_cache = ValuationCache()
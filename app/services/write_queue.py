@@ -0,0 +1,212 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event
+from app import db
+
+
+class WriteQueue:
+    """
+    Inserciones diferidas fuera de la transacción de la request (ej. PriceHistory).
+
+    Desactivada (default), add() agrega la fila a la sesión y se graba con el commit de la request.
+    Activada (ASYNC_WRITES=1), las filas se guardan en session.info y recién al confirmarse la
+    transacción pasan a la cola (si hay rollback se descartan). Un hilo las inserta en bloque
+    cada `interval` segundos o al juntar `batch_size` filas, fuera del lock de escritura de las ventas.
+
+    Durabilidad: cada fila encolada se escribe antes en un archivo de spool (JSON por línea)
+    del proceso, con flock. Al arrancar, los spools sin dueño (proceso muerto) se reinsertan.
+    flock es solo POSIX: fcntl se importa recién al activarla, así desactivada importa en cualquier host.
+    Entrega "al menos una vez": si el proceso muere entre el commit de un bloque y el borrado
+    de su spool, ese bloque se reinserta al arrancar.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.interval = 0.5
+        self.batch_size = 500
+        self.spool_dir = None
+        self._lock = threading.Lock()
+        self._pending = []          # (tabla, fila) confirmadas, aún no insertadas
+        self._segment = None        # archivo de spool abierto (con flock) de las filas pendientes
+        self._unflushed = []        # [(segmento, filas)] que fallaron al insertar; se reintentan
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.flushed = 0
+        self.recovered = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    def start(self, app, interval=0.5, batch_size=500, spool_dir=None):
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self.spool_dir = spool_dir or os.path.join(app.instance_path, 'spool')
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+        self.recovered = self.recover()
+        self._segment = self._open_segment()
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_soft_rollback', _after_rollback)
+
+        self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def add(self, model, row: dict):
+        """Inserta `row` en la tabla de `model` al confirmarse la transacción actual."""
+        if not self.enabled:
+            db.session.add(model(**row))
+            return
+        db.session.info.setdefault('deferred_writes', []).append((model.__table__.name, row))
+
+    def add_many(self, model, rows):
+        if not self.enabled:
+            db.session.execute(db.insert(model), list(rows))
+            return
+        db.session.info.setdefault('deferred_writes', []).extend((model.__table__.name, r) for r in rows)
+
+    def enqueue(self, items):
+        """items: [(tabla, fila)] ya confirmados. Se escriben al spool antes de quedar en memoria."""
+        if not items:
+            return
+        with self._lock:
+            self._segment.write(''.join(_dump(table, row) for table, row in items))
+            self._segment.flush()
+            self._pending.extend(items)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Inserta todo lo pendiente (un INSERT por tabla) y borra los spools ya grabados."""
+        with self._lock:
+            if self._pending:
+                self._unflushed.append((self._segment, self._pending))
+                self._pending = []
+                self._segment = self._open_segment()
+            batches, self._unflushed = self._unflushed, []
+
+        for segment, items in batches:
+            try:
+                self._insert(items)
+            except Exception:
+                self.app.logger.exception('write queue: error al insertar %d filas, se reintenta', len(items))
+                with self._lock:
+                    self._unflushed.append((segment, items))
+                continue
+            _discard(segment)
+            self.flushed += len(items)
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+        event.remove(db.session, 'after_commit', _after_commit)
+        event.remove(db.session, 'after_soft_rollback', _after_rollback)
+        with self._lock:
+            if not self._pending and not self._unflushed:
+                _discard(self._segment)
+            else:
+                self._segment.close()   # queda para recover() del próximo arranque
+            self._segment = None
+
+    def recover(self) -> int:
+        """Reinserta los spools de procesos que ya no existen (los que no tienen flock)."""
+        import fcntl
+        recovered = 0
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, '*.jsonl'))):
+            segment = open(path, 'a+')
+            try:
+                fcntl.flock(segment, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                segment.close()   # spool de un proceso vivo
+                continue
+            segment.seek(0)
+            items = [_load(line) for line in segment if line.strip()]
+            try:
+                if items:
+                    self._insert(items)
+            except Exception:
+                # ej. la base todavía no tiene las tablas (flask db upgrade): queda para el próximo arranque
+                self.app.logger.exception('write queue: no se pudo recuperar %s', path)
+                segment.close()
+                continue
+            _discard(segment)
+            recovered += len(items)
+        return recovered
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'pending': len(self._pending) + sum(len(items) for _, items in self._unflushed),
+                'flushed': self.flushed,
+                'recovered': self.recovered
+            }
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def _insert(self, items):
+        by_table = {}
+        for table, row in items:
+            by_table.setdefault(table, []).append(row)
+        with self.app.app_context():
+            for table, rows in by_table.items():
+                db.session.execute(db.insert(db.metadata.tables[table]), rows)
+            db.session.commit()
+            db.session.remove()
+
+    def _open_segment(self):
+        import fcntl
+        path = os.path.join(self.spool_dir, f'{os.getpid()}-{time.time_ns()}.jsonl')
+        segment = open(path, 'a+')
+        fcntl.flock(segment, fcntl.LOCK_EX)
+        return segment
+
+
+def _after_commit(session):
+    items = session.info.pop('deferred_writes', None)
+    if items:
+        write_queue.enqueue(items)
+
+
+def _after_rollback(session, previous_transaction):
+    session.info.pop('deferred_writes', None)
+
+
+def _dump(table, row) -> str:
+    row = {k: ({'$dt': v.isoformat()} if isinstance(v, datetime) else v) for k, v in row.items()}
+    return json.dumps({'table': table, 'row': row}) + '\n'
+
+
+def _load(line):
+    data = json.loads(line)
+    row = {
+        k: (datetime.fromisoformat(v['$dt']) if isinstance(v, dict) and '$dt' in v else v)
+        for k, v in data['row'].items()
+    }
+    return data['table'], row
+
+
+def _discard(segment):
+    os.unlink(segment.name)
+    segment.close()
+
+
+write_queue = WriteQueue()
@@ -0,0 +1,74 @@
+"""
+Arnés para tests y scripts sobre SQLite en memoria.
+
+- in_memory_app(): app con Config.in_memory() y el esquema creado una sola vez (db.create_all).
+- rollback_scope(app): todo lo que pase adentro (requests del test client incluidas) corre en una
+  transacción externa que se deshace al salir. Los commit/rollback de las rutas pasan a ser
+  SAVEPOINTs, así que cada escenario arranca de la misma base sin recrear el esquema.
+- reset_caches(): vacía los caches en memoria de los servicios (sobreviven entre escenarios).
+
+Bajo pytest, este módulo también es un plugin de fixtures (en conftest.py:
+`pytest_plugins = ['app.testing']`): `app` (una por sesión), y por test `client` y `session`,
+que comparten la misma transacción externa (`rollback`).
+"""
+import sys
+from contextlib import contextmanager
+from app import create_app, db
+from app.config import Config
+
+# Las fixtures solo se definen si pytest ya está cargado (corriendo como plugin): importarlo cuesta ~0.2 s
+pytest = sys.modules.get('pytest')
+
+
+def in_memory_app(config=None):
+    app = create_app(config or Config.in_memory())
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def reset_caches():
+    from app.services.product_cache import product_cache
+    from app.services.valuation import valuation_cache
+    product_cache.invalidate()
+    valuation_cache.clear()
+    if 'app.services.replenishment' in sys.modules:   # no forzar el import de NumPy
+        sys.modules['app.services.replenishment'].replenishment_cache.clear()
+
+
+@contextmanager
+def rollback_scope(app):
+    """Transacción externa por escenario; al salir se deshace todo lo escrito adentro."""
+    with app.app_context():
+        connection = db.engine.connect()
+        transaction = connection.begin()
+        db.session.remove()
+        db.session.configure(bind=connection, join_transaction_mode='create_savepoint')
+        try:
+            yield connection
+        finally:
+            db.session.remove()
+            db.session.configure(bind=None, join_transaction_mode='conditional_savepoint')
+            transaction.rollback()
+            connection.close()
+            reset_caches()
+
+
+if pytest is not None:
+    @pytest.fixture(scope='session')
+    def app():
+        return in_memory_app()
+
+    @pytest.fixture
+    def rollback(app):
+        with rollback_scope(app) as connection:
+            yield connection
+
+    @pytest.fixture
+    def client(app, rollback):
+        return app.test_client()
+
+    @pytest.fixture
+    def session(app, rollback):
+        with app.app_context():
+            yield db.session
@@ -0,0 +1,133 @@
+"""
+/analytics/products: versión vectorizada (services.analytics, NumPy) contra un loop
+ingenuo fila por fila en Python sobre los mismos datos, a medida que crecen las líneas de venta.
+También verifica que ambas den los mismos números.
+
+Uso:
+    python bench/analytics.py [50000 200000 500000]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_SIZES = [50_000, 200_000, 500_000]
+PRODUCTS = 200
+LINES_PER_SALE = 3
+
+
+def seed(db, n_lines):
+    from app.models.product import Product
+    from app.models.batch import Batch
+    from app.models.purchase import Purchase
+    from app.models.sale import Sale
+    from app.models.sale_item import SaleItem
+
+    rng = random.Random(42)
+    db.session.execute(db.insert(Product), [
+        {'id': i, 'name': f'producto {i}', 'markup': 40.0} for i in range(1, PRODUCTS + 1)
+    ])
+    db.session.execute(db.insert(Batch), [
+        {'id': i, 'product_id': i, 'cost': 100.0 + i, 'quantity': rng.uniform(0, 500)}
+        for i in range(1, PRODUCTS + 1)
+    ])
+    db.session.execute(db.insert(Purchase), [
+        {'product_id': i, 'action': 'add_batch', 'created_batch_id': i, 'unit_cost': 100.0 + i,
+         'quantity': 10_000.0, 'date': datetime(2024, 1, 1)}
+        for i in range(1, PRODUCTS + 1)
+    ])
+    n_sales = n_lines // LINES_PER_SALE
+    start = datetime(2024, 1, 1)
+    db.session.execute(db.insert(Sale), [
+        {'id': i, 'date': start + timedelta(minutes=i), 'total': 0.0} for i in range(1, n_sales + 1)
+    ])
+    # demanda tipo Pareto: pocos productos concentran la mayoría de las líneas
+    weights = [1.0 / i for i in range(1, PRODUCTS + 1)]
+    pids = rng.choices(range(1, PRODUCTS + 1), weights=weights, k=n_sales * LINES_PER_SALE)
+    db.session.execute(db.insert(SaleItem), [
+        {'sale_id': n // LINES_PER_SALE + 1, 'product_id': pid, 'batch_id': pid, 'quantity': 1.0,
+         'price_at_sale': (100.0 + pid) * 1.4, 'unit_cost': 100.0 + pid}
+        for n, pid in enumerate(pids)
+    ])
+    db.session.commit()
+
+
+def naive(db):
+    """Lo que se hacía a mano: recorrer los objetos fila por fila y acumular en dicts."""
+    from app.models.product import Product
+    from app.models.batch import Batch
+    from app.models.purchase import Purchase
+    from app.models.sale_item import SaleItem
+
+    sold, revenue, cogs = defaultdict(float), defaultdict(float), defaultdict(float)
+    for item in SaleItem.query.yield_per(5000):
+        sold[item.product_id] += item.quantity
+        revenue[item.product_id] += item.quantity * item.price_at_sale
+        cogs[item.product_id] += item.quantity * (item.unit_cost or 0.0)
+    received = defaultdict(float)
+    for p in Purchase.query:
+        received[p.product_id] += p.quantity
+    on_hand, stock_value = defaultdict(float), defaultdict(float)
+    for b in Batch.query:
+        on_hand[b.product_id] += b.quantity
+        stock_value[b.product_id] += b.quantity * b.cost
+
+    result = {}
+    for product in Product.query.order_by(Product.id):
+        pid = product.id
+        result[pid] = {
+            'revenue': revenue[pid],
+            'margin': revenue[pid] - cogs[pid],
+            'turnover': cogs[pid] / stock_value[pid] if stock_value[pid] else None,
+            'sell_through_pct': sold[pid] / (sold[pid] + on_hand[pid]) * 100.0 if sold[pid] + on_hand[pid] else None,
+            'received': received[pid]
+        }
+    return result
+
+
+def timed(fn):
+    started = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - started
+
+
+def run(n_lines):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from app import create_app, db
+        from app.services.analytics import product_metrics
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            seed(db, n_lines)
+            db.session.remove()
+
+            vectorized, t_vec = timed(product_metrics)
+            db.session.remove()
+            slow, t_naive = timed(lambda: naive(db))
+
+            for p in vectorized['products']:
+                expected = slow[p['product_id']]
+                for key, value in expected.items():
+                    got = p[key]
+                    if (value is None) != (got is None) or (value is not None and abs(value - got) > 1e-6 * max(1.0, abs(value))):
+                        raise SystemExit(f"diferencia en producto {p['product_id']} {key}: {got} != {value}")
+            db.engine.dispose()
+    return t_vec, t_naive
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'líneas':>10} {'numpy ms':>10} {'loop ms':>10} {'x':>6}")
+    for n in sizes:
+        t_vec, t_naive = run(n)
+        print(f"{n:>10} {t_vec * 1000:>10.0f} {t_naive * 1000:>10.0f} {t_naive / t_vec:>6.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Anulación de ventas por conjunto (services.sales.annul_sales): sentencias SQL y tiempo.
+
+DELETE /sales/<id> y POST /sales/annul-bulk con 1, 10, 100 y N ventas: cantidad de sentencias
+(no depende de ventas ni items) y tiempo de cada anulación. El stock repuesto y que la cantidad de
+sentencias no cambie lo verifica tests/test_annulment.py.
+
+Uso:
+    python bench/annulment.py [2000]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_SALES = 2000
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def statement_counts(app, db, n_sales):
+    from app.models.product import Product
+    client = app.test_client()
+    with app.app_context():
+        db.session.add(Product(name='castaña', markup=30.0))
+        db.session.commit()
+        pid = db.session.query(db.func.max(Product.id)).scalar()
+        counter = QueryCounter(db.engine)
+
+    # lotes cada vez más baratos: cada venta de 3 kg cruza dos o tres lotes
+    for i in range(20):
+        client.post('/purchases', json={'product_id': pid, 'unit_cost': 200.0 - i, 'quantity': 1e6 if i == 19 else 2.0})
+    sizes = [1, 10, 100, n_sales]
+    tickets = [{'items': [{'product_id': pid, 'quantity': 3.0}]} for _ in range(sum(sizes) + 1)]
+    created = client.post('/sales/bulk', json={'tickets': tickets}).get_json()
+    sale_ids = [r['sale_id'] for r in created['results']]
+
+    before = counter.count
+    client.delete(f'/sales/{sale_ids.pop()}')
+    print(f'  DELETE /sales/<id>: {counter.count - before} sentencias')
+
+    for size in sizes:
+        batch, sale_ids = sale_ids[:size], sale_ids[size:]
+        before = counter.count
+        started = time.perf_counter()
+        client.post('/sales/annul-bulk', json={'sale_ids': batch})
+        elapsed = time.perf_counter() - started
+        print(f'  annul-bulk {size:6} ventas: {counter.count - before:3} sentencias  {elapsed * 1000:8.1f} ms')
+
+
+def main():
+    n_sales = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SALES
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'annul.db')}"
+        from app import create_app, db
+        app = create_app()
+        app.logger.disabled = True
+        with app.app_context():
+            db.create_all()
+        statement_counts(app, db, n_sales)
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+Productos con muchos lotes chicos: lectura en orden de venta por páginas (services.sales.basket_snapshot).
+
+- lectura: la lectura anterior (todos los lotes con stock del producto, ordenados) contra basket_snapshot()
+  paginado sobre ix_batch_product_id_cost_date (primera página con LIMIT por producto, las siguientes por
+  clave), para canastas chicas y grandes; filas leídas, sentencias y tiempo. También una canasta de
+  50 productos (una sola sentencia).
+- rutas: latencia de POST /sales/quote y POST /sales, lotes podados por las ventas (stock.prune_empty) y
+  recreados al anularlas con POST /sales/annul-bulk.
+Orden de venta, reparto igual al de la lectura completa, poda y recreación: tests/test_batches.py.
+
+Uso:
+    python bench/batches.py [--batches 2000] [--sales 200] [--seed 1]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+class StatementLog:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def full_snapshot(db, product_ids):
+    """La lectura anterior: todos los lotes con stock de cada producto, en orden de venta."""
+    from app.models.product import Product
+    from app.models.batch import Batch
+    rows = db.session.execute(
+        db.select(Product.id, Product.markup, Batch.id, Batch.cost, Batch.quantity)
+        .outerjoin(Batch, db.and_(Batch.product_id == Product.id, Batch.quantity > 0))
+        .where(Product.id.in_(product_ids))
+        .order_by(Product.id, Batch.cost.desc(), Batch.date_added, Batch.id)
+    ).all()
+    snapshot = {}
+    for product_id, markup, batch_id, cost, quantity in rows:
+        _, batches = snapshot.setdefault(product_id, (markup, []))
+        if batch_id is not None:
+            batches.append((batch_id, cost, quantity))
+    return snapshot, len(rows)
+
+
+def median_ms(fn, runs):
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000
+
+
+def setup(app, db, n_batches, rng):
+    """
+    Un producto con n_batches lotes chicos (costos que bajan, con empates) y sus entradas en el libro,
+    insertados directo: por POST /purchases cada compra lee todos los lotes del producto.
+    """
+    from datetime import datetime, timedelta
+    from app.models.batch import Batch
+    from app.models.product import Product
+    from app.services import ledger
+    with app.app_context():
+        product = Product(name='pasas', markup=35.0)
+        db.session.add(product)
+        db.session.flush()
+        start = datetime(2025, 1, 1)
+        batches = [
+            Batch(product_id=product.id, cost=5000.0 - i // 3, quantity=float(rng.randint(1, 3)),
+                  date_added=start + timedelta(minutes=i))
+            for i in range(n_batches)
+        ]
+        db.session.add_all(batches)
+        db.session.flush()
+        ledger.record(
+            ledger.movement('purchase_in', product.id, b.id, b.quantity, b.cost, b.date_added) for b in batches
+        )
+        product.refresh_stock()
+        db.session.commit()
+        return product.id
+
+
+def reads(app, db, product_id):
+    from app.services.sales import basket_snapshot
+    with app.app_context():
+        counter = StatementLog(db.engine)
+        total = db.session.execute(db.text('SELECT SUM(quantity) FROM batch WHERE product_id = :p'),
+                                   {'p': product_id}).scalar()
+        for quantity in (3.0, 50.0, total / 2, total):
+            items = [{'product_id': product_id, 'quantity': quantity}]
+            old_ms = median_ms(lambda: full_snapshot(db, [product_id]), 20)
+            new_ms = median_ms(lambda: basket_snapshot(items), 20)
+            _, old_rows = full_snapshot(db, [product_id])
+            before = counter.count
+            paged = basket_snapshot(items)
+            statements = counter.count - before
+            print(f'  {quantity:9.1f} kg: completa {old_rows:6} filas {old_ms:7.2f} ms | '
+                  f'paginada {len(paged[product_id][1]):6} filas en {statements} sentencias {new_ms:7.2f} ms')
+
+
+def many_products(app, db, rng, n_products=50):
+    """Canasta chica de muchos productos (como POST /sales/bulk): sentencias y tiempo de la lectura."""
+    from app.models.batch import Batch
+    from app.models.product import Product
+    from app.services import ledger
+    from app.services.sales import basket_snapshot
+    with app.app_context():
+        products = [Product(name=f'fruta {i}', markup=30.0) for i in range(n_products)]
+        db.session.add_all(products)
+        db.session.flush()
+        batches = [
+            Batch(product_id=p.id, cost=float(rng.randint(100, 900)), quantity=float(rng.randint(1, 5)))
+            for p in products for _ in range(rng.randint(0, 12))
+        ]
+        db.session.add_all(batches)
+        db.session.flush()
+        ledger.record(
+            ledger.movement('purchase_in', b.product_id, b.id, b.quantity, b.cost, b.date_added) for b in batches
+        )
+        for p in products:
+            p.refresh_stock()
+        db.session.commit()
+        counter = StatementLog(db.engine)
+        items = [{'product_id': p.id, 'quantity': 1.0} for p in products]
+        before = counter.count
+        basket_snapshot(items)
+        statements = counter.count - before
+        elapsed = median_ms(lambda: basket_snapshot(items), 20)
+    print(f'  {n_products} productos, 1 kg de cada uno: {statements} sentencias, {elapsed:.2f} ms')
+
+
+def routes(app, db, product_id, n_sales, rng):
+    from app.models.batch import Batch
+    client = app.test_client()
+
+    def batches():
+        with app.app_context():
+            return db.session.query(db.func.count(Batch.id)).filter_by(product_id=product_id).scalar()
+
+    before = batches()
+    quotes, sales, sale_ids = [], [], []
+    for _ in range(n_sales):
+        basket = {'items': [{'product_id': product_id, 'quantity': float(rng.randint(1, 6))}]}
+        started = time.perf_counter()
+        client.post('/sales/quote', json=basket)
+        quotes.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        r = client.post('/sales', json=basket)
+        sales.append(time.perf_counter() - started)
+        sale_ids.append(r.get_json()['sale_id'])
+    after_sales = batches()
+    print(f'  POST /sales/quote: {statistics.median(quotes) * 1000:6.2f} ms   '
+          f'POST /sales: {statistics.median(sales) * 1000:6.2f} ms (medianas de {n_sales})')
+    print(f'  lotes: {before} -> {after_sales} después de vender (podados en 0: {before - after_sales})')
+
+    started = time.perf_counter()
+    client.post('/sales/annul-bulk', json={'sale_ids': sale_ids})
+    elapsed = time.perf_counter() - started
+    print(f'  lotes: {batches()} después de anular {n_sales} ventas en {elapsed * 1000:.1f} ms (recreados con su id)')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batches', type=int, default=2000)
+    parser.add_argument('--sales', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    from app import db
+    from app.testing import in_memory_app
+    rng = random.Random(args.seed)
+    app = in_memory_app()
+    app.logger.disabled = True
+    product_id = setup(app, db, args.batches, rng)
+    print(f'{args.batches} lotes de un producto:')
+    reads(app, db, product_id)
+    many_products(app, db, rng)
+    routes(app, db, product_id, args.sales, rng)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Carga concurrente: hilos que registran ventas (POST /sales) mientras otros piden /profits,
+con el perfil de SQLite (WAL, busy_timeout, ...) activado y desactivado.
+
+Uso:
+    python bench/concurrent_load.py [--writers 8] [--readers 8] [--seconds 10]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT)
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def seed(app, db):
+    from app.models.product import Product
+    with app.app_context():
+        db.create_all()
+        for i in range(20):
+            db.session.add(Product(name=f'producto {i}', markup=40.0))
+        db.session.commit()
+    client = app.test_client()
+    for i in range(1, 21):
+        client.post('/purchases', json={'product_id': i, 'unit_cost': 100.0, 'quantity': 1e6})
+    # historial para que /profits tenga algo que leer
+    client.post('/sales/bulk', json={'tickets': [
+        {'items': [{'product_id': 1 + n % 20, 'quantity': 0.5}]} for n in range(2000)
+    ]})
+
+
+def worker(client, method, url, payload_fn, stop, latencies, errors):
+    n = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        if method == 'POST':
+            response = client.post(url, json=payload_fn(n))
+        else:
+            response = client.get(url)
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            errors.append(response.status_code)
+        else:
+            latencies.append(elapsed)
+        n += 1
+
+
+def run(writers, readers, seconds):
+    from app import create_app, db
+    app = create_app()
+    app.logger.disabled = True  # los "database is locked" se cuentan como errores, sin traceback
+    seed(app, db)
+
+    stop = threading.Event()
+    sale_lat, sale_err, report_lat, report_err = [], [], [], []
+    threads = [
+        threading.Thread(target=worker, args=(
+            app.test_client(), 'POST', '/sales',
+            lambda n: {'items': [{'product_id': 1 + n % 20, 'quantity': 0.1}]},
+            stop, sale_lat, sale_err))
+        for _ in range(writers)
+    ] + [
+        threading.Thread(target=worker, args=(
+            app.test_client(), 'GET', '/profits?start_date=2000-01-01&end_date=2100-01-01&summary=1',
+            None, stop, report_lat, report_err))
+        for _ in range(readers)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    for name, lat, err in (('POST /sales', sale_lat, sale_err), ('GET /profits', report_lat, report_err)):
+        print(f"  {name:14} {len(lat) / seconds:8.1f} req/s  "
+              f"p50 {percentile(lat, 50) * 1000:7.1f} ms  p99 {percentile(lat, 99) * 1000:7.1f} ms  "
+              f"errores {len(err)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run(args.writers, args.readers, args.seconds)
+        return
+
+    # cada perfil en un proceso nuevo, con su propia base temporal
+    for tuning in ('1', '0'):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ,
+                       SQLITE_TUNING=tuning,
+                       DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'load.db')}")
+            print(f"perfil SQLite {'activado' if tuning == '1' else 'desactivado'}:", flush=True)
+            subprocess.run([sys.executable, __file__, '--child',
+                            '--writers', str(args.writers), '--readers', str(args.readers),
+                            '--seconds', str(args.seconds)], env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
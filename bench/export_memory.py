@@ -0,0 +1,76 @@
+"""
+Pico de memoria de /export/sales (streaming) vs GET /sales (lista completa)
+a medida que crece la cantidad de ventas.
+
+Uso:
+    python bench/export_memory.py [10000 50000 200000]
+"""
+import os
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_SIZES = [10_000, 50_000, 200_000]
+
+
+def seed(db, n_sales):
+    from app.models.product import Product
+    from app.models.batch import Batch
+    from app.models.sale import Sale
+    from app.models.sale_item import SaleItem
+
+    db.session.execute(db.insert(Product), [{'id': 1, 'name': 'nuez', 'markup': 50.0}])
+    db.session.execute(db.insert(Batch), [{'id': 1, 'product_id': 1, 'cost': 100.0, 'quantity': 1e9}])
+    start = datetime(2024, 1, 1)
+    db.session.execute(db.insert(Sale), [
+        {'id': i, 'date': start + timedelta(minutes=i), 'total': 150.0} for i in range(1, n_sales + 1)
+    ])
+    db.session.execute(db.insert(SaleItem), [
+        {'sale_id': i, 'product_id': 1, 'batch_id': 1, 'quantity': 1.0, 'price_at_sale': 150.0, 'unit_cost': 100.0}
+        for i in range(1, n_sales + 1)
+    ])
+    db.session.commit()
+
+
+def peak_of(client, url, streamed):
+    tracemalloc.start()
+    response = client.get(url, buffered=not streamed)
+    size = 0
+    for chunk in response.response:
+        size += len(chunk)
+    response.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, size
+
+
+def run(n_sales):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from app import create_app, db
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            seed(db, n_sales)
+            db.session.remove()
+        client = app.test_client()
+        stream_peak, stream_size = peak_of(client, '/export/sales', streamed=True)
+        list_peak, _ = peak_of(client, '/sales', streamed=False)
+        with app.app_context():
+            db.engine.dispose()
+    return stream_peak, stream_size, list_peak
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'ventas':>10} {'export MB':>10} {'pico export MB':>15} {'pico /sales MB':>15}")
+    for n in sizes:
+        stream_peak, stream_size, list_peak = run(n)
+        print(f"{n:>10} {stream_size / 2**20:>10.1f} {stream_peak / 2**20:>15.2f} {list_peak / 2**20:>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
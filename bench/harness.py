@@ -0,0 +1,127 @@
+"""
+Arranque de la app y arnés de escenarios en memoria (app.testing).
+
+- arranque: proceso nuevo que importa el paquete y llama a create_app(), con la configuración
+  del entorno (archivo en disco, Flask-Migrate) y con Config.in_memory(); mediana de varias corridas.
+- escenarios: compras (lotes nuevos y consolidaciones), ventas y anulaciones al azar, verificando
+  stock_qty = suma de lotes y lotes = libro de movimientos al final de cada uno.
+  En memoria: esquema creado una vez y rollback_scope() por escenario.
+  En disco: base nueva por escenario (create_all + archivo), como había que hacerlo antes.
+
+Uso:
+    python bench/harness.py [--scenarios 1000] [--disk-scenarios 50] [--startup-runs 5]
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT)
+
+STARTUP = {
+    'entorno (disco + migraciones)': 'from app import create_app; create_app()',
+    'Config.in_memory()': 'from app import create_app; from app.config import Config; create_app(Config.in_memory())',
+    'in_memory_app() (con esquema)': 'from app.testing import in_memory_app; in_memory_app()',
+}
+
+
+def startup(runs):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}", PYTHONPATH=ROOT)
+        for name, code in STARTUP.items():
+            times = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                subprocess.run([sys.executable, '-c', code], env=env, check=True)
+                times.append(time.perf_counter() - started)
+            print(f'  {name:32} {statistics.median(times) * 1000:7.0f} ms (mediana de {runs}, proceso completo)')
+
+
+def scenario(client, rng):
+    """Un producto nuevo con compras, ventas y anulaciones al azar. Devuelve su id."""
+    product_id = client.post('/products', json={'name': f'p{rng.random()}', 'markup': 40.0}).get_json()['id']
+    sales = []
+    for _ in range(rng.randint(3, 8)):
+        if rng.random() < 0.5:
+            client.post('/purchases', json={
+                'product_id': product_id, 'unit_cost': float(rng.randint(50, 150)), 'quantity': float(rng.randint(1, 10))
+            })
+        else:
+            r = client.post('/sales', json={'items': [{'product_id': product_id, 'quantity': float(rng.randint(1, 6))}]})
+            if r.status_code == 201:
+                sales.append(r.get_json()['sale_id'])
+    if sales:
+        client.post('/sales/annul-bulk', json={'sale_ids': rng.sample(sales, rng.randint(1, len(sales)))})
+    return product_id
+
+
+def verify(db, product_id):
+    from app.models.product import Product
+    from app.models.batch import Batch
+    from app.services import ledger
+    stock_qty = db.session.get(Product, product_id).stock_qty
+    batches = db.session.query(db.func.coalesce(db.func.sum(Batch.quantity), 0.0)).filter_by(product_id=product_id).scalar()
+    if abs(stock_qty - batches) > 1e-6 or ledger.batch_drift():
+        raise SystemExit(f'FALLA: producto {product_id} inconsistente')
+
+
+def in_memory(n, seed):
+    from app import db
+    from app.testing import in_memory_app, rollback_scope
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    app = in_memory_app()
+    app.logger.disabled = True
+    for _ in range(n):
+        with rollback_scope(app):
+            product_id = scenario(app.test_client(), rng)
+            verify(db, product_id)
+    return time.perf_counter() - started
+
+
+def on_disk(n, seed):
+    from app import create_app, db
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    for _ in range(n):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'scenario.db')}"
+            app = create_app()
+            app.logger.disabled = True
+            with app.app_context():
+                db.create_all()
+            product_id = scenario(app.test_client(), rng)
+            with app.app_context():
+                verify(db, product_id)
+                db.engine.dispose()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scenarios', type=int, default=1000)
+    parser.add_argument('--disk-scenarios', type=int, default=50)
+    parser.add_argument('--startup-runs', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print('arranque:')
+    startup(args.startup_runs)
+
+    print('escenarios de compra/venta/anulación:')
+    elapsed = in_memory(args.scenarios, args.seed)
+    print(f'  en memoria + rollback: {args.scenarios:6} escenarios en {elapsed:6.2f} s '
+          f'({elapsed / args.scenarios * 1000:6.1f} ms c/u)')
+    if args.disk_scenarios:
+        elapsed = on_disk(args.disk_scenarios, args.seed)
+        print(f'  disco, base por escenario: {args.disk_scenarios:6} escenarios en {elapsed:6.2f} s '
+              f'({elapsed / args.disk_scenarios * 1000:6.1f} ms c/u)')
+
+
+if __name__ == '__main__':
+    main()
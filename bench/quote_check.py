@@ -0,0 +1,109 @@
+"""
+POST /sales/quote contra POST /sales (misma función services.sales.allocate): latencia y sentencias SQL.
+
+Sobre inventarios aleatorios (lotes de distintos costos, consolidaciones, ventas parciales) arma
+canastas aleatorias (productos repetidos, inexistentes, cantidades que no alcanzan) y mide, para cada
+ruta, la latencia (mediana y p99) y las sentencias por request (la cotización solo lee).
+Que la cotización coincida con la venta y no escriba lo verifica tests/test_quote.py.
+
+Uso:
+    python bench/quote_check.py [--cases 2000] [--seed 1]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+PRODUCTS = 6
+
+
+class StatementLog:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.statements = []
+        event.listen(engine, 'before_cursor_execute', self._log)
+
+    def _log(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+
+def restock(client, rng):
+    pid = rng.randint(1, PRODUCTS)
+    client.post('/purchases', json={
+        'product_id': pid, 'unit_cost': float(rng.randint(50, 150)), 'quantity': float(rng.randint(1, 20))
+    })
+
+
+def random_basket(rng):
+    items = []
+    for _ in range(rng.randint(1, 4)):
+        pid = rng.randint(1, PRODUCTS + 1)   # PRODUCTS + 1 no existe
+        quantity = rng.choice([rng.randint(1, 10), rng.uniform(0.1, 5.0), rng.randint(20, 60)])
+        items.append({'product_id': pid, 'quantity': quantity})
+    return {'items': items}
+
+
+def timed(client, log, path, basket, latencies, statements):
+    log.statements.clear()
+    started = time.perf_counter()
+    response = client.post(path, json=basket)
+    latencies.append(time.perf_counter() - started)
+    statements.append(len(log.statements))
+    return response
+
+
+def summary(name, latencies, statements):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f'  {name:18} p50 {statistics.median(latencies) * 1000:6.2f} ms  p99 {p99 * 1000:6.2f} ms  '
+          f'sentencias {statistics.mean(statements):5.1f} (máx {max(statements)})')
+
+
+def run(cases, seed):
+    from app import create_app, db
+    from app.models.product import Product
+    rng = random.Random(seed)
+    app = create_app()
+    app.logger.disabled = True
+    with app.app_context():
+        db.create_all()
+        for i in range(PRODUCTS):
+            db.session.add(Product(name=f'producto {i}', markup=float(rng.choice([0, 25, 40, 57.5]))))
+        db.session.commit()
+        log = StatementLog(db.engine)
+    client = app.test_client()
+    for _ in range(PRODUCTS * 4):
+        restock(client, rng)
+
+    outcomes = {}
+    quote_lat, quote_sql, sale_lat, sale_sql = [], [], [], []
+    for _ in range(cases):
+        if rng.random() < 0.3:
+            restock(client, rng)
+        basket = random_basket(rng)
+        timed(client, log, '/sales/quote', basket, quote_lat, quote_sql)
+        sale = timed(client, log, '/sales', basket, sale_lat, sale_sql)
+        outcomes[sale.status_code] = outcomes.get(sale.status_code, 0) + 1
+
+    print(f'{cases} canastas (semilla {seed}); ventas por status: {dict(sorted(outcomes.items()))}')
+    summary('POST /sales/quote', quote_lat, quote_sql)
+    summary('POST /sales', sale_lat, sale_sql)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cases', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'quote.db')}"
+        run(args.cases, args.seed)
+
+
+if __name__ == '__main__':
+    main()
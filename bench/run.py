@@ -0,0 +1,181 @@
+"""
+Benchmark de todos los blueprints sobre una base SQLite descartable.
+
+Para cada endpoint registra percentiles de latencia, sentencias SQL por request y pico de memoria.
+Guarda un JSON que las corridas siguientes usan como baseline.
+
+Uso:
+    python bench/run.py --out bench/baseline.json
+    python bench/run.py --compare bench/baseline.json [--tolerance 0.2]
+    python bench/run.py --scale small|medium|large --iterations 50
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+SCALES = {
+    'small': {'products': 20, 'purchases_per_product': 10, 'months': 2, 'sales_per_day': 20},
+    'medium': {'products': 50, 'purchases_per_product': 20, 'months': 6, 'sales_per_day': 40},
+    'large': {'products': 200, 'purchases_per_product': 40, 'months': 12, 'sales_per_day': 150},
+}
+
+
+def scenarios(months):
+    today = datetime.utcnow().date()
+    month_ago = (today - timedelta(days=30)).isoformat()
+    year_ago = (today - timedelta(days=30 * months)).isoformat()
+    tomorrow = (today + timedelta(days=1)).isoformat()
+    return [
+        # (nombre, método, url, body)
+        ('product.get_products', 'GET', '/products', None),
+        ('product.get_products_page', 'GET', '/products?limit=20&fields=id,name,total_stock', None),
+        ('sale.list_sales_page', 'GET', '/sales?limit=100', None),
+        ('sale.create_sale', 'POST', '/sales', {'items': [{'product_id': 1, 'quantity': 0.5}, {'product_id': 2, 'quantity': 1}]}),
+        ('purchase.list_purchases_page', 'GET', '/purchases?limit=100', None),
+        ('purchase.create_purchase', 'POST', '/purchases', {'product_id': 3, 'unit_cost': 500.0, 'quantity': 1.0}),
+        ('price_history.get_price_history', 'GET', '/price-history/1', None),
+        ('price_history.get_latest_prices', 'GET', '/price-history/latest', None),
+        ('profits.get_profits_month', 'GET', f'/profits?start_date={month_ago}&end_date={tomorrow}', None),
+        ('profits.get_profits_summary_flag', 'GET', f'/profits?start_date={year_ago}&end_date={tomorrow}&summary=1', None),
+        ('profits.get_profits_summary', 'GET', f'/profits/summary?start_date={year_ago}&end_date={tomorrow}&granularity=month', None),
+        ('export.export_sales_month', 'GET', f'/export/sales?start_date={month_ago}', None),
+    ]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def call(client, method, url, body):
+    response = client.open(url, method=method, json=body, buffered=True)
+    response.get_data()
+    if response.status_code >= 400:
+        raise RuntimeError(f'{method} {url} -> {response.status_code}: {response.get_data(as_text=True)[:200]}')
+
+
+def measure(client, counter, method, url, body, iterations):
+    call(client, method, url, body)  # calentamiento
+    latencies = []
+    queries = 0
+    for _ in range(iterations):
+        before = counter.count
+        started = time.perf_counter()
+        call(client, method, url, body)
+        latencies.append(time.perf_counter() - started)
+        queries += counter.count - before
+
+    tracemalloc.start()
+    call(client, method, url, body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'queries_per_request': round(queries / iterations, 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run(scale, iterations):
+    from seed import seed
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ.setdefault('SLOW_REQUEST_MS', '1e9')
+        from app import create_app, db
+        app = create_app()
+
+        started = time.perf_counter()
+        params = seed(app, **SCALES[scale])
+        seed_seconds = time.perf_counter() - started
+
+        with app.app_context():
+            counter = QueryCounter(db.engine)
+        client = app.test_client()
+        results = {}
+        for name, method, url, body in scenarios(params['months']):
+            results[name] = measure(client, counter, method, url, body, iterations)
+            r = results[name]
+            print(f"{name:36} p50 {r['p50_ms']:8.2f} ms  p99 {r['p99_ms']:8.2f} ms  "
+                  f"{r['queries_per_request']:6.1f} q/req  {r['peak_kb']:9.1f} KB", flush=True)
+
+        with app.app_context():
+            db.engine.dispose()
+
+    return {
+        'scale': scale,
+        'seed': params,
+        'seed_seconds': round(seed_seconds, 2),
+        'iterations': iterations,
+        'python': platform.python_version(),
+        'date': datetime.utcnow().isoformat(),
+        'endpoints': results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Regresión: p50 o sentencias por request por encima de baseline * (1 + tolerance)."""
+    regressions = []
+    for name, now in current['endpoints'].items():
+        before = baseline['endpoints'].get(name)
+        if not before:
+            continue
+        for key in ('p50_ms', 'queries_per_request'):
+            if before[key] and now[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {before[key]} -> {now[key]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--out', help='guardar resultados como JSON (baseline)')
+    parser.add_argument('--compare', help='baseline JSON contra el cual comparar')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(__file__))
+    current = run(args.scale, args.iterations)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f'resultados guardados en {args.out}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('scale') != current['scale']:
+            sys.exit(f"el baseline es de escala {baseline.get('scale')}, esta corrida es {current['scale']}")
+        regressions = compare(current, baseline, args.tolerance)
+        for line in regressions:
+            print('REGRESIÓN', line)
+        if regressions:
+            sys.exit(1)
+        print('sin regresiones')
+
+
+if __name__ == '__main__':
+    main()
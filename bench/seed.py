@@ -0,0 +1,56 @@
+"""
+Generador de datos sintéticos reproducible (semilla fija) para los benchmarks.
+
+Escala configurable: productos, compras por producto (con consolidaciones), meses de ventas
+y tickets por día. Las compras pasan por las reglas reales (services.purchases) y las ventas
+por POST /sales/bulk, así que lotes, stock y acumulados quedan consistentes.
+"""
+import random
+from datetime import datetime, timedelta
+
+
+def seed(app, products=50, purchases_per_product=20, months=6, sales_per_day=40,
+         consolidate_every=5, random_seed=42):
+    from app import db
+    from app.models.product import Product
+    from app.services.purchases import import_purchases
+
+    rng = random.Random(random_seed)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(Product), [
+            {'id': i, 'name': f'producto {i}', 'markup': rng.choice([30.0, 40.0, 50.0])}
+            for i in range(1, products + 1)
+        ])
+        db.session.commit()
+
+        # costos que bajan (add_batch) y cada tanto suben (consolidate)
+        lines = []
+        for n in range(purchases_per_product):
+            for pid in range(1, products + 1):
+                base = 1000.0 + pid
+                cost = base * 2 if consolidate_every and n and n % consolidate_every == 0 else base - n
+                lines.append({'product_id': pid, 'unit_cost': cost, 'quantity': 10_000.0})
+        import_purchases(lines)
+
+    client = app.test_client()
+    start = datetime.utcnow() - timedelta(days=30 * months)
+    for day in range(30 * months):
+        tickets = []
+        for _ in range(sales_per_day):
+            date = start + timedelta(days=day, seconds=rng.randrange(86400))
+            items = [
+                {'product_id': rng.randint(1, products), 'quantity': round(rng.uniform(0.1, 2.0), 2)}
+                for _ in range(rng.randint(1, 4))
+            ]
+            tickets.append({'date': date.isoformat(), 'items': items})
+        client.post('/sales/bulk', json={'tickets': tickets})
+
+    return {
+        'products': products,
+        'purchases_per_product': purchases_per_product,
+        'months': months,
+        'sales_per_day': sales_per_day,
+        'consolidate_every': consolidate_every,
+        'random_seed': random_seed,
+    }
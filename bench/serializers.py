@@ -0,0 +1,111 @@
+"""
+Serialización de listados grandes: el camino anterior (objetos del ORM + .isoformat() por fila
++ json de la stdlib vía jsonify) contra services.serializers (tuplas Row + RowSchema + orjson
+si está instalado, o la stdlib si no).
+
+Uso:
+    python bench/serializers.py [100000]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_ROWS = 100_000
+REPEAT = 3
+
+
+def seed(db, n_sales):
+    from app.models.product import Product
+    from app.models.batch import Batch
+    from app.models.sale import Sale
+    from app.models.sale_item import SaleItem
+
+    db.session.execute(db.insert(Product), [{'id': 1, 'name': 'nuez', 'markup': 50.0}])
+    db.session.execute(db.insert(Batch), [{'id': 1, 'product_id': 1, 'cost': 100.0, 'quantity': 1e9}])
+    start = datetime(2024, 1, 1)
+    db.session.execute(db.insert(Sale), [
+        {'id': i, 'date': start + timedelta(minutes=i, microseconds=i), 'total': 150.0}
+        for i in range(1, n_sales + 1)
+    ])
+    db.session.execute(db.insert(SaleItem), [
+        {'sale_id': i, 'product_id': 1, 'batch_id': 1, 'quantity': 1.0, 'price_at_sale': 150.0, 'unit_cost': 100.0}
+        for i in range(1, n_sales + 1)
+    ])
+    db.session.commit()
+
+
+def legacy_sales(db):
+    """Cómo se armaba GET /sales antes: objetos Sale/SaleItem y dicts a mano."""
+    from sqlalchemy.orm import selectinload
+    from app.models.sale import Sale
+    sales = Sale.query.options(selectinload(Sale.items)).order_by(Sale.date.desc(), Sale.id.desc()).all()
+    return [{
+        'id': s.id,
+        'date': s.date.isoformat(),
+        'total': s.total,
+        'items': [{
+            'product_id': i.product_id,
+            'batch_id': i.batch_id,
+            'quantity': i.quantity,
+            'price_at_sale': i.price_at_sale
+        } for i in s.items]
+    } for s in sales]
+
+
+def best_of(fn):
+    best, value = None, None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        value = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, value
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from flask.json.provider import DefaultJSONProvider
+        from app import create_app, db
+        from app.services import serializers
+        app = create_app()
+        app.logger.disabled = True   # sin el aviso de request lenta de cada GET
+        with app.app_context():
+            db.create_all()
+            seed(db, n_rows)
+            db.session.remove()
+        client = app.test_client()
+        stdlib = DefaultJSONProvider(app)
+
+        print(f"{n_rows} ventas (1 ítem c/u), mejor de {REPEAT}; orjson {'instalado' if serializers.orjson else 'no instalado'}")
+        with app.test_request_context():
+            t_build_old, payload_old = best_of(lambda: (db.session.remove(), legacy_sales(db))[1])
+            t_dump_old, body_old = best_of(lambda: stdlib.dumps(payload_old).encode())
+
+        def new_get():
+            return client.get('/sales').get_data()
+
+        t_new, body_new = best_of(new_get)
+        orjson, serializers.orjson = serializers.orjson, None
+        t_new_stdlib, body_new_stdlib = best_of(new_get)
+        serializers.orjson = orjson
+
+        if json.loads(body_old) != json.loads(body_new) or json.loads(body_new) != json.loads(body_new_stdlib):
+            raise SystemExit('FALLA: las respuestas no coinciden')
+
+        print(f"  anterior: armar {t_build_old * 1000:7.0f} ms + json {t_dump_old * 1000:6.0f} ms = "
+              f"{(t_build_old + t_dump_old) * 1000:7.0f} ms")
+        print(f"  GET /sales con RowSchema + orjson:  {t_new * 1000:7.0f} ms (request completa)")
+        print(f"  GET /sales con RowSchema + stdlib:  {t_new_stdlib * 1000:7.0f} ms (request completa)")
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Stress de asignación concurrente: muchos workers vendiendo el mismo producto "caliente"
+hasta agotar el stock. Verifica que ningún lote quede negativo, que lo vendido coincida
+con el stock inicial y que product.stock_qty siga igual a la suma de sus lotes.
+
+Uso:
+    python bench/stress_allocation.py [--workers 8] [--mode processes|threads] [--stock 2000]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def seed(stock, n_batches):
+    from app import create_app, db
+    from app.models.product import Product
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Product(name='nuez', markup=40.0))
+        db.session.commit()
+    client = app.test_client()
+    # costos decrecientes -> cada compra agrega un lote (add_batch)
+    for i in range(n_batches):
+        client.post('/purchases', json={'product_id': 1, 'unit_cost': 1000.0 - i, 'quantity': stock / n_batches})
+
+
+def sell_until_empty(results):
+    from app import create_app
+    app = create_app()
+    app.logger.disabled = True
+    client = app.test_client()
+    sold = errors = 0
+    while True:
+        response = client.post('/sales', json={'items': [{'product_id': 1, 'quantity': 1}]})
+        if response.status_code == 201:
+            sold += 1
+        elif 'insuficiente' in (response.get_json() or {}).get('error', ''):
+            break
+        else:
+            errors += 1
+    results.put((sold, errors))
+
+
+def verify():
+    from app import create_app, db
+    from app.models.product import Product
+    from app.models.batch import Batch
+    from app.models.sale_item import SaleItem
+    app = create_app()
+    with app.app_context():
+        negative = Batch.query.filter(Batch.quantity < 0).count()
+        remaining = db.session.query(db.func.coalesce(db.func.sum(Batch.quantity), 0.0)).scalar()
+        sold = db.session.query(db.func.coalesce(db.func.sum(SaleItem.quantity), 0.0)).scalar()
+        stock_qty = db.session.get(Product, 1).stock_qty
+    return negative, remaining, sold, stock_qty
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--mode', choices=['processes', 'threads'], default='processes')
+    parser.add_argument('--stock', type=int, default=2000)
+    parser.add_argument('--batches', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'stress.db')}"
+        seed(args.stock, args.batches)
+
+        if args.mode == 'processes':
+            results = multiprocessing.Queue()
+            workers = [multiprocessing.Process(target=sell_until_empty, args=(results,)) for _ in range(args.workers)]
+        else:
+            import queue
+            results = queue.Queue()
+            workers = [threading.Thread(target=sell_until_empty, args=(results,)) for _ in range(args.workers)]
+
+        started = time.perf_counter()
+        for w in workers:
+            w.start()
+        outcomes = [results.get() for _ in workers]
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - started
+
+        sold_responses = sum(s for s, _ in outcomes)
+        errors = sum(e for _, e in outcomes)
+        negative, remaining, sold, stock_qty = verify()
+
+    print(f"{args.workers} {args.mode}, stock inicial {args.stock} kg en {args.batches} lotes")
+    print(f"  ventas OK: {sold_responses} en {elapsed:.1f} s -> {sold_responses / elapsed:.1f} ventas/s, errores {errors}")
+    print(f"  vendido {sold:.1f} kg, restante {remaining:.1f} kg, stock_qty {stock_qty:.1f}, lotes negativos {negative}")
+    ok = negative == 0 and abs(sold + remaining - args.stock) < 1e-6 and abs(stock_qty - remaining) < 1e-6
+    print('  OK' if ok else '  INCONSISTENTE')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Cola de escrituras diferidas (ASYNC_WRITES): latencia de ventas con tráfico mixto.
+
+Hilos que venden (POST /sales) mientras otros compran (POST /purchases) y cambian markups
+(PUT /products/<id>), con ASYNC_WRITES desactivado y activado: req/s, p50 y p99 de cada grupo.
+Que no se pierdan filas de PriceHistory (también después de una caída) lo verifica tests/test_write_queue.py.
+
+Uso:
+    python bench/write_queue.py [--sellers 8] [--buyers 4] [--seconds 10]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT)
+
+PRODUCTS = 20
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def seed(app, db):
+    from app.models.product import Product
+    with app.app_context():
+        db.create_all()
+        for i in range(PRODUCTS):
+            db.session.add(Product(name=f'producto {i}', markup=40.0))
+        db.session.commit()
+    client = app.test_client()
+    for i in range(1, PRODUCTS + 1):
+        client.post('/purchases', json={'product_id': i, 'unit_cost': 100.0, 'quantity': 1e6})
+
+
+def worker(client, request_fn, stop, latencies, errors):
+    n = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = request_fn(client, n)
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            errors.append(response.status_code)
+        else:
+            latencies.append(elapsed)
+        n += 1
+
+
+def buy_or_reprice(client, n):
+    pid = 1 + n % PRODUCTS
+    if n % 2:
+        return client.put(f'/products/{pid}', json={'markup': 40.0 + n % 7})
+    # costo más bajo que el vigente: lote nuevo (no consolida el stock que están vendiendo)
+    return client.post('/purchases', json={'product_id': pid, 'unit_cost': 50.0, 'quantity': 10.0})
+
+
+def run_load(sellers, buyers, seconds):
+    from app import create_app, db
+    from app.services.write_queue import write_queue
+    app = create_app()
+    app.logger.disabled = True
+    seed(app, db)
+
+    stop = threading.Event()
+    sale_lat, sale_err, buy_lat, buy_err = [], [], [], []
+    threads = [
+        threading.Thread(target=worker, args=(
+            app.test_client(),
+            lambda client, n: client.post('/sales', json={'items': [{'product_id': 1 + n % PRODUCTS, 'quantity': 0.1}]}),
+            stop, sale_lat, sale_err))
+        for _ in range(sellers)
+    ] + [
+        threading.Thread(target=worker, args=(app.test_client(), buy_or_reprice, stop, buy_lat, buy_err))
+        for _ in range(buyers)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    write_queue.stop()   # lo mismo que corre en atexit: vacía la cola
+
+    for name, lat, err in (('POST /sales', sale_lat, sale_err), ('compras/markup', buy_lat, buy_err)):
+        print(f"  {name:14} {len(lat) / seconds:8.1f} req/s  "
+              f"p50 {percentile(lat, 50) * 1000:7.1f} ms  p99 {percentile(lat, 99) * 1000:7.1f} ms  "
+              f"errores {len(err)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sellers', type=int, default=8)
+    parser.add_argument('--buyers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--child', choices=['load'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == 'load':
+        run_load(args.sellers, args.buyers, args.seconds)
+        return
+
+    def child(mode, env):
+        return subprocess.run([sys.executable, __file__, '--child', mode,
+                               '--sellers', str(args.sellers), '--buyers', str(args.buyers),
+                               '--seconds', str(args.seconds)], env=env)
+
+    # cada modo en un proceso nuevo, con su propia base temporal
+    for async_writes in ('0', '1'):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, ASYNC_WRITES=async_writes,
+                       ASYNC_WRITES_SPOOL=os.path.join(tmp, 'spool'),
+                       DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'load.db')}")
+            print(f"ASYNC_WRITES={async_writes}:", flush=True)
+            if child('load', env).returncode:
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
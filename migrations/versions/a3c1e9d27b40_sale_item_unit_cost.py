@@ -0,0 +1,87 @@
+"""sale_item unit_cost
+
+Revision ID: a3c1e9d27b40
+Revises: 59f520f6cd74
+Create Date: 2026-10-18 10:12:41.203118
+
+"""
+import json
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c1e9d27b40'
+down_revision = '59f520f6cd74'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('sale_item', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unit_cost', sa.Float(), nullable=True))
+
+    conn = op.get_bind()
+
+    # Backfill: ítems cuyo lote todavía existe. Las consolidaciones viejas borraban lotes y SQLite
+    # reutiliza los ids, así que el lote tiene que ser del mismo producto y anterior a la venta
+    conn.execute(sa.text(
+        "UPDATE sale_item SET unit_cost = ("
+        "SELECT batch.cost FROM batch JOIN sale ON sale.id = sale_item.sale_id "
+        "WHERE batch.id = sale_item.batch_id AND batch.product_id = sale_item.product_id "
+        "AND batch.date_added <= sale.date) "
+        "WHERE unit_cost IS NULL"
+    ))
+
+    # Lotes borrados o con el id reutilizado: la última compra anterior a la venta que creó ese lote
+    conn.execute(sa.text(
+        "UPDATE sale_item SET unit_cost = ("
+        "SELECT purchase.unit_cost FROM purchase JOIN sale ON sale.id = sale_item.sale_id "
+        "WHERE purchase.created_batch_id = sale_item.batch_id AND purchase.product_id = sale_item.product_id "
+        "AND purchase.date <= sale.date ORDER BY purchase.date DESC, purchase.id DESC LIMIT 1) "
+        "WHERE unit_cost IS NULL"
+    ))
+
+    # Si no, el snapshot de la primera consolidación del producto posterior a la venta (la que borró el lote)
+    snapshots = conn.execute(sa.text(
+        "SELECT product_id, date, prev_batches_snapshot FROM purchase "
+        "WHERE action = 'consolidate' AND prev_batches_snapshot IS NOT NULL AND date IS NOT NULL "
+        "ORDER BY date, id"
+    )).all()
+    pending = conn.execute(sa.text(
+        "SELECT sale_item.id, sale_item.product_id, sale_item.batch_id, sale.date "
+        "FROM sale_item JOIN sale ON sale.id = sale_item.sale_id "
+        "WHERE sale_item.unit_cost IS NULL AND sale.date IS NOT NULL"
+    )).all()
+    if not snapshots or not pending:
+        return
+
+    consolidations = []
+    for product_id, date, snapshot in snapshots:
+        try:
+            prev = json.loads(snapshot)
+        except ValueError:
+            continue
+        costs = {pb['batch_id']: pb['cost'] for pb in prev if pb.get('batch_id') is not None}
+        consolidations.append((product_id, _as_datetime(date), costs))
+
+    updates = []
+    for item_id, product_id, batch_id, sale_date in pending:
+        sale_date = _as_datetime(sale_date)
+        for cons_product, cons_date, costs in consolidations:
+            if cons_product == product_id and cons_date >= sale_date and batch_id in costs:
+                updates.append({'id': item_id, 'cost': costs[batch_id]})
+                break
+    if updates:
+        conn.execute(sa.text("UPDATE sale_item SET unit_cost = :cost WHERE id = :id"), updates)
+
+
+def _as_datetime(value):
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+
+def downgrade():
+    with op.batch_alter_table('sale_item', schema=None) as batch_op:
+        batch_op.drop_column('unit_cost')
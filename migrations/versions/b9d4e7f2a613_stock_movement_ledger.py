@@ -0,0 +1,107 @@
+"""stock movement ledger
+
+Revision ID: b9d4e7f2a613
+Revises: f1a6c2e9b354
+Create Date: 2026-10-18 16:48:02.731945
+
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9d4e7f2a613'
+down_revision = 'f1a6c2e9b354'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stock_movement',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('batch_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('quantity', sa.Float(), nullable=False),
+    sa.Column('cost', sa.Float(), nullable=True),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('purchase_id', sa.Integer(), nullable=True),
+    sa.Column('sale_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stock_movement', schema=None) as batch_op:
+        batch_op.create_index('ix_stock_movement_product_id_date', ['product_id', 'date'], unique=False)
+        batch_op.create_index(batch_op.f('ix_stock_movement_batch_id'), ['batch_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_stock_movement_purchase_id'), ['purchase_id'], unique=False)
+
+    conn = op.get_bind()
+
+    # Backfill: entradas por compra y salidas por venta
+    conn.execute(sa.text(
+        "INSERT INTO stock_movement (product_id, batch_id, kind, quantity, cost, date, purchase_id) "
+        "SELECT product_id, created_batch_id, 'purchase_in', quantity, unit_cost, "
+        "COALESCE(date, CURRENT_TIMESTAMP), id "
+        "FROM purchase WHERE created_batch_id IS NOT NULL"
+    ))
+    conn.execute(sa.text(
+        "INSERT INTO stock_movement (product_id, batch_id, kind, quantity, cost, date, sale_id) "
+        "SELECT sale_item.product_id, sale_item.batch_id, 'sale_out', -sale_item.quantity, "
+        "sale_item.unit_cost, COALESCE(sale.date, CURRENT_TIMESTAMP), sale_item.sale_id "
+        "FROM sale_item JOIN sale ON sale.id = sale_item.sale_id"
+    ))
+
+    # Consolidaciones: los lotes previos salen del snapshot de cada compra
+    rows = conn.execute(sa.text(
+        "SELECT id, product_id, created_batch_id, unit_cost, date, prev_batches_snapshot FROM purchase "
+        "WHERE action = 'consolidate' AND prev_batches_snapshot IS NOT NULL AND created_batch_id IS NOT NULL"
+    )).all()
+    moves = []
+    for purchase_id, product_id, batch_id, unit_cost, date, snapshot in rows:
+        try:
+            prev = json.loads(snapshot)
+        except ValueError:
+            continue
+        prev = [pb for pb in prev if pb.get('batch_id') is not None and pb.get('quantity')]
+        for pb in prev:
+            moves.append({
+                'product_id': product_id, 'batch_id': pb['batch_id'], 'kind': 'consolidation_out',
+                'quantity': -pb['quantity'], 'cost': pb['cost'], 'date': date, 'purchase_id': purchase_id
+            })
+        if prev:
+            moves.append({
+                'product_id': product_id, 'batch_id': batch_id, 'kind': 'consolidation_in',
+                'quantity': sum(pb['quantity'] for pb in prev), 'cost': unit_cost, 'date': date,
+                'purchase_id': purchase_id
+            })
+    if moves:
+        conn.execute(sa.text(
+            "INSERT INTO stock_movement (product_id, batch_id, kind, quantity, cost, date, purchase_id) "
+            "VALUES (:product_id, :batch_id, :kind, :quantity, :cost, :date, :purchase_id)"
+        ), moves)
+
+    # Ajustes: lo que la historia no explica (anulaciones previas, cargas manuales) se cuadra contra los lotes
+    conn.execute(sa.text(
+        "INSERT INTO stock_movement (product_id, batch_id, kind, quantity, cost, date) "
+        "SELECT batch.product_id, batch.id, 'adjustment', "
+        "batch.quantity - COALESCE((SELECT SUM(m.quantity) FROM stock_movement m WHERE m.batch_id = batch.id), 0), "
+        "batch.cost, CURRENT_TIMESTAMP FROM batch "
+        "WHERE ABS(batch.quantity - COALESCE((SELECT SUM(m.quantity) FROM stock_movement m "
+        "WHERE m.batch_id = batch.id), 0)) > 1e-9"
+    ))
+    conn.execute(sa.text(
+        "INSERT INTO stock_movement (product_id, batch_id, kind, quantity, cost, date) "
+        "SELECT product_id, batch_id, 'adjustment', -SUM(quantity), NULL, CURRENT_TIMESTAMP "
+        "FROM stock_movement WHERE batch_id NOT IN (SELECT id FROM batch) "
+        "GROUP BY product_id, batch_id HAVING ABS(SUM(quantity)) > 1e-9"
+    ))
+
+
+def downgrade():
+    with op.batch_alter_table('stock_movement', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stock_movement_purchase_id'))
+        batch_op.drop_index(batch_op.f('ix_stock_movement_batch_id'))
+        batch_op.drop_index('ix_stock_movement_product_id_date')
+
+    op.drop_table('stock_movement')
@@ -0,0 +1,42 @@
+"""daily_sales rollup
+
+Revision ID: c7d2f4a81e93
+Revises: a3c1e9d27b40
+Create Date: 2026-10-18 11:40:05.918274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2f4a81e93'
+down_revision = 'a3c1e9d27b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_sales',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Float(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('cost', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('day', 'product_id')
+    )
+
+    # poblar con el histórico existente
+    op.execute(
+        "INSERT INTO daily_sales (day, product_id, quantity, revenue, cost) "
+        "SELECT date(sale.date), sale_item.product_id, SUM(sale_item.quantity), "
+        "SUM(sale_item.quantity * sale_item.price_at_sale), "
+        "SUM(sale_item.quantity * COALESCE(sale_item.unit_cost, 0)) "
+        "FROM sale JOIN sale_item ON sale_item.sale_id = sale.id "
+        "GROUP BY date(sale.date), sale_item.product_id"
+    )
+
+
+def downgrade():
+    op.drop_table('daily_sales')
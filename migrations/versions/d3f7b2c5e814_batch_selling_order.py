@@ -0,0 +1,42 @@
+"""batch selling order index and pruning of empty batches
+
+Revision ID: d3f7b2c5e814
+Revises: b9d4e7f2a613
+Create Date: 2026-10-18 21:12:40.518362
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f7b2c5e814'
+down_revision = 'b9d4e7f2a613'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # AUTOINCREMENT: los lotes podados no reutilizan su id (ventas y libro lo siguen referenciando)
+    with op.batch_alter_table('batch', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_batch_product_id'))
+
+    # Orden de venta (más caro primero, a igual costo el más viejo): las ventas leen con LIMIT sobre el índice
+    op.create_index('ix_batch_product_id_cost_date', 'batch',
+                    ['product_id', sa.text('cost DESC'), 'date_added'], unique=False)
+
+    # Poda: lotes en 0 salvo el más caro de cada producto (misma regla que stock.prune_empty)
+    op.get_bind().execute(sa.text(
+        "DELETE FROM batch WHERE quantity <= 0 AND EXISTS ("
+        "SELECT 1 FROM batch AS higher WHERE higher.product_id = batch.product_id "
+        "AND (higher.cost > batch.cost OR (higher.cost = batch.cost AND higher.id > batch.id)))"
+    ))
+
+
+def downgrade():
+    # Los lotes podados no se recuperan (vacíos; las anulaciones los recrean si hace falta)
+    op.drop_index('ix_batch_product_id_cost_date', table_name='batch')
+    with op.batch_alter_table('batch', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        batch_op.create_index(batch_op.f('ix_batch_product_id'), ['product_id'], unique=False)
@@ -0,0 +1,34 @@
+"""product stock_qty and max_cost
+
+Revision ID: e5b8a0c3d716
+Revises: c7d2f4a81e93
+Create Date: 2026-10-18 14:05:27.551902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8a0c3d716'
+down_revision = 'c7d2f4a81e93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('stock_qty', sa.Float(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('max_cost', sa.Float(), nullable=True))
+
+    op.execute(
+        "UPDATE product SET "
+        "stock_qty = COALESCE((SELECT SUM(batch.quantity) FROM batch WHERE batch.product_id = product.id), 0), "
+        "max_cost = (SELECT MAX(batch.cost) FROM batch WHERE batch.product_id = product.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_column('max_cost')
+        batch_op.drop_column('stock_qty')
@@ -0,0 +1,51 @@
+"""purchase and sale ids without reuse
+
+Revision ID: e8a4c1d6f527
+Revises: d3f7b2c5e814
+Create Date: 2026-10-18 22:05:17.402931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a4c1d6f527'
+down_revision = 'd3f7b2c5e814'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return   # las secuencias de los otros motores no reutilizan ids
+
+    # AUTOINCREMENT: el libro guarda purchase_id / sale_id de compras y ventas anuladas (borradas);
+    # sin esto SQLite le da ese id a la próxima fila y el libro las confunde
+    for table in ('purchase', 'sale'):
+        with op.batch_alter_table(table, schema=None, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': True}):
+            pass
+
+    # La secuencia arranca después del último id que aparece en el libro (pudo ser de una fila ya borrada)
+    conn = op.get_bind()
+    for table, column in (('purchase', 'purchase_id'), ('sale', 'sale_id')):
+        last = conn.execute(sa.text(
+            f"SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM {table} "
+            f"UNION ALL SELECT MAX({column}) FROM stock_movement)"
+        )).scalar()
+        if last is None:
+            continue
+        conn.execute(sa.text("DELETE FROM sqlite_sequence WHERE name = :name"), {'name': table})
+        conn.execute(sa.text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"),
+                     {'name': table, 'seq': last})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for table in ('sale', 'purchase'):
+        with op.batch_alter_table(table, schema=None, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': False}):
+            pass
@@ -0,0 +1,56 @@
+"""indexes for hot query paths
+
+Revision ID: f1a6c2e9b354
+Revises: e5b8a0c3d716
+Create Date: 2026-10-18 15:32:10.004617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a6c2e9b354'
+down_revision = 'e5b8a0c3d716'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('sale', schema=None) as batch_op:
+        batch_op.create_index('ix_sale_date_id', ['date', 'id'], unique=False)
+
+    with op.batch_alter_table('sale_item', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_sale_item_sale_id'), ['sale_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_sale_item_product_id'), ['product_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_sale_item_batch_id'), ['batch_id'], unique=False)
+
+    with op.batch_alter_table('batch', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_batch_product_id'), ['product_id'], unique=False)
+
+    with op.batch_alter_table('purchase', schema=None) as batch_op:
+        batch_op.create_index('ix_purchase_product_id_date', ['product_id', 'date'], unique=False)
+        batch_op.create_index('ix_purchase_date_id', ['date', 'id'], unique=False)
+
+    with op.batch_alter_table('price_history', schema=None) as batch_op:
+        batch_op.create_index('ix_price_history_product_id_date', ['product_id', 'date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('price_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_price_history_product_id_date')
+
+    with op.batch_alter_table('purchase', schema=None) as batch_op:
+        batch_op.drop_index('ix_purchase_date_id')
+        batch_op.drop_index('ix_purchase_product_id_date')
+
+    with op.batch_alter_table('batch', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_batch_product_id'))
+
+    with op.batch_alter_table('sale_item', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_sale_item_batch_id'))
+        batch_op.drop_index(batch_op.f('ix_sale_item_product_id'))
+        batch_op.drop_index(batch_op.f('ix_sale_item_sale_id'))
+
+    with op.batch_alter_table('sale', schema=None) as batch_op:
+        batch_op.drop_index('ix_sale_date_id')
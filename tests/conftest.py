@@ -0,0 +1,73 @@
+import os
+import sys
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+pytest_plugins = ['app.testing']
+
+
+@pytest.fixture
+def statements(app):
+    """Sentencias SQL emitidas durante el test, en orden (se puede vaciar con .clear())."""
+    from app import db
+    with app.app_context():
+        engine = db.engine
+    log = []
+
+    def _log(conn, cursor, statement, *args):
+        log.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', _log)
+    yield log
+    event.remove(engine, 'before_cursor_execute', _log)
+
+
+@pytest.fixture
+def buy(client):
+    """POST /purchases; devuelve el JSON de la respuesta."""
+    def buy(product_id, unit_cost, quantity):
+        r = client.post('/purchases', json={'product_id': product_id, 'unit_cost': unit_cost, 'quantity': quantity})
+        assert r.status_code == 201, r.get_json()
+        return r.get_json()
+    return buy
+
+
+@pytest.fixture
+def sell(client):
+    """POST /sales de un solo item; devuelve el id de la venta."""
+    def sell(product_id, quantity):
+        r = client.post('/sales', json={'items': [{'product_id': product_id, 'quantity': quantity}]})
+        assert r.status_code == 201, r.get_json()
+        return r.get_json()['sale_id']
+    return sell
+
+
+@pytest.fixture
+def product(client):
+    """POST /products; devuelve el id."""
+    def product(name='nuez', markup=40.0):
+        r = client.post('/products', json={'name': name, 'markup': markup})
+        assert r.status_code == 201, r.get_json()
+        return r.get_json()['id']
+    return product
+
+
+@pytest.fixture
+def assert_consistent(session):
+    """stock_qty = suma de lotes de cada producto, y cada lote = su saldo en el libro de movimientos."""
+    from app import db
+    from app.models.batch import Batch
+    from app.models.product import Product
+    from app.services import ledger
+
+    def check():
+        session.expire_all()
+        by_product = dict(
+            session.query(Batch.product_id, db.func.sum(Batch.quantity)).group_by(Batch.product_id).all()
+        )
+        for p in session.query(Product):
+            assert abs(p.stock_qty - by_product.get(p.id, 0.0)) < 1e-6, f'stock_qty del producto {p.id}'
+        assert ledger.batch_drift() == []
+    return check
@@ -0,0 +1,119 @@
+"""Anulación de ventas por conjunto (services.sales.annul_sales): stock repuesto y cantidad de sentencias."""
+import pytest
+from app import db
+from app.models.batch import Batch
+from app.models.daily_sales import DailySales
+from app.models.product import Product
+
+
+def batches(session, product_id):
+    session.expire_all()
+    return {b.id: b.quantity for b in session.query(Batch).filter_by(product_id=product_id)}
+
+
+def test_restores_current_consolidated_and_pruned_batches(client, session, product, buy, sell, assert_consistent):
+    nuez, almendra = product('nuez', 50.0), product('almendra', 40.0)
+
+    # nuez: dos lotes, una venta que toca ambos, otra que queda en el lote vigente
+    buy(nuez, 100.0, 10.0)
+    buy(nuez, 90.0, 10.0)
+    before_consolidation = sell(nuez, 12.0)
+    buy(nuez, 120.0, 5.0)                   # consolida en el lote 3
+    buy(nuez, 80.0, 3.0)                    # lote 4, vigente
+    after_consolidation = sell(nuez, 14.0)
+
+    # almendra: el lote de 40 queda en 0 y se poda (stock.prune_empty); al anular vuelve con su id
+    buy(almendra, 50.0, 4.0)
+    buy(almendra, 40.0, 4.0)
+    buy(almendra, 30.0, 4.0)
+    first = sell(almendra, 6.0)
+    pruning = sell(almendra, 3.0)
+    assert set(batches(session, almendra)) == {5, 7}
+
+    r = client.post('/sales/annul-bulk', json={'sale_ids': [before_consolidation, pruning, 999999]}).get_json()
+    assert r['not_found'] == [999999]
+    assert {(x['sale_id'], x['batch_id']): x['quantity'] for x in r['restored']} == {
+        (before_consolidation, 3): 12.0, (pruning, 6): 2.0, (pruning, 7): 1.0
+    }
+    assert client.delete(f'/sales/{after_consolidation}').status_code == 200
+    assert client.delete(f'/sales/{after_consolidation}').status_code == 404
+    assert client.delete(f'/sales/{first}').status_code == 200
+
+    assert batches(session, nuez) == {3: 25.0, 4: 3.0}
+    assert batches(session, almendra) == {5: 4.0, 6: 4.0, 7: 4.0}
+    assert {p.id: p.stock_qty for p in session.query(Product)} == {nuez: 28.0, almendra: 12.0}
+    assert session.query(db.func.sum(db.func.abs(DailySales.quantity))).scalar() == pytest.approx(0.0)
+    assert_consistent()
+
+    # las compras se siguen pudiendo anular (lo repuesto queda en el consolidado)
+    assert client.delete('/purchases/4').status_code == 200
+    assert client.delete('/purchases/3').status_code == 200
+    assert_consistent()
+
+
+def test_redirected_stock_returns_when_consolidation_is_annulled(client, session, product, buy, sell,
+                                                                 assert_consistent):
+    product_id = product()
+    buy(product_id, 100.0, 10.0)
+    buy(product_id, 80.0, 5.0)
+    sale_id = sell(product_id, 12.0)
+    consolidation = buy(product_id, 120.0, 3.0)['purchase_id']
+
+    assert client.delete(f'/sales/{sale_id}').status_code == 200      # repone en el consolidado
+    assert client.delete(f'/purchases/{consolidation}').status_code == 200
+
+    assert batches(session, product_id) == {1: 10.0, 2: 5.0}
+    assert session.get(Product, product_id).max_cost == 100.0
+    assert_consistent()
+
+
+def test_consolidation_with_foreign_stock_is_not_annulled(client, session, product, buy, sell, assert_consistent):
+    product_id = product()
+    buy(product_id, 100.0, 10.0)
+    sale_id = sell(product_id, 4.0)
+    first = buy(product_id, 120.0, 1.0)['purchase_id']
+    second = buy(product_id, 130.0, 1.0)['purchase_id']
+    assert client.delete(f'/sales/{sale_id}').status_code == 200      # repone en el consolidado de `second`
+
+    # lo repuesto no salió de `second`: no sabe a qué lote devolverlo (y `first` quedó consolidado en `second`)
+    assert client.delete(f'/purchases/{second}').status_code == 409
+    assert client.delete(f'/purchases/{first}').status_code == 409
+    assert_consistent()
+
+
+def test_statement_count_does_not_depend_on_sales(client, product, buy, statements, assert_consistent):
+    product_id = product('castaña', 30.0)
+    # lotes cada vez más baratos: cada venta de 3 kg cruza dos o tres lotes
+    for i in range(20):
+        buy(product_id, 200.0 - i, 1e6 if i == 19 else 2.0)
+    sizes = [1, 10, 100]
+    tickets = [{'items': [{'product_id': product_id, 'quantity': 3.0}]} for _ in range(sum(sizes) + 1)]
+    sale_ids = [r['sale_id'] for r in client.post('/sales/bulk', json={'tickets': tickets}).get_json()['results']]
+
+    statements.clear()
+    assert client.delete(f'/sales/{sale_ids.pop()}').status_code == 200
+    counts = [len(statements)]
+    for size in sizes:
+        annul, sale_ids = sale_ids[:size], sale_ids[size:]
+        statements.clear()
+        r = client.post('/sales/annul-bulk', json={'sale_ids': annul}).get_json()
+        assert len(r['annulled']) == size
+        counts.append(len(statements))
+    assert len(set(counts)) == 1, counts
+    assert_consistent()
+
+
+
+def test_stock_of_a_consolidated_batch_follows_the_next_consolidation(client, session, product, buy, sell,
+                                                                      assert_consistent):
+    product_id = product()
+    buy(product_id, 100.0, 10.0)
+    buy(product_id, 120.0, 5.0)             # consolida en el lote 2
+    sale_id = sell(product_id, 3.0)
+    consolidation = buy(product_id, 130.0, 2.0)['purchase_id']    # consolida el lote 2 en el 3
+
+    assert client.delete(f'/sales/{sale_id}').status_code == 200   # repone en el lote 3, movido desde el 2
+    assert client.delete(f'/purchases/{consolidation}').status_code == 200
+
+    assert batches(session, product_id) == {2: 15.0}
+    assert_consistent()
@@ -0,0 +1,128 @@
+"""Lotes en orden de venta leídos por páginas (services.sales.basket_snapshot) y poda de lotes en 0."""
+import random
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.batch import Batch
+from app.models.product import Product
+from app.services import ledger
+from app.services.sales import SNAPSHOT_PAGE, AllocationError, allocate, basket_snapshot
+
+
+def add_batches(session, product_id, costs, start=datetime(2025, 1, 1)):
+    """Lotes insertados directo (por POST /purchases cada compra más cara consolidaría)."""
+    batches = [
+        Batch(product_id=product_id, cost=cost, quantity=float(1 + i % 3), date_added=start + timedelta(minutes=i // 2))
+        for i, cost in enumerate(costs)
+    ]
+    session.add_all(batches)
+    session.flush()
+    ledger.record(ledger.movement('purchase_in', product_id, b.id, b.quantity, b.cost, b.date_added) for b in batches)
+    session.get(Product, product_id).refresh_stock()
+    session.commit()
+    return batches
+
+
+def selling_order(session, product_id):
+    return [
+        tuple(row) for row in session.execute(
+            db.select(Batch.id, Batch.cost, Batch.quantity)
+            .where(Batch.product_id == product_id, Batch.quantity > 0)
+            .order_by(Batch.cost.desc(), Batch.date_added, Batch.id)
+        )
+    ]
+
+
+def outcome(items, snapshot):
+    try:
+        return allocate(items, snapshot)
+    except AllocationError as e:
+        return str(e), e.status
+
+
+def test_pages_follow_selling_order(session, product):
+    product_id = product()
+    # muchos empates de costo y de fecha: la clave de las páginas siguientes es (cost, date_added, id)
+    add_batches(session, product_id, [500.0 - i // 5 for i in range(300)])
+    full = selling_order(session, product_id)
+    total = sum(qty for _, _, qty in full)
+
+    for quantity in (1.0, 30.0, total / 2, total - 0.5, total, total + 1):
+        items = [{'product_id': product_id, 'quantity': quantity}]
+        _, batches = basket_snapshot(items)[product_id]
+        assert batches == full[:len(batches)]
+        assert sum(qty for _, _, qty in batches) >= min(quantity, total)
+        assert outcome(items, basket_snapshot(items)) == outcome(items, {product_id: (40.0, full)})
+
+
+def test_one_statement_for_many_products(session, product, statements):
+    rng = random.Random(1)
+    products = [product(f'fruta {i}') for i in range(50)]
+    for product_id in products:
+        add_batches(session, product_id, [float(rng.randint(100, 900)) for _ in range(rng.randint(0, 12))])
+
+    statements.clear()
+    snapshot = basket_snapshot([{'product_id': product_id, 'quantity': 1.0} for product_id in products])
+    assert len([s for s in statements if s.startswith('SELECT')]) == 1
+    assert set(snapshot) == set(products)
+    for product_id in products:
+        assert snapshot[product_id][1] == selling_order(session, product_id)[:SNAPSHOT_PAGE]
+
+
+def test_sales_prune_and_annulment_recreates(client, session, product, assert_consistent):
+    product_id = product()
+    add_batches(session, product_id, [300.0 - i for i in range(40)])
+    before = {b.id for b in session.query(Batch).filter_by(product_id=product_id)}
+
+    sale_ids = []
+    for quantity in (5.0, 7.0, 12.0):
+        r = client.post('/sales', json={'items': [{'product_id': product_id, 'quantity': quantity}]})
+        assert r.status_code == 201
+        sale_ids.append(r.get_json()['sale_id'])
+    session.expire_all()
+    remaining = session.query(Batch).filter_by(product_id=product_id).all()
+    # los vacíos se podan, salvo el más caro (sostiene max_cost)
+    assert [b.id for b in remaining if b.quantity == 0] == [min(before)]
+    assert session.get(Product, product_id).max_cost == 300.0
+
+    assert len(client.post('/sales/annul-bulk', json={'sale_ids': sale_ids}).get_json()['annulled']) == 3
+    session.expire_all()
+    assert {b.id for b in session.query(Batch).filter_by(product_id=product_id)} == before
+    assert_consistent()
+
+
+def test_annulled_consolidation_restores_empty_top_batch(client, session, product, buy, sell, assert_consistent):
+    product_id = product()
+    buy(product_id, 100.0, 5.0)
+    buy(product_id, 80.0, 5.0)
+    sell(product_id, 5.0)                   # el lote de 100 queda en 0 (no se poda: es el más caro)
+    consolidation = buy(product_id, 120.0, 2.0)['purchase_id']
+    assert client.delete(f'/purchases/{consolidation}').status_code == 200
+
+    session.expire_all()
+    assert {b.id: b.quantity for b in session.query(Batch)} == {1: 0.0, 2: 5.0}
+    assert session.get(Product, product_id).max_cost == 100.0
+    assert_consistent()
+
+
+@pytest.mark.parametrize('value', ['1', 1, 1.0])
+def test_snapshot_keys_are_ints(session, product, value):
+    product_id = product()
+    assert list(basket_snapshot([{'product_id': value, 'quantity': 1.0}])) == [product_id]
+
+
+def test_pruned_consolidated_batch_is_recreated(client, session, product, buy, sell, assert_consistent):
+    product_id = product()
+    buy(product_id, 80.0, 5.0)
+    buy(product_id, 100.0, 10.0)            # consolida en el lote 2
+    buy(product_id, 100.0, 4.0)             # lote 3, mismo costo: el 2 en 0 se poda
+    sale_id = sell(product_id, 15.0)
+    assert client.delete(f'/sales/{sale_id}').status_code == 200
+
+    session.expire_all()
+    assert {b.id: b.quantity for b in session.query(Batch)} == {2: 15.0, 3: 4.0}
+    assert client.delete('/purchases/3').status_code == 200
+    assert client.delete('/purchases/2').status_code == 200
+    session.expire_all()
+    assert {b.id: b.quantity for b in session.query(Batch)} == {1: 5.0}
+    assert_consistent()
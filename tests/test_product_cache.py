@@ -0,0 +1,26 @@
+"""Cache de precios por producto (services.product_cache): una invalidación durante la carga no se pierde."""
+from app.services import product_cache as module
+from app.services.product_cache import product_cache
+
+
+def test_invalidate_during_load_is_kept(session, product, buy, monkeypatch):
+    product_id = product()
+    buy(product_id, 100.0, 5.0)
+    product_cache.invalidate()
+    entry = module.product_entry
+
+    def invalidated_while_loading(p, *args):
+        # otra request confirma un cambio e invalida entre la lectura y el guardado
+        product_cache.invalidate([p.id])
+        return entry(p, *args)
+
+    monkeypatch.setattr(module, 'product_entry', invalidated_while_loading)
+    assert product_cache.get(product_id)['total_stock'] == 5.0
+    monkeypatch.setattr(module, 'product_entry', entry)
+
+    misses = product_cache.stats()['misses']
+    product_cache.get(product_id)
+    assert product_cache.stats()['misses'] == misses + 1   # no quedó guardado lo leído antes de invalidar
+    product_cache.get(product_id)
+    assert product_cache.stats()['misses'] == misses + 1
+
@@ -0,0 +1,20 @@
+"""POST /purchases/bulk: cuerpos y líneas que no son objetos."""
+import pytest
+
+
+@pytest.mark.parametrize('body', [[{'product_id': 1, 'unit_cost': 10.0, 'quantity': 1.0}], 'lines', {'lines': {}}])
+def test_body_must_be_object_with_list(client, product, body):
+    product()
+    assert client.post('/purchases/bulk', json=body).status_code == 400
+
+
+def test_non_object_lines_fail_alone(client, product, assert_consistent):
+    product_id = product()
+    r = client.post('/purchases/bulk', json={'lines': [
+        'x', {'product_id': product_id, 'unit_cost': 10.0, 'quantity': 2.0}, [product_id, 10.0, 1.0], None
+    ]})
+    assert r.status_code == 200
+    body = r.get_json()
+    assert (body['imported'], body['failed']) == (1, 3)
+    assert [line['ok'] for line in body['results']] == [False, True, False, False]
+    assert_consistent()
@@ -0,0 +1,42 @@
+"""EXPLAIN QUERY PLAN de las consultas calientes (services.query_plans): ninguna recorre una tabla completa."""
+import os
+from app import create_app, db
+from app.config import Config
+from app.models.batch import Batch
+from app.routes.sale_routes import _sales_query
+from app.services.query_plans import ALLOWED_SCANS, check_plans, explain, full_scans as scans_of
+
+MIGRATIONS = os.path.join(os.path.dirname(__file__), '..', 'migrations')
+
+
+def full_scans():
+    return {name: scans for name, (_, scans) in check_plans().items() if scans}
+
+
+def test_models_schema(session):
+    assert full_scans() == {}
+
+
+def test_migrated_schema(tmp_path):
+    """Los índices también tienen que salir de las migraciones (flask db upgrade), no solo de los modelos."""
+    from flask_migrate import upgrade
+    config = Config()
+    config.database_uri = f"sqlite:///{tmp_path / 'plans.db'}"
+    config.async_writes = None
+    app = create_app(config)
+    with app.app_context():
+        upgrade(directory=MIGRATIONS)
+        assert full_scans() == {}
+        db.engine.dispose()
+
+
+def test_unbounded_ordered_scan_fails(session):
+    """Sin LIMIT, recorrer sale en orden de ix_sale_date_id lee la tabla entera aunque use el índice."""
+    plan, tables = explain(_sales_query(None, None, None, None, None))
+    assert scans_of(plan, tables) == ['SCAN sale USING INDEX ix_sale_date_id']
+    assert scans_of(plan, tables, ALLOWED_SCANS['sales.list_page']) == []
+
+
+def test_alias_scan_fails(session):
+    plan, tables = explain(db.select(db.aliased(Batch, name='ranked').id))
+    assert scans_of(plan, tables) == plan
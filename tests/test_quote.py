@@ -0,0 +1,101 @@
+"""POST /sales/quote contra POST /sales: misma asignación (services.sales.allocate), sin escrituras."""
+import random
+import pytest
+from app.models.sale_item import SaleItem
+from app.models.stock_movement import StockMovement
+
+PRODUCTS = 6
+# sentencias de la transacción externa de los tests (rollback_scope), no de la ruta
+_SCOPE = ('SELECT', 'SAVEPOINT', 'RELEASE', 'ROLLBACK')
+
+
+def restock(buy, rng):
+    buy(rng.randint(1, PRODUCTS), float(rng.randint(50, 150)), float(rng.randint(1, 20)))
+
+
+def random_basket(rng):
+    items = []
+    for _ in range(rng.randint(1, 4)):
+        product_id = rng.randint(1, PRODUCTS + 1)   # PRODUCTS + 1 no existe
+        quantity = rng.choice([rng.randint(1, 10), rng.uniform(0.1, 5.0), rng.randint(20, 60)])
+        items.append({'product_id': rng.choice([product_id, str(product_id)]), 'quantity': quantity})
+    return {'items': items}
+
+
+def written(session):
+    return (session.query(SaleItem).count(), session.query(StockMovement).count())
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_quote_matches_sale(client, session, product, buy, statements, seed):
+    rng = random.Random(seed)
+    for i in range(PRODUCTS):
+        product(f'producto {i}', float(rng.choice([0, 25, 40, 57.5])))
+    for _ in range(PRODUCTS * 4):
+        restock(buy, rng)
+
+    for case in range(60):
+        if rng.random() < 0.3:
+            restock(buy, rng)
+        basket = random_basket(rng)
+
+        before = written(session)
+        statements.clear()
+        quote = client.post('/sales/quote', json=basket)
+        assert [s for s in statements if not s.lstrip().upper().startswith(_SCOPE)] == [], basket
+        assert written(session) == before
+
+        sale = client.post('/sales', json=basket)
+        assert quote.status_code == (200 if sale.status_code == 201 else sale.status_code), basket
+        if sale.status_code != 201:
+            assert quote.get_json() == sale.get_json()
+            continue
+
+        q, s = quote.get_json(), sale.get_json()
+        assert q['total'] == s['total']
+        assert sum(line['subtotal'] for line in q['lines']) == pytest.approx(q['total'])
+        quoted = [(b['batch_id'], b['quantity'], b['unit_price']) for line in q['lines'] for b in line['batches']]
+        sold = session.execute(
+            session.query(SaleItem.batch_id, SaleItem.quantity, SaleItem.price_at_sale)
+            .filter(SaleItem.sale_id == s['sale_id']).order_by(SaleItem.id).statement
+        ).all()
+        assert quoted == [tuple(row) for row in sold]
+
+
+@pytest.mark.parametrize('path', ['/sales/quote', '/sales'])
+def test_product_id_as_text(client, product, buy, path):
+    product_id = product()
+    buy(product_id, 100.0, 10.0)
+    r = client.post(path, json={'items': [{'product_id': str(product_id), 'quantity': 1.0}]})
+    assert r.status_code in (200, 201)
+    if path == '/sales/quote':
+        assert r.get_json()['lines'][0]['product_id'] == product_id
+
+
+@pytest.mark.parametrize('value', ['abc', None, 1.5, True])
+def test_invalid_product_id(client, product, buy, value):
+    product_id = product()
+    buy(product_id, 100.0, 10.0)
+    basket = {'items': [{'product_id': value, 'quantity': 1.0}]}
+    assert client.post('/sales/quote', json=basket).status_code == 400
+    assert client.post('/sales', json=basket).status_code == 400
+    r = client.post('/sales/bulk', json={'tickets': [basket]})
+    assert r.get_json()['results'][0]['status'] == 400
+
+
+@pytest.mark.parametrize('item', [{}, {'quantity': None}, {'quantity': 'mucho'}, {'quantity': [1]},
+                                  {'quantity': 'nan'}, {'quantity': 0}])
+def test_invalid_quantity(client, product, buy, item):
+    product_id = product()
+    buy(product_id, 100.0, 10.0)
+    basket = {'items': [{'product_id': product_id, **item}]}
+    assert client.post('/sales/quote', json=basket).status_code == 400
+    assert client.post('/sales', json=basket).status_code == 400
+    r = client.post('/sales/bulk', json={'tickets': [basket]})
+    assert r.get_json()['results'][0]['status'] == 400
+
+
+def test_invalid_item(client):
+    basket = {'items': ['1']}
+    assert client.post('/sales/quote', json=basket).status_code == 400
+    assert client.post('/sales', json=basket).status_code == 400
@@ -0,0 +1,21 @@
+"""Acumulado diario (services.rollup): motores soportados."""
+import pytest
+from sqlalchemy.dialects import registry
+from sqlalchemy.dialects.sqlite.pysqlite import SQLiteDialect_pysqlite
+from app import create_app
+from app.config import Config
+
+
+class OtherDialect(SQLiteDialect_pysqlite):
+    """SQLite con otro nombre: un motor sin UPSERT ni períodos en rollup."""
+    name = 'otherdb'
+
+
+registry.register('otherdb', __name__, 'OtherDialect')
+
+
+def test_unsupported_backend_fails_at_startup():
+    config = Config.in_memory()
+    config.database_uri = 'otherdb://'
+    with pytest.raises(RuntimeError, match='otherdb'):
+        create_app(config)
@@ -0,0 +1,20 @@
+"""POST /sales/bulk: fechas de los tickets."""
+from datetime import date, datetime
+from app.models.daily_sales import DailySales
+from app.models.sale import Sale
+
+
+def test_aware_ticket_dates_stored_as_utc(client, session, product, buy):
+    product_id = product()
+    buy(product_id, 100.0, 10.0)
+    r = client.post('/sales/bulk', json={'tickets': [
+        {'date': '2025-09-01T22:15:00-03:00', 'items': [{'product_id': product_id, 'quantity': 1.0}]},
+        {'date': '2025-09-01T10:15:00', 'items': [{'product_id': product_id, 'quantity': 1.0}]},
+        {'date': 'ayer', 'items': [{'product_id': product_id, 'quantity': 1.0}]},
+    ]})
+    assert [t['ok'] for t in r.get_json()['results']] == [True, True, False]
+    assert r.get_json()['results'][2]['status'] == 400
+
+    session.expire_all()
+    assert sorted(s.date for s in session.query(Sale)) == [datetime(2025, 9, 1, 10, 15), datetime(2025, 9, 2, 1, 15)]
+    assert sorted(d.day for d in session.query(DailySales)) == [date(2025, 9, 1), date(2025, 9, 2)]
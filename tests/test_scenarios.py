@@ -0,0 +1,29 @@
+"""Compras (lotes nuevos y consolidaciones), ventas y anulaciones al azar; el stock queda consistente."""
+import random
+import pytest
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_random_scenario(client, product, assert_consistent, seed):
+    rng = random.Random(seed)
+    product_id = product()
+    sales, purchases = [], []
+    for _ in range(rng.randint(3, 10)):
+        if rng.random() < 0.5:
+            r = client.post('/purchases', json={
+                'product_id': product_id, 'unit_cost': float(rng.randint(50, 150)), 'quantity': float(rng.randint(1, 10))
+            })
+            assert r.status_code == 201
+            purchases.append(r.get_json()['purchase_id'])
+        else:
+            r = client.post('/sales', json={'items': [{'product_id': product_id, 'quantity': float(rng.randint(1, 6))}]})
+            assert r.status_code in (201, 409)
+            if r.status_code == 201:
+                sales.append(r.get_json()['sale_id'])
+    if sales:
+        r = client.post('/sales/annul-bulk', json={'sale_ids': rng.sample(sales, rng.randint(1, len(sales)))})
+        assert r.status_code == 200
+    if purchases and rng.random() < 0.5:
+        # la última compra se puede anular salvo que su stock ya se haya vendido
+        assert client.delete(f'/purchases/{purchases[-1]}').status_code in (200, 409)
+    assert_consistent()
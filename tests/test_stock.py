@@ -0,0 +1,23 @@
+"""Descuento de stock con UPDATE condicional (services.stock.take)."""
+from app.models.batch import Batch
+
+
+def test_takes_summed_in_python_fit_the_batch(client, session, product, buy, assert_consistent):
+    product_id = product()
+    buy(product_id, 100.0, 0.9)
+    buy(product_id, 80.0, 5.0)
+    # 0.292 + (0.9 - 0.292) > 0.9 en punto flotante: el lote de 0.9 tiene que alcanzar igual
+    r = client.post('/sales/bulk', json={'tickets': [
+        {'items': [{'product_id': product_id, 'quantity': 0.292}]},
+        {'items': [{'product_id': product_id, 'quantity': 1.0}]},
+    ]})
+    assert r.status_code == 200, r.get_json()
+    assert [t['ok'] for t in r.get_json()['results']] == [True, True]
+    r = client.post('/sales', json={'items': [
+        {'product_id': product_id, 'quantity': 0.3}, {'product_id': product_id, 'quantity': 0.7}
+    ]})
+    assert r.status_code == 201, r.get_json()
+
+    session.expire_all()
+    assert all(b.quantity >= 0 for b in session.query(Batch))
+    assert_consistent()
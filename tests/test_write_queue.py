@@ -0,0 +1,114 @@
+"""Cola de escrituras diferidas (ASYNC_WRITES): ninguna fila de PriceHistory se pierde ni se duplica."""
+import os
+import subprocess
+import sys
+import threading
+from app import create_app, db
+from app.config import Config
+from app.models.price_history import PriceHistory
+from app.models.product import Product
+from app.services.write_queue import write_queue
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+PRODUCTS = 5
+
+# compra con la cola activada (sin llegar a insertar) y muere sin pasar por atexit
+CRASH_WRITER = f'''
+import os
+from app import create_app, db
+from app.models.product import Product
+app = create_app()
+with app.app_context():
+    db.create_all()
+    db.session.add_all(Product(name=f'producto {{i}}', markup=40.0) for i in range({PRODUCTS}))
+    db.session.commit()
+client = app.test_client()
+for n in range(int(os.environ['ROWS'])):
+    client.post('/purchases', json={{'product_id': 1 + n % {PRODUCTS}, 'unit_cost': 50.0, 'quantity': 1.0}})
+os._exit(1)
+'''
+
+
+def queued_app(tmp_path, **settings):
+    config = Config()
+    config.database_uri = f"sqlite:///{tmp_path / 'queue.db'}"
+    config.migrations = False
+    config.async_writes = {'interval': 0.05, 'batch_size': 50, 'spool_dir': str(tmp_path / 'spool'), **settings}
+    app = create_app(config)
+    app.logger.disabled = True
+    return app
+
+
+def test_no_rows_lost_under_mixed_traffic(tmp_path):
+    app = queued_app(tmp_path)
+    try:
+        with app.app_context():
+            db.create_all()
+            db.session.add_all(Product(name=f'producto {i}', markup=40.0) for i in range(PRODUCTS))
+            db.session.commit()
+        accepted = []
+        client = app.test_client()
+        for product_id in range(1, PRODUCTS + 1):   # con lotes: los cambios de markup también registran precio
+            accepted.append(client.post('/purchases', json={
+                'product_id': product_id, 'unit_cost': 100.0, 'quantity': 1e6
+            }).status_code)
+
+        def buyer(worker):
+            client = app.test_client()
+            for n in range(60):
+                product_id = 1 + (worker + n) % PRODUCTS
+                if n % 2:
+                    r = client.put(f'/products/{product_id}', json={'markup': 40.0 + n % 7})
+                else:
+                    r = client.post('/purchases', json={'product_id': product_id, 'unit_cost': 50.0, 'quantity': 1.0})
+                if r.status_code < 400:
+                    accepted.append(r.status_code)
+
+        def seller():
+            client = app.test_client()
+            for n in range(60):
+                client.post('/sales', json={'items': [{'product_id': 1 + n % PRODUCTS, 'quantity': 0.1}]})
+
+        threads = [threading.Thread(target=buyer, args=(i,)) for i in range(4)] + [threading.Thread(target=seller)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        write_queue.stop()   # lo mismo que corre en atexit: vacía la cola
+
+    with app.app_context():
+        assert PriceHistory.query.count() == len(accepted)
+        db.engine.dispose()
+    assert os.listdir(tmp_path / 'spool') == []
+
+
+def test_spool_recovered_after_crash(tmp_path):
+    rows = 40
+    env = dict(os.environ, PYTHONPATH=ROOT, ROWS=str(rows), ASYNC_WRITES='1', ASYNC_WRITES_INTERVAL='3600',
+               ASYNC_WRITES_BATCH='1000000', ASYNC_WRITES_SPOOL=str(tmp_path / 'spool'),
+               DATABASE_URL=f"sqlite:///{tmp_path / 'queue.db'}")
+    assert subprocess.run([sys.executable, '-c', CRASH_WRITER], env=env).returncode == 1
+
+    app = queued_app(tmp_path)   # recupera el spool del proceso muerto
+    try:
+        with app.app_context():
+            assert PriceHistory.query.count() == rows
+    finally:
+        write_queue.stop()
+    assert write_queue.stats()['recovered'] == rows
+    app = queued_app(tmp_path)   # el spool ya se borró: no se duplica
+    try:
+        with app.app_context():
+            assert PriceHistory.query.count() == rows
+            db.engine.dispose()
+    finally:
+        write_queue.stop()
+
+
+def test_imports_without_fcntl():
+    """Desactivada no necesita fcntl (hosts no POSIX)."""
+    code = 'import sys; sys.modules["fcntl"] = None; from app import create_app; create_app()'
+    env = dict(os.environ, PYTHONPATH=ROOT, DATABASE_URL='sqlite://')
+    env.pop('ASYNC_WRITES', None)
+    assert subprocess.run([sys.executable, '-c', code], env=env, cwd=ROOT).returncode == 0